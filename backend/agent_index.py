@@ -0,0 +1,204 @@
+"""
+Normalized contact index for duplicate agent detection.
+
+Agents are keyed by normalized email, E.164 phone number and a name +
+brokerage fingerprint, so a new submission can be checked against every
+existing agent with a few dict lookups instead of a table scan. Offices
+share phone lines and info@ addresses, so an email or phone match only
+counts as the same person when the names match too.
+"""
+
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Matches on these keys plus the same name mean "same person"; anything less only suggests it
+STRONG_KEYS = ("email", "phone")
+NAME_KEYS = ("name", "fingerprint")
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+_COMPANY_SUFFIXES = {"inc", "llc", "ltd", "co", "corp", "group", "the"}
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    email = (email or "").strip().lower()
+    return email if "@" in email else None
+
+
+def normalize_phone(phone: Optional[str], default_country: str = "1") -> Optional[str]:
+    """E.164 form of a phone number, assuming North America when no country code is given"""
+    phone = (phone or "").strip()
+    digits = re.sub(r"\D", "", phone)
+    if phone.startswith("+"):
+        return f"+{digits}" if 8 <= len(digits) <= 15 else None
+    if phone.startswith("00"):
+        digits = digits[2:]
+        return f"+{digits}" if 8 <= len(digits) <= 15 else None
+    if len(digits) == 10:
+        return f"+{default_country}{digits}"
+    if len(digits) == 11 and digits.startswith(default_country):
+        return f"+{digits}"
+    return None
+
+
+def _normalize_words(text: Optional[str]) -> List[str]:
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    return _WHITESPACE.split(_PUNCTUATION.sub(" ", text).strip())
+
+
+def name_key(full_name: Optional[str]) -> Optional[str]:
+    """Order-insensitive, accent- and case-folded name tokens"""
+    name = sorted(word for word in _normalize_words(full_name) if word)
+    return " ".join(name) if name else None
+
+
+def name_fingerprint(full_name: Optional[str], brokerage: Optional[str]) -> Optional[str]:
+    """Name key plus the brokerage without company suffixes"""
+    name = name_key(full_name)
+    company = [word for word in _normalize_words(brokerage) if word and word not in _COMPANY_SUFFIXES]
+    if not name:
+        return None
+    return f"{name}|{' '.join(company)}"
+
+
+def contact_keys(agent: dict) -> Dict[str, str]:
+    """All index keys of an agent row or submission"""
+    keys = {
+        "email": normalize_email(agent.get("email")),
+        "phone": normalize_phone(agent.get("phone")),
+        "fingerprint": name_fingerprint(agent.get("full_name"), agent.get("brokerage")),
+    }
+    return {kind: value for kind, value in keys.items() if value}
+
+
+class AgentIndex:
+    """In-memory key -> agent ids maps (several agents can share an office phone or email)"""
+
+    def __init__(self):
+        # key -> ids of every agent with it, oldest first
+        self._maps: Dict[str, Dict[str, List[str]]] = {"email": {}, "phone": {}, "fingerprint": {}}
+        self._names: Dict[str, Optional[str]] = {}  # agent id -> name key
+        self.ready = False
+
+    def __len__(self):
+        """Number of agents indexed"""
+        return len(self._names)
+
+    def load(self, rows: Iterable[dict]):
+        """Index every row, keeping agents added while the rows were being fetched"""
+        for row in rows:
+            self.add(row)
+        self.ready = True
+
+    def add(self, agent: dict):
+        self._names[agent["id"]] = name_key(agent.get("full_name"))
+        for kind, value in contact_keys(agent).items():
+            ids = self._maps[kind].setdefault(value, [])
+            if agent["id"] not in ids:
+                ids.append(agent["id"])
+
+    def find(self, agent: dict) -> Tuple[Optional[str], List[str]]:
+        """(existing agent id, matched key kinds) of the best match for a submission.
+
+        Every agent sharing a key is scored; one with the same name and a
+        shared email or phone wins over one that only shares the contact
+        (ties go to the oldest). "name" is among the kinds when the existing
+        agent also has the same name.
+        """
+        matches: Dict[str, List[str]] = {}
+        for kind, value in contact_keys(agent).items():
+            for existing in self._maps[kind].get(value, ()):
+                matches.setdefault(existing, []).append(kind)
+        if not matches:
+            return None, []
+        name = name_key(agent.get("full_name"))
+        for agent_id, kinds in matches.items():
+            if name and self._names.get(agent_id) == name and "fingerprint" not in kinds:
+                kinds.append("name")
+        best = max(matches, key=lambda agent_id: (is_strong_match(matches[agent_id]), len(matches[agent_id])))
+        return best, matches[best]
+
+
+def is_strong_match(matched_on: List[str]) -> bool:
+    """Same email or phone and the same name"""
+    return any(kind in STRONG_KEYS for kind in matched_on) and any(kind in NAME_KEYS for kind in matched_on)
+
+
+def dedupe_report(rows: Iterable[dict]) -> List[dict]:
+    """Groups of likely duplicates plus agents that only share a contact, in linear time.
+
+    Agents with the same name sharing an email, phone or brokerage are joined
+    into one group (hash buckets + union-find); those sharing an email or
+    phone are `strong`. An email or phone shared by different people (an
+    office line, info@) is reported as its own non-strong entry listing
+    everyone on it, so it never merges different people into one group.
+    """
+    parent: Dict[str, str] = {}
+
+    def find(agent_id):
+        while parent[agent_id] != agent_id:
+            parent[agent_id] = parent[parent[agent_id]]
+            agent_id = parent[agent_id]
+        return agent_id
+
+    buckets: Dict[Tuple[str, str], List[str]] = {}
+    names: Dict[str, Optional[str]] = {}
+    for row in rows:
+        agent_id = row["id"]
+        parent.setdefault(agent_id, agent_id)
+        names[agent_id] = name_key(row.get("full_name"))
+        for kind, value in contact_keys(row).items():
+            buckets.setdefault((kind, value), []).append(agent_id)
+
+    reasons: Dict[str, set] = {}
+    for (kind, _), members in buckets.items():
+        if len(members) < 2:
+            continue
+        same_name: Dict[Optional[str], List[str]] = {}
+        for agent_id in members:
+            same_name.setdefault(names[agent_id], []).append(agent_id)
+        for name, people in same_name.items():
+            if not name or len(people) < 2:
+                continue
+            shared = {kind, "name"} if kind in STRONG_KEYS else {kind}
+            root = find(people[0])
+            for agent_id in people:
+                reasons.setdefault(agent_id, set()).update(shared)
+                other = find(agent_id)
+                if other != root:
+                    parent[other] = root
+
+    groups: Dict[str, List[str]] = {}
+    for agent_id in parent:
+        groups.setdefault(find(agent_id), []).append(agent_id)
+
+    report = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        matched_on = sorted(set().union(*(reasons.get(member, set()) for member in members)))
+        report.append({"agent_ids": members, "matched_on": matched_on, "strong": "name" in matched_on})
+
+    # Contacts shared by more than one person; the same people sharing both an email and a phone is one entry
+    shared_contacts: Dict[Tuple[str, ...], set] = {}
+    for (kind, _), members in buckets.items():
+        if kind in STRONG_KEYS and len({find(agent_id) for agent_id in members}) > 1:
+            shared_contacts.setdefault(tuple(members), set()).add(kind)
+    for members, kinds in shared_contacts.items():
+        report.append({"agent_ids": list(members), "matched_on": sorted(kinds), "strong": False})
+
+    report.sort(key=lambda group: (not group["strong"], -len(group["agent_ids"])))
+    return report
+
+
+def iter_agent_rows(supabase, columns: str = "id, full_name, brokerage, email, phone", page_size: int = 1000):
+    """Page through the whole agents table (PostgREST caps rows per request)"""
+    start = 0
+    while True:
+        rows = supabase.table('agents').select(columns).order('id').range(start, start + page_size - 1).execute().data
+        yield from rows
+        if len(rows) < page_size:
+            break
+        start += page_size
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks of the API's hot paths, with stored baselines.
+
+Each case is timed over several rounds (each long enough to swamp timer
+noise) and its fastest round is compared with the saved baseline - the
+minimum is the least noisy estimate on a shared machine. The script exits
+non-zero if any case is slower by more than --threshold.
+
+    python benchmarks/bench_hot_paths.py --save          # record a baseline
+    python benchmarks/bench_hot_paths.py                 # compare against it
+    python benchmarks/bench_hot_paths.py --filter agent --threshold 0.25
+
+Baselines are only comparable on the same machine and Python version; both
+are stored with the numbers and a mismatch is reported. The same cases run
+under pytest-benchmark from test_hot_paths.py.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import common  # noqa: F401  (sets up the import path)
+
+# server.py reads its configuration at import time; keep it away from real services and files
+_scratch = tempfile.mkdtemp(prefix="atlas-bench-")
+for name, value in {
+    "SUPABASE_URL": "http://127.0.0.1:9", "SUPABASE_ANON_KEY": "bench.anon.key",
+    "SUPABASE_SERVICE_KEY": "bench.service.key", "PARSE_POOL_MODE": "inline",
+    "SCRAPE_CACHE_PATH": os.path.join(_scratch, "scrape_cache.sqlite3"),
+    "GHL_OUTBOX_PATH": os.path.join(_scratch, "ghl_outbox.sqlite3"),
+    "IMAGE_STORE_PATH": os.path.join(_scratch, "images"),
+}.items():
+    os.environ.setdefault(name, value)
+
+import server  # noqa: E402
+from bench_image_extraction import AGENT_NAME, PAGE_URL, synthetic_page  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from generate_data import generate  # noqa: E402
+from image_extractor import extract_image_candidates, match_agent_image  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "hot_paths.json"
+
+
+def _route(path: str, method: str = "GET"):
+    return next(route for route in server.app.routes
+                if getattr(route, "path", None) == path and method in getattr(route, "methods", ()))
+
+
+def build_cases():
+    """name -> zero-argument callable; setup happens here, outside the timings"""
+    rows = [agent for agent, _ in generate(10000, 0, seed=7)]
+    rows_100 = rows[:100]
+    agents = [server.Agent(**row) for row in rows]
+    agents_route = _route("/api/agents")
+    loop = asyncio.new_event_loop()
+
+    def serialize_agents():
+        content = loop.run_until_complete(serialize_response(
+            field=agents_route.response_field, response_content=agents, is_coroutine=True,
+        ))
+        response_class = getattr(agents_route.response_class, "value", agents_route.response_class)
+        return response_class(content).body
+
+    def tag_filter_query():
+        # The builder chain of get_agents with every filter set; nothing is sent
+        query = server.supabase.table('agents').select("*")
+        search = "smith"
+        query = query.or_(f"full_name.ilike.%{search}%,brokerage.ilike.%{search}%,service_area.ilike.%{search}%")
+        query = query.ilike('service_area', '%Austin%')
+        for tag in "Luxury Properties, First-Time Buyers, Relocation Services".split(','):
+            query = query.contains('tags', [tag.strip()])
+        return query.eq('submitted_by', 'Admin').limit(100)
+
+    queries = ["Manhattan", "brooklyn heights", "upper west side apartments", "Austin, TX", "nyc", "westchester county"]
+
+    def search_locations():
+        for query in queries:
+            loop.run_until_complete(server.search_location(query))
+
+    rng = random.Random(42)
+    pages = [synthetic_page(rng, size_kb) for size_kb in (50, 200, 800)]
+
+    def scrape_parse():
+        for html in pages:
+            match_agent_image(extract_image_candidates(html, PAGE_URL), AGENT_NAME)
+
+    return {
+        "agent_model_100": lambda: [server.Agent(**row) for row in rows_100],
+        "agent_model_10k": lambda: [server.Agent(**row) for row in rows],
+        "agents_response_10k": serialize_agents,
+        "agents_fast_path_10k": lambda: server.trusted_rows_response(server.AGENT_LIST, rows).body,
+        "tag_filter_query": tag_filter_query,
+        "search_location_x6": search_locations,
+        "scrape_parse_3_pages": scrape_parse,
+    }
+
+
+def time_case(fn, rounds: int, min_round_time: float) -> dict:
+    """Per-call time: calibrate calls per round, then time each round.
+
+    Returns the median and the fastest round; baselines compare the fastest.
+
+    Like timeit, the garbage collector is paused while timing and run between
+    rounds, so a collection landing in one round doesn't decide the result.
+    """
+    fn()  # warm up caches and lazy imports
+    gc.collect()
+    gc.disable()
+    try:
+        return _time_rounds(fn, rounds, min_round_time)
+    finally:
+        gc.enable()
+
+
+def _time_rounds(fn, rounds: int, min_round_time: float) -> dict:
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_time:
+            break
+        number *= 2 if elapsed < min_round_time / 4 else 1 + int(min_round_time / max(elapsed, 1e-9))
+    samples = [elapsed / number]
+    for _ in range(rounds - 1):
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {"median_us": statistics.median(samples) * 1e6, "min_us": min(samples) * 1e6, "calls_per_round": number}
+
+
+def environment() -> dict:
+    return {"machine": platform.node(), "cpu": platform.processor() or platform.machine(),
+            "python": platform.python_version()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, e.g. 0.2 = 20%%")
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-round-time", type=float, default=0.2, help="seconds per round")
+    args = parser.parse_args()
+
+    cases = {name: fn for name, fn in build_cases().items() if args.filter in name}
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else None
+    if baseline and not args.save and baseline.get("environment") != environment():
+        print(f"Warning: baseline was recorded on {baseline.get('environment')}, this is {environment()}\n")
+
+    results, regressions = {}, []
+    for name, fn in cases.items():
+        result = results[name] = time_case(fn, args.rounds, args.min_round_time)
+        line = f"{name:<28} median={result['median_us']:12.1f}us  min={result['min_us']:12.1f}us"
+        previous = (baseline or {}).get("results", {}).get(name)
+        if previous and not args.save:
+            change = result["min_us"] / previous["min_us"] - 1
+            regressed = change > args.threshold
+            line += f"  {change:+7.1%} vs baseline{'  REGRESSION' if regressed else ''}"
+            if regressed:
+                regressions.append(name)
+        print(line)
+
+    if args.save:
+        saved = (baseline or {}).get("results", {}) if baseline and baseline.get("environment") == environment() else {}
+        saved.update(results)
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({"environment": environment(), "results": saved}, indent=2) + "\n")
+        print(f"\nBaseline saved to {args.baseline}")
+    elif baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --save to record one")
+    elif regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Outbound latency with and without connection pooling.
+
+Compares a fresh httpx.AsyncClient per request (the old scrape/GHL pattern)
+with the shared OutboundClients pool, against a local stand-in server.
+
+    python benchmarks/bench_http_pooling.py --requests 500 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import time
+
+from common import start_stand_in_server, summarize
+
+import httpx
+from http_clients import OutboundClients
+
+
+async def per_call_client(url):
+    async with httpx.AsyncClient(timeout=10) as client:
+        response = await client.get(url)
+        response.raise_for_status()
+
+
+async def run(label, fetch, url, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await fetch(url)
+            samples.append((time.perf_counter() - start) * 1000)
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    wall = time.perf_counter() - wall
+    summarize(f"{label} (c={concurrency})", samples)
+    print(f"{'':<40} {total / wall:,.0f} req/s")
+
+
+async def main(args):
+    server, base_url = start_stand_in_server()
+    url = f"{base_url}/agent"
+    clients = OutboundClients(base_url + "/", "bench-key", per_host_limit=args.concurrency)
+
+    async def pooled(target):
+        async with clients.hosts.slot(target):
+            response = await clients.scrape.get(target)
+            response.raise_for_status()
+
+    try:
+        for concurrency in (1, args.concurrency):
+            await run("fresh client per request", per_call_client, url, args.requests, concurrency)
+            await run("shared pooled client", pooled, url, args.requests, concurrency)
+    finally:
+        await clients.aclose()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
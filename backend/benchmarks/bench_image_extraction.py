@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Parse time and peak memory of profile image extraction.
+
+Runs the old BeautifulSoup(html.parser) approach against each available
+image_extractor backend over a corpus of saved realtor pages. Pages come from
+--corpus (a directory of .html files), --from-cache (a scrape cache SQLite
+file) or, failing both, a synthetic corpus.
+
+    python benchmarks/bench_image_extraction.py --corpus ~/saved_pages
+"""
+
+import argparse
+import random
+import sqlite3
+import statistics
+import time
+import tracemalloc
+import zlib
+from pathlib import Path
+
+import common  # noqa: F401  (sets up the import path)
+
+import image_extractor
+from bs4 import BeautifulSoup
+from image_extractor import extract_image_candidates, find_agent_image, resolve_image_src
+
+PAGE_URL = "https://brokerage.example.com/agents/jane-doe"
+AGENT_NAME = "Jane Doe"
+
+
+def bs4_extract(html, page_url, agent_name):
+    """The original scrape_from_website parsing loop"""
+    soup = BeautifulSoup(html, 'html.parser')
+    name_parts = agent_name.lower().split()
+    for img in soup.find_all('img'):
+        alt_text = img.get('alt', '').lower()
+        src = img.get('src', '')
+        if any(part in alt_text for part in name_parts) and src:
+            resolved = resolve_image_src(src, page_url)
+            if resolved:
+                return resolved
+    return None
+
+
+def synthetic_page(rng, size_kb):
+    """A brokerage-style page: nav, scripts, listing cards and a team grid"""
+    parts = ["<!DOCTYPE html><html><head><title>Agents</title>"]
+    parts.append("<script>" + "var x=1;" * 2000 + "</script></head><body><nav>")
+    parts.extend(f"<a href='/p{i}'>Link {i}</a>" for i in range(200))
+    parts.append("</nav><main>")
+    length = sum(len(p) for p in parts)
+    # Where on the page the agent's own photo shows up
+    position = rng.random() * size_kb * 1024
+    while length < size_kb * 1024:
+        card = (
+            f"<div class='card'><img alt='Listing {rng.randint(1, 9999)} photo' "
+            f"src='/listings/{rng.randint(1, 10**6)}.jpg'><p>{'Lorem ipsum ' * 20}</p></div>"
+        )
+        if position is not None and length > position:
+            card += f"<div class='agent'><img alt='{AGENT_NAME} headshot' src='/team/jane.jpg'></div>"
+            position = None
+        parts.append(card)
+        length += len(card)
+    parts.append("</main></body></html>")
+    return "".join(parts).encode()
+
+
+def load_corpus(args):
+    if args.corpus:
+        return [p.read_bytes() for p in sorted(Path(args.corpus).expanduser().glob("*.htm*"))]
+    if args.from_cache:
+        conn = sqlite3.connect(args.from_cache)
+        return [zlib.decompress(row[0]) for row in conn.execute("SELECT body FROM pages WHERE body IS NOT NULL")]
+    rng = random.Random(42)
+    return [synthetic_page(rng, rng.choice([50, 200, 800, 2000])) for _ in range(args.pages)]
+
+
+def measure(label, fn, corpus, repeat):
+    timings = []
+    for _ in range(repeat):
+        for html in corpus:
+            start = time.perf_counter()
+            fn(html)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    # Peak Python-heap memory over one pass (C allocations in lxml/lexbor are not traced)
+    tracemalloc.start()
+    for html in corpus:
+        fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{label:<36} mean={statistics.mean(timings):9.3f}ms "
+        f"median={statistics.median(timings):9.3f}ms peak_mem={peak / 1024 / 1024:8.2f}MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", help="directory of saved .html pages")
+    parser.add_argument("--from-cache", help="scrape cache SQLite file to read pages from")
+    parser.add_argument("--pages", type=int, default=20, help="synthetic pages when no corpus is given")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args)
+    total = sum(len(html) for html in corpus)
+    print(f"{len(corpus)} pages, {total / 1024 / 1024:.1f}MB total\n")
+
+    measure("bs4 html.parser (old)", lambda html: bs4_extract(html, PAGE_URL, AGENT_NAME), corpus, args.repeat)
+
+    backends = ["htmlparser"]
+    if image_extractor.lxml_html is not None:
+        backends.append("lxml")
+    if image_extractor.SelectolaxParser is not None:
+        backends.append("selectolax")
+    default_backend = image_extractor.PARSER_BACKEND
+    for backend in backends:
+        image_extractor.PARSER_BACKEND = backend
+        measure(f"all candidates ({backend})", lambda html: extract_image_candidates(html, PAGE_URL), corpus, args.repeat)
+    image_extractor.PARSER_BACKEND = default_backend
+
+    measure("first match, early stop (htmlparser)", lambda html: find_agent_image(html, PAGE_URL, AGENT_NAME), corpus, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
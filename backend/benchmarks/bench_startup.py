@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark: time from launching uvicorn to serving requests.
+
+Each run starts a fresh `uvicorn server:app` process against the fake
+PostgREST server and polls the liveness and readiness endpoints, recording
+when each first answers 200. The time to live is what a restart costs
+before the process accepts traffic; the time to ready includes the
+background warm-up (Supabase client, parse pool, image index).
+
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --env PARSE_POOL_MODE=process
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import BACKEND_DIR, start_stand_in_server
+from fake_postgrest import Database, make_handler
+
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(client: httpx.Client, url: str, process: subprocess.Popen, start: float, timeout: float) -> float:
+    """Seconds from `start` until `url` answers 200"""
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise SystemExit(f"uvicorn exited with code {process.returncode} before {url} was up")
+        try:
+            if client.get(url).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise SystemExit(f"{url} not up after {timeout}s")
+
+
+def run_once(env: dict, args) -> tuple:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            live = wait_for(client, base_url + args.live_path, process, start, args.timeout)
+            ready = wait_for(client, base_url + args.ready_path, process, start, args.timeout)
+    finally:
+        process.terminate()
+        process.wait()
+    return live, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for each endpoint")
+    parser.add_argument("--live-path", default="/api/health/live")
+    parser.add_argument("--ready-path", default="/api/health/ready")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="extra environment for the server, repeatable")
+    parser.add_argument("--verbose", action="store_true", help="show the server's stderr")
+    args = parser.parse_args()
+
+    _, supabase_url = start_stand_in_server(make_handler(Database()))
+    scratch = tempfile.mkdtemp(prefix="atlas-startup-")
+    env = {
+        **os.environ,
+        "SUPABASE_URL": supabase_url, "SUPABASE_ANON_KEY": "bench.anon.key",
+        "SUPABASE_SERVICE_KEY": "bench.service.key",
+        "GOHIGHLEVEL_API_KEY": "bench-ghl-key", "GOHIGHLEVEL_BASE_URL": "http://127.0.0.1:9",
+        "SCRAPE_CACHE_PATH": os.path.join(scratch, "scrape_cache.sqlite3"),
+        "GHL_OUTBOX_PATH": os.path.join(scratch, "ghl_outbox.sqlite3"),
+        "IMAGE_STORE_PATH": os.path.join(scratch, "images"),
+    }
+    env.update(item.split("=", 1) for item in args.env)
+
+    lives, readies = [], []
+    for run in range(args.runs):
+        live, ready = run_once(env, args)
+        lives.append(live * 1000)
+        readies.append(ready * 1000)
+        print(f"run {run + 1}: live after {live * 1000:7.1f}ms, ready after {ready * 1000:7.1f}ms")
+    print()
+    for name, samples in (("live", lives), ("ready", readies)):
+        print(f"{name:<6} median={statistics.median(samples):7.1f}ms  min={min(samples):7.1f}ms  max={max(samples):7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
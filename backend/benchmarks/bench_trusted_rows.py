@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Per-row cost of returning DB rows: per-row models vs the trusted fast path.
+
+The old path builds Agent(**row) for every row and FastAPI then validates and
+serializes the list again through response_model. The fast path validates the
+rows once with TypeAdapter(List[Agent]) and encodes them in pydantic-core.
+
+    python benchmarks/bench_trusted_rows.py --rows 10000
+"""
+
+import argparse
+import asyncio
+import json
+
+from bench_hot_paths import _route, server, time_case
+from fastapi.routing import serialize_response
+from generate_data import generate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = [agent for agent, _ in generate(args.rows, 0, seed=7)]
+    route = _route("/api/agents")
+    loop = asyncio.new_event_loop()
+
+    def per_row_models():
+        agents = [server.Agent(**row) for row in rows]
+        content = loop.run_until_complete(serialize_response(
+            field=route.response_field, response_content=agents, is_coroutine=True,
+        ))
+        return route.response_class.value(content).body
+
+    def trusted_fast_path():
+        return server.trusted_rows_response(server.AGENT_LIST, rows).body
+
+    # Same JSON document either way
+    assert json.loads(per_row_models()) == json.loads(trusted_fast_path())
+
+    print(f"{len(rows)} agent rows, model construction + response encoding\n")
+    results = {}
+    for label, fn in (("Agent(**row) + response_model", per_row_models),
+                      ("TypeAdapter + dump_json", trusted_fast_path)):
+        result = results[label] = time_case(fn, args.rounds, 0.2)
+        print(f"{label:<32} total={result['min_us'] / 1000:9.2f}ms  per row={result['min_us'] / len(rows):7.2f}us")
+    old, new = (result["min_us"] for result in results.values())
+    print(f"\nfast path is {old / new:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
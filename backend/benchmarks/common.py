@@ -0,0 +1,70 @@
+"""
+Shared helpers for the backend benchmarks: latency summaries and a local
+stand-in HTTP server so nothing has to leave the machine.
+"""
+
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Make the backend modules importable when run as `python benchmarks/<name>.py`
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(name, samples_ms):
+    """Print a one-line latency summary for samples given in milliseconds"""
+    print(
+        f"{name:<40} n={len(samples_ms):<6} "
+        f"mean={statistics.mean(samples_ms):8.3f}ms "
+        f"p50={percentile(samples_ms, 50):8.3f}ms "
+        f"p95={percentile(samples_ms, 95):8.3f}ms "
+        f"p99={percentile(samples_ms, 99):8.3f}ms"
+    )
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Keep-alive HTTP/1.1 handler returning a fixed body after an optional delay"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    body = b"<html><body><img alt='stand in' src='/img.jpg'></body></html>"
+    content_type = "text/html"
+    delay = 0.0
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+        self.send_response(200)
+        self.send_header("Content-Type", self.content_type)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    do_POST = do_GET
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stand_in_server(handler=StandInHandler, port=0):
+    """Start a threaded local server; returns (server, base_url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}"
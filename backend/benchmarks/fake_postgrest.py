@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Supabase PostgREST API, for offline benchmarks.
+
+Speaks the subset of PostgREST that server.py uses: select of `*` or
+columns (and `count`), eq/neq/gt/gte/lt/lte/like/ilike/in/is/cs filters,
+`or=(...)`, order, limit/offset/Range, exact counts, single-object responses,
+insert, upsert (merge or ignore duplicates), update and delete. Tables live
+in memory and can be seeded from `<table>.ndjson` files, e.g. the output of
+generate_data.py.
+
+Latency, jitter, a slow tail and error rates are drawn from a seeded RNG, so
+tail-latency behaviour can be reproduced:
+
+    python benchmarks/fake_postgrest.py --port 9200 --seed-dir /tmp/atlas-data \\
+        --latency-ms 3 --jitter-ms 2 --tail-rate 0.01 --tail-ms 250
+    SUPABASE_URL=http://127.0.0.1:9200 SUPABASE_ANON_KEY=a.b.c SUPABASE_SERVICE_KEY=a.b.c \\
+        RATE_LIMITS_ENABLED=0 uvicorn server:app --port 8001
+    python benchmarks/loadgen.py --base-url http://127.0.0.1:8001
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from common import start_stand_in_server
+
+RESERVED_PARAMS = {"select", "limit", "offset", "order", "on_conflict", "columns"}
+SINGLE_OBJECT = "application/vnd.pgrst.object+json"
+
+
+class PostgrestError(Exception):
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+def split_top_level(text: str, separator: str = ",") -> list:
+    """Split on separators outside parentheses, braces and double quotes"""
+    parts, depth, quoted, current = [], 0, False, []
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char in "({":
+            depth += 1
+        elif not quoted and char in ")}":
+            depth -= 1
+        elif char == separator and depth == 0 and not quoted:
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    parts.append("".join(current))
+    return parts
+
+
+def _unquote_value(value: str) -> str:
+    return value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+
+
+def parse_array_literal(value: str) -> list:
+    """`{a,"b c"}` (Postgres array) or a JSON array -> list of strings"""
+    value = value.strip()
+    if value.startswith("["):
+        return json.loads(value)
+    inner = value[1:-1] if value.startswith("{") and value.endswith("}") else value
+    return [_unquote_value(item.strip()) for item in split_top_level(inner) if item.strip()]
+
+
+def _like_regex(pattern: str, ignore_case: bool):
+    regex = "".join(
+        ".*" if char in "*%" else "." if char == "_" else re.escape(char)
+        for char in pattern
+    )
+    return re.compile(regex, re.IGNORECASE | re.DOTALL if ignore_case else re.DOTALL)
+
+
+def _coerce(value: str, sample):
+    """Filter value as the column's type, so numeric comparisons work"""
+    if isinstance(sample, bool):
+        return value == "true"
+    if isinstance(sample, (int, float)):
+        try:
+            return type(sample)(value)
+        except ValueError:
+            return value
+    return value
+
+
+def parse_condition(column: str, expression: str):
+    """`col`, `[not.]op.value` -> predicate(row)"""
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, raw = expression.partition(".")
+    value = _unquote_value(raw)
+
+    if op in ("eq", "neq", "gt", "gte", "lt", "lte"):
+        compare = {
+            "eq": lambda a, b: a == b, "neq": lambda a, b: a != b,
+            "gt": lambda a, b: a > b, "gte": lambda a, b: a >= b,
+            "lt": lambda a, b: a < b, "lte": lambda a, b: a <= b,
+        }[op]
+
+        def predicate(row):
+            current = row.get(column)
+            if current is None:
+                return False
+            try:
+                return compare(current, _coerce(value, current))
+            except TypeError:
+                return compare(str(current), value)
+    elif op in ("like", "ilike"):
+        regex = _like_regex(value, op == "ilike")
+
+        def predicate(row):
+            current = row.get(column)
+            return current is not None and regex.fullmatch(str(current)) is not None
+    elif op == "in":
+        options = set(parse_array_literal("{" + value.strip("()") + "}"))
+
+        def predicate(row):
+            return str(row.get(column)) in options
+    elif op == "is":
+        expected = {"null": None, "true": True, "false": False}.get(value.lower(), value)
+
+        def predicate(row):
+            return row.get(column) is expected
+    elif op in ("cs", "cd"):
+        wanted = set(map(str, parse_array_literal(value)))
+
+        def predicate(row):
+            current = set(map(str, row.get(column) or []))
+            return wanted <= current if op == "cs" else current <= wanted
+    else:
+        raise PostgrestError(400, "PGRST100", f"Unsupported operator {op}")
+
+    return (lambda row: not predicate(row)) if negate else predicate
+
+
+def parse_or(expression: str):
+    """`(a.ilike.*x*,b.eq.y)` -> predicate(row) true if any term matches"""
+    terms = []
+    for term in split_top_level(expression.strip()[1:-1]):
+        column, _, condition = term.partition(".")
+        terms.append(parse_condition(column, condition))
+    return lambda row: any(term(row) for term in terms)
+
+
+class Table:
+    def __init__(self, name: str, rows=()):
+        self.name = name
+        self.rows = []
+        self.by_id = {}
+        for row in rows:
+            self.add(row)
+
+    def add(self, row: dict):
+        row.setdefault("id", str(uuid.uuid4()))
+        if "created_at" not in row and self.rows and "created_at" in self.rows[0]:
+            row["created_at"] = datetime.utcnow().isoformat()
+        self.rows.append(row)
+        self.by_id[str(row["id"])] = row
+
+    def remove(self, rows: list):
+        doomed = {id(row) for row in rows}
+        self.rows = [row for row in self.rows if id(row) not in doomed]
+        for row in rows:
+            self.by_id.pop(str(row["id"]), None)
+
+
+class Database:
+    def __init__(self):
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    def table(self, name: str) -> Table:
+        if name not in self.tables:
+            self.tables[name] = Table(name)
+        return self.tables[name]
+
+    def load_dir(self, directory: Path):
+        for path in sorted(directory.glob("*.ndjson")):
+            with path.open() as f:
+                self.tables[path.stem] = Table(path.stem, (json.loads(line) for line in f if line.strip()))
+
+
+class Query:
+    def __init__(self, params: list):
+        self.predicates = []
+        self.columns = None
+        self.limit = None
+        self.offset = 0
+        self.order = []
+        self.on_conflict = "id"
+        self.id_lookup = None
+        for key, value in params:
+            if key == "select":
+                columns = [column.strip() for column in value.split(",") if column.strip()]
+                self.columns = None if columns in ([], ["*"]) else columns
+            elif key == "limit":
+                self.limit = int(value)
+            elif key == "offset":
+                self.offset = int(value)
+            elif key == "order":
+                for part in value.split(","):
+                    column, *modifiers = part.split(".")
+                    self.order.append((column, "desc" in modifiers, "nullsfirst" in modifiers))
+            elif key == "on_conflict":
+                self.on_conflict = value
+            elif key in ("or", "not.or"):
+                predicate = parse_or(value)
+                self.predicates.append(predicate if key == "or" else (lambda row, p=predicate: not p(row)))
+            elif key not in RESERVED_PARAMS:
+                if key == "id" and value.startswith("eq."):
+                    self.id_lookup = _unquote_value(value[3:])
+                self.predicates.append(parse_condition(key, value))
+
+    def matching(self, table: Table) -> list:
+        if self.id_lookup is not None:
+            row = table.by_id.get(self.id_lookup)
+            candidates = [row] if row is not None else []
+        else:
+            candidates = table.rows
+        rows = [row for row in candidates if all(predicate(row) for predicate in self.predicates)]
+        for column, desc, nulls_first in reversed(self.order):
+            present = [row for row in rows if row.get(column) is not None]
+            missing = [row for row in rows if row.get(column) is None]
+            present.sort(key=lambda row: row[column], reverse=desc)
+            # PostgREST puts nulls last for asc and first for desc by default
+            rows = missing + present if (nulls_first or desc) else present + missing
+        return rows
+
+    def project(self, row: dict) -> dict:
+        if self.columns is None:
+            return dict(row)
+        return {column: row.get(column) for column in self.columns}
+
+
+def make_handler(db: Database, latency_ms=0.0, jitter_ms=0.0, tail_rate=0.0, tail_ms=0.0, error_rate=0.0, seed=None):
+    """Build a handler class sharing one database and RNG"""
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    counts = {"requests": 0, "errors_injected": 0}
+
+    class FakePostgrestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def _reply(self, status, body=None, headers=None):
+            payload = b"" if body is None else json.dumps(body, default=str).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(payload)
+
+        def _delay_and_maybe_fail(self) -> bool:
+            with rng_lock:
+                counts["requests"] += 1
+                delay = latency_ms + rng.uniform(-jitter_ms, jitter_ms)
+                if tail_rate and rng.random() < tail_rate:
+                    delay += tail_ms
+                failed = rng.random() < error_rate
+                if failed:
+                    counts["errors_injected"] += 1
+            if delay > 0:
+                time.sleep(delay / 1000)
+            if failed:
+                self._reply(503, {"code": "PGRST000", "message": "Injected failure", "details": None, "hint": None})
+            return failed
+
+        def _prefer(self) -> set:
+            return {part.strip() for part in self.headers.get("Prefer", "").split(",") if part.strip()}
+
+        def _body(self):
+            return json.loads(self.raw_body or b"null")
+
+        def _route(self):
+            url = urlsplit(self.path)
+            if url.path == "/_stats":
+                return None, None
+            prefix = "/rest/v1/"
+            if not url.path.startswith(prefix):
+                raise PostgrestError(404, "PGRST125", f"Invalid path {url.path}")
+            return unquote(url.path[len(prefix):].strip("/")), Query(parse_qsl(url.query, keep_blank_values=True))
+
+        def _respond_rows(self, rows, query, status=200, total=None):
+            prefer = self._prefer()
+            headers = {}
+            if total is not None or "count=exact" in prefer or "count=planned" in prefer or "count=estimated" in prefer:
+                total = len(rows) if total is None else total
+                start = query.offset if rows else 0
+                end = start + len(rows) - 1 if rows else 0
+                headers["Content-Range"] = f"{start}-{end}/{total}" if rows else f"*/{total}"
+            if self.command != "GET" and "return=representation" not in prefer:
+                return self._reply(201 if self.command == "POST" else 204, None, headers)
+            body = [query.project(row) for row in rows]
+            if SINGLE_OBJECT in self.headers.get("Accept", ""):
+                if len(body) != 1:
+                    raise PostgrestError(406, "PGRST116", f"JSON object requested, {len(body)} rows returned")
+                body = body[0]
+            self._reply(status, body, headers)
+
+        def _handle(self, operation):
+            # Always drain the body, or it would be parsed as the next keep-alive request
+            self.raw_body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                name, query = self._route()
+                if name is None:
+                    return self._reply(200, {**counts, "tables": {t: len(db.tables[t].rows) for t in db.tables}})
+                if self._delay_and_maybe_fail():
+                    return
+                operation(name, query)
+            except PostgrestError as e:
+                self._reply(e.status, {"code": e.code, "message": str(e), "details": None, "hint": None})
+            except (ValueError, KeyError) as e:
+                self._reply(400, {"code": "PGRST100", "message": str(e), "details": None, "hint": None})
+
+        def _select(self, name, query):
+            range_header = self.headers.get("Range")
+            if range_header and query.limit is None:
+                start, _, end = range_header.partition("-")
+                query.offset = int(start)
+                query.limit = int(end) - int(start) + 1 if end else None
+            with db.lock:
+                rows = query.matching(db.table(name))
+            total = len(rows)
+            if query.columns == ["count"]:
+                return self._reply(200, [{"count": total}])
+            page = rows[query.offset:query.offset + query.limit if query.limit is not None else None]
+            self._respond_rows(page, query, total=total if "count=exact" in self._prefer() else None)
+
+        def _insert(self, name, query):
+            payload = self._body()
+            rows = payload if isinstance(payload, list) else [payload]
+            prefer = self._prefer()
+            upsert = "resolution=merge-duplicates" in prefer
+            ignore = "resolution=ignore-duplicates" in prefer
+            key = query.on_conflict
+            written = []
+            with db.lock:
+                table = db.table(name)
+                for row in rows:
+                    row = dict(row)
+                    existing = None
+                    if key in row:
+                        if key == "id":
+                            existing = table.by_id.get(str(row["id"]))
+                        else:
+                            existing = next((r for r in table.rows if r.get(key) == row[key]), None)
+                    if existing is not None:
+                        if ignore:
+                            continue
+                        if not upsert:
+                            raise PostgrestError(409, "23505", f"duplicate key value violates unique constraint on {key}")
+                        existing.update(row)
+                        written.append(existing)
+                    else:
+                        table.add(row)
+                        written.append(row)
+            self._respond_rows(written, query, status=201)
+
+        def _update(self, name, query):
+            changes = self._body()
+            with db.lock:
+                rows = query.matching(db.table(name))
+                for row in rows:
+                    row.update(changes)
+            self._respond_rows(rows, query)
+
+        def _delete(self, name, query):
+            with db.lock:
+                table = db.table(name)
+                rows = query.matching(table)
+                table.remove(rows)
+            self._respond_rows(rows, query)
+
+        def do_GET(self):
+            self._handle(self._select)
+
+        do_HEAD = do_GET
+
+        def do_POST(self):
+            self._handle(self._insert)
+
+        def do_PATCH(self):
+            self._handle(self._update)
+
+        def do_DELETE(self):
+            self._handle(self._delete)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakePostgrestHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--seed-dir", type=Path, help="directory of <table>.ndjson files to load")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="base latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- jitter")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="fraction of requests given --tail-ms extra")
+    parser.add_argument("--tail-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument("--seed", type=int, default=1, help="RNG seed for latency and errors")
+    args = parser.parse_args()
+
+    database = Database()
+    if args.seed_dir:
+        database.load_dir(args.seed_dir)
+    handler = make_handler(database, args.latency_ms, args.jitter_ms, args.tail_rate, args.tail_ms,
+                           args.error_rate, args.seed)
+    server, base_url = start_stand_in_server(handler, args.port)
+    tables = ", ".join(f"{name}={len(table.rows)}" for name, table in database.tables.items()) or "none"
+    print(f"Fake PostgREST listening on {base_url} (tables: {tables})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
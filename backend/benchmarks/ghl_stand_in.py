@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the GoHighLevel contacts API.
+
+Accepts POST /contacts/ and GET /contacts/lookup?email= and enforces its own
+token-bucket rate limit (429 with Retry-After), with optional random 5xx
+errors and added latency, so bulk sync can be exercised without touching the
+real CRM:
+
+    python benchmarks/ghl_stand_in.py --port 9100 --rate 10 --error-rate 0.05
+    python ghl_sync.py --submitted-by Admin --base-url http://127.0.0.1:9100/
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+from common import start_stand_in_server
+
+from rate_limit import TokenBucket
+
+
+def make_handler(rate=10.0, burst=10, error_rate=0.0, latency=0.0, seed=None):
+    """Build a handler class sharing one bucket, RNG and contact list"""
+    bucket = TokenBucket(rate, burst)
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    class GHLStandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+        contacts = []
+        counts = {"created": 0, "rate_limited": 0, "errors": 0}
+
+        def _reply(self, status, body, headers=None):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if latency:
+                time.sleep(latency)
+            with lock:
+                allowed = bucket.try_acquire()
+                wait = bucket.wait_time()
+                failed = rng.random() < error_rate
+            if not allowed:
+                self.counts["rate_limited"] += 1
+                return self._reply(429, {"message": "Too many requests"}, {"Retry-After": f"{wait:.3f}"})
+            if failed:
+                self.counts["errors"] += 1
+                return self._reply(503, {"message": "Service unavailable"})
+            if not body.get("email"):
+                return self._reply(422, {"message": "email is required"})
+            contact = {"id": str(uuid.uuid4()), **body}
+            with lock:
+                self.contacts.append(contact)
+                self.counts["created"] += 1
+            self._reply(201, {"contact": contact})
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path.rstrip("/").endswith("/contacts/lookup"):
+                email = parse_qs(url.query).get("email", [""])[0].lower()
+                with lock:
+                    found = [contact for contact in self.contacts if contact["email"].lower() == email]
+                if not found:
+                    return self._reply(422, {"email": {"message": "No contact found"}})
+                return self._reply(200, {"contacts": found})
+            self._reply(200, {"contacts": len(self.contacts), **self.counts})
+
+        def log_message(self, format, *args):
+            pass
+
+    return GHLStandInHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--rate", type=float, default=10.0, help="allowed requests per second")
+    parser.add_argument("--burst", type=int, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    handler = make_handler(args.rate, args.burst, args.error_rate, args.latency, args.seed)
+    server, base_url = start_stand_in_server(handler, args.port)
+    print(f"GoHighLevel stand-in listening on {base_url}/ (GET / for counters)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
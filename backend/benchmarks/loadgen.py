@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Concurrent load generator replaying the frontend's request mix.
+
+A scenario file (see benchmarks/scenarios/) lists weighted flows, each a
+sequence of requests. Placeholders such as {agent_id} or {search} are filled
+from ids captured from earlier responses and from the scenario's variables.
+
+Closed loop: N virtual users run flows back to back, so throughput adapts to
+the server. Open loop: flows start at a fixed Poisson arrival rate whether or
+not earlier ones finished, and flow latency is measured from the intended
+start so queueing is not hidden (no coordinated omission).
+
+    python benchmarks/loadgen.py --mode closed --concurrency 32 --duration 30
+    python benchmarks/loadgen.py --mode open --rate 200 --duration 30 \\
+        --scenario benchmarks/scenarios/read_only.json
+
+Only loopback targets are accepted; start the API locally first, e.g. with
+the fake PostgREST server behind it.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+from common import percentile, summarize
+
+import httpx
+
+SCENARIO_DIR = Path(__file__).resolve().parent / "scenarios"
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+PLACEHOLDER = re.compile(r"\{(\w+)\}")
+MAX_CAPTURED_IDS = 5000
+
+
+class Scenario:
+    def __init__(self, path: Path, seed: int):
+        spec = json.loads(path.read_text())
+        self.name = spec.get("name", path.stem)
+        self.flows = spec["flows"]
+        self.weights = [flow.get("weight", 1) for flow in self.flows]
+        self.variables = spec.get("variables", {})
+        self.agent_ids = []
+        self.random = random.Random(seed)
+
+    def pick_flow(self) -> dict:
+        return self.random.choices(self.flows, weights=self.weights)[0]
+
+    def value(self, name: str) -> str:
+        if name == "agent_id":
+            return self.random.choice(self.agent_ids) if self.agent_ids else str(uuid.uuid4())
+        if name == "uid":
+            return uuid.UUID(int=self.random.getrandbits(128)).hex[:12]
+        if name == "digits":
+            return f"{self.random.randrange(10 ** 7):07d}"
+        if name in self.variables:
+            return self.random.choice(self.variables[name])
+        raise KeyError(f"Unknown placeholder {{{name}}} in scenario {self.name}")
+
+    def fill(self, template, in_url: bool = False):
+        """Substitute placeholders in a string or a JSON structure"""
+        if isinstance(template, str):
+            return PLACEHOLDER.sub(
+                lambda match: quote(self.value(match.group(1))) if in_url else self.value(match.group(1)),
+                template,
+            )
+        if isinstance(template, list):
+            return [self.fill(item) for item in template]
+        if isinstance(template, dict):
+            return {key: self.fill(value) for key, value in template.items()}
+        return template
+
+    def capture(self, kind: str, response: httpx.Response):
+        if kind != "agent_ids" or response.status_code >= 400:
+            return
+        body = response.json()
+        rows = body if isinstance(body, list) else [body]
+        ids = [row["id"] for row in rows if isinstance(row, dict) and "id" in row]
+        self.agent_ids = (self.agent_ids + ids)[-MAX_CAPTURED_IDS:]
+
+
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)  # step or flow name -> ms
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.dropped = 0
+
+    def record(self, name: str, elapsed_ms: float, status):
+        self.latencies[name].append(elapsed_ms)
+        self.statuses[name][status] += 1
+
+
+async def run_flow(client: httpx.AsyncClient, scenario: Scenario, results: Results, scheduled=None):
+    flow = scenario.pick_flow()
+    for step in flow["steps"]:
+        label = f"{flow['name']}: {step['method']} {step['path']}"
+        url = scenario.fill(step["path"], in_url=True)
+        body = scenario.fill(step["json"]) if "json" in step else None
+        start = time.perf_counter()
+        try:
+            response = await client.request(step["method"], url, json=body)
+            status = response.status_code
+            if "capture" in step:
+                scenario.capture(step["capture"], response)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        results.record(label, (time.perf_counter() - start) * 1000, status)
+    if scheduled is not None:
+        # Open loop: include the time the flow waited to be started
+        results.record(f"flow {flow['name']} (from schedule)", (time.perf_counter() - scheduled) * 1000, "-")
+
+
+async def closed_loop(client, scenario, results, concurrency: int, duration: float):
+    deadline = time.perf_counter() + duration
+
+    async def user():
+        while time.perf_counter() < deadline:
+            await run_flow(client, scenario, results)
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+
+
+async def open_loop(client, scenario, results, rate: float, duration: float, max_in_flight: int):
+    tasks = set()
+    start = time.perf_counter()
+    next_arrival = start
+    while next_arrival < start + duration:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(tasks) >= max_in_flight:
+            results.dropped += 1
+        else:
+            task = asyncio.create_task(run_flow(client, scenario, results, scheduled=next_arrival))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        next_arrival += scenario.random.expovariate(rate)
+    await asyncio.gather(*tasks)
+
+
+def report(results: Results, wall: float):
+    total = sum(len(samples) for name, samples in results.latencies.items() if not name.startswith("flow "))
+    print()
+    for name in sorted(results.latencies):
+        samples = results.latencies[name]
+        summarize(name[:40], samples)
+        statuses = results.statuses[name]
+        if "-" not in statuses:
+            codes = ", ".join(f"{code}: {count}" for code, count in sorted(statuses.items(), key=str))
+            print(f"{'':<40} {len(samples) / wall:,.1f} req/s  [{codes}]")
+    requests = [ms for name, samples in results.latencies.items() if not name.startswith("flow ") for ms in samples]
+    errors = sum(
+        count for name, statuses in results.statuses.items() for code, count in statuses.items()
+        if code != "-" and not (isinstance(code, int) and code < 400)
+    )
+    print()
+    print(f"{total} requests in {wall:.1f}s: {total / wall:,.1f} req/s, {errors} errors, "
+          f"p50={percentile(requests, 50):.1f}ms p95={percentile(requests, 95):.1f}ms p99={percentile(requests, 99):.1f}ms")
+    if results.dropped:
+        print(f"{results.dropped} flows not started because --max-in-flight was reached")
+
+
+async def main(args):
+    host = urlsplit(args.base_url).hostname
+    if host not in LOCAL_HOSTS:
+        raise SystemExit(f"Refusing to load test {host}; point --base-url at a local instance")
+
+    scenario = Scenario(Path(args.scenario), args.seed)
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        # Seed the id pool so profile/comment flows hit real agents from the start
+        scenario.capture("agent_ids", await client.get("/api/agents", params={"limit": 1000}))
+        print(f"Scenario {scenario.name}: {len(scenario.flows)} flows, {len(scenario.agent_ids)} agent ids, "
+              f"{args.mode} loop for {args.duration}s")
+
+        results = Results()
+        wall = time.perf_counter()
+        if args.mode == "closed":
+            await closed_loop(client, scenario, results, args.concurrency, args.duration)
+        else:
+            await open_loop(client, scenario, results, args.rate, args.duration, args.max_in_flight)
+        report(results, time.perf_counter() - wall)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--scenario", default=str(SCENARIO_DIR / "frontend_mix.json"))
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed")
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users (closed loop)")
+    parser.add_argument("--rate", type=float, default=50.0, help="flow arrivals per second (open loop)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="cap on concurrent flows (open loop)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,25 @@
+"""
+The hot-path cases of bench_hot_paths.py as a pytest-benchmark suite.
+
+Not collected by the default test run (pytest.ini only looks in tests/);
+run it explicitly, saving a baseline and then failing on regressions:
+
+    pytest backend/benchmarks/test_hot_paths.py --benchmark-disable-gc --benchmark-autosave
+    pytest backend/benchmarks/test_hot_paths.py --benchmark-disable-gc \\
+        --benchmark-compare --benchmark-compare-fail=min:20%
+
+Saved runs go to .benchmarks/ in the working directory, keyed by machine and
+Python version, and like the script's baselines are not committed.
+"""
+
+import pytest
+
+from bench_hot_paths import build_cases
+
+CASES = build_cases()
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_hot_path(benchmark, name):
+    benchmark.group = "hot_paths"
+    benchmark(CASES[name])
@@ -0,0 +1,196 @@
+"""
+Server-Sent Events feed of changes made through the API.
+
+Write paths publish small events (agent-created, agent-updated,
+comment-created, tags-changed) and every connected client receives them, so
+pages apply the change locally instead of refetching whole lists. Each event is encoded
+once and the same bytes are appended to every subscriber's buffer, so
+publishing costs one deque append and one wakeup per client.
+
+Buffers are bounded: a client that falls `buffer_size` events behind has
+its backlog dropped and gets a `resync` event telling it to refetch, so
+one stalled connection can't hold memory for the rest. Recent events are
+kept so that a reconnecting EventSource (which sends Last-Event-ID) gets
+what it missed; if they are no longer kept, or the id is from before a
+restart, it gets `resync` too. Streams end after `max_seconds` and the
+browser reconnects transparently, which also lets graceful shutdown finish.
+
+Streams are exempt from request rate limiting, so connections are capped
+instead: `max_clients` in total and `max_per_client` per client address,
+so one client can't hold every slot.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, Optional
+
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+FEED_EVENTS = Counter("atlas_change_feed_events_total", "Events published to the change feed", ("event",))
+FEED_RESYNCS = Counter("atlas_change_feed_resyncs_total", "Clients told to refetch instead of replaying events",
+                       ("reason",))
+
+RESYNC_FRAME = b"event: resync\ndata: {}\n\n"
+HEARTBEAT_FRAME = b": ping\n\n"
+
+
+class FeedFull(Exception):
+    """The feed is at max_clients; retry later"""
+
+
+class ClientStreamLimit(FeedFull):
+    """This client already has max_per_client streams open"""
+
+
+class Subscriber:
+    __slots__ = ("frames", "wakeup", "closed", "connected_at", "client")
+
+    def __init__(self, client: str = ""):
+        self.frames = deque()
+        self.wakeup = asyncio.Event()
+        self.closed = False
+        self.connected_at = time.monotonic()
+        self.client = client
+
+
+class ChangeFeed:
+    def __init__(self, buffer_size: int = 256, history: int = 1024, max_clients: int = 10000,
+                 max_per_client: int = 32, heartbeat: float = 15.0, max_seconds: float = 300.0,
+                 retry_ms: int = 3000):
+        self.buffer_size = buffer_size
+        self.max_clients = max_clients
+        self.max_per_client = max_per_client
+        self.heartbeat = heartbeat
+        self.max_seconds = max_seconds
+        self.retry_ms = retry_ms
+        self.published = 0
+        self.overflows = 0
+        self.rejected = 0
+        self.rejected_per_client = 0
+        # Event ids are "<epoch>-<sequence>" so ids from before a restart are recognised
+        self._epoch = os.urandom(4).hex()
+        self._sequence = 0
+        self._history = deque(maxlen=history)  # (sequence, frame)
+        self._subscribers = set()
+        self._per_client = {}  # client address -> open streams
+
+    def publish(self, event: str, data) -> None:
+        """Send an event to every connected client; call from the event loop"""
+        self._sequence += 1
+        payload = json.dumps(data, default=str, separators=(",", ":"))
+        frame = f"id: {self._epoch}-{self._sequence}\nevent: {event}\ndata: {payload}\n\n".encode()
+        self._history.append((self._sequence, frame))
+        self.published += 1
+        FEED_EVENTS.inc(event)
+        for subscriber in self._subscribers:
+            self._push(subscriber, frame)
+
+    def _push(self, subscriber: Subscriber, frame: bytes):
+        if len(subscriber.frames) >= self.buffer_size:
+            # Too far behind to be worth catching up event by event
+            subscriber.frames.clear()
+            subscriber.frames.append(RESYNC_FRAME)
+            self.overflows += 1
+            FEED_RESYNCS.inc("overflow")
+        subscriber.frames.append(frame)
+        subscriber.wakeup.set()
+
+    def subscribe(self, last_event_id: Optional[str] = None, client: str = "") -> Subscriber:
+        """Register a client, queueing what it missed since `last_event_id`.
+
+        Raises FeedFull when the feed is full and ClientStreamLimit when this
+        client address already has max_per_client streams open.
+        """
+        if len(self._subscribers) >= self.max_clients:
+            self.rejected += 1
+            raise FeedFull(f"Change feed is at its limit of {self.max_clients} clients")
+        if self._per_client.get(client, 0) >= self.max_per_client:
+            self.rejected_per_client += 1
+            raise ClientStreamLimit(f"At most {self.max_per_client} open streams per client")
+        subscriber = Subscriber(client)
+        if last_event_id:
+            missed = self._replay(last_event_id)
+            if missed is None:
+                subscriber.frames.append(RESYNC_FRAME)
+                FEED_RESYNCS.inc("reconnect")
+            else:
+                subscriber.frames.extend(missed[-self.buffer_size:])
+        self._subscribers.add(subscriber)
+        self._per_client[client] = self._per_client.get(client, 0) + 1
+        return subscriber
+
+    def _replay(self, last_event_id: str) -> Optional[list]:
+        """Frames after last_event_id, or None if they can't all be replayed"""
+        epoch, _, sequence = last_event_id.partition("-")
+        if epoch != self._epoch or not sequence.isdigit():
+            return None
+        sequence = int(sequence)
+        if sequence > self._sequence:
+            return None
+        if sequence < self._sequence and (not self._history or self._history[0][0] > sequence + 1):
+            return None
+        return [frame for number, frame in self._history if number > sequence]
+
+    async def stream(self, subscriber: Subscriber) -> AsyncIterator[bytes]:
+        """Body of a text/event-stream response for a subscribed client"""
+        try:
+            yield f"retry: {self.retry_ms}\n\n".encode()
+            deadline = subscriber.connected_at + self.max_seconds
+            while not subscriber.closed:
+                if not subscriber.frames:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    subscriber.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(subscriber.wakeup.wait(), min(self.heartbeat, remaining))
+                    except asyncio.TimeoutError:
+                        # Keeps proxies from timing out an idle connection
+                        yield HEARTBEAT_FRAME
+                    continue
+                frames = b"".join(subscriber.frames)
+                subscriber.frames.clear()
+                yield frames
+        finally:
+            self.unsubscribe(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber):
+        # Called by both the stream and the response's cleanup; only the first counts
+        if subscriber not in self._subscribers:
+            return
+        self._subscribers.remove(subscriber)
+        remaining = self._per_client[subscriber.client] - 1
+        if remaining:
+            self._per_client[subscriber.client] = remaining
+        else:
+            del self._per_client[subscriber.client]
+
+    def close(self):
+        """End every open stream (clients reconnect to the next server)"""
+        for subscriber in self._subscribers:
+            subscriber.closed = True
+            subscriber.wakeup.set()
+        if self._subscribers:
+            logger.info(f"Closing {len(self._subscribers)} change feed streams")
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self._subscribers),
+            "max_clients": self.max_clients,
+            "max_per_client": self.max_per_client,
+            "client_addresses": len(self._per_client),
+            "published": self.published,
+            "last_event_id": f"{self._epoch}-{self._sequence}",
+            "history": len(self._history),
+            "buffer_size": self.buffer_size,
+            "buffered": sum(len(subscriber.frames) for subscriber in self._subscribers),
+            "overflows": self.overflows,
+            "rejected": self.rejected,
+            "rejected_per_client": self.rejected_per_client,
+        }
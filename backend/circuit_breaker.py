@@ -0,0 +1,122 @@
+"""
+Circuit breaker for calls to a flaky dependency.
+
+Closed: calls go through and their outcomes are tracked over a sliding
+window; errors and calls slower than `slow_threshold` both count as
+failures. When the failure rate over at least `min_calls` calls reaches
+`error_rate`, the breaker opens and calls fail immediately with
+CircuitOpen instead of each waiting out its timeout. After `open_seconds`
+it lets `half_open_calls` trial calls through: a success closes it again,
+a failure re-opens it.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+from metrics import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = Gauge("atlas_circuit_breaker_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ("breaker",))
+BREAKER_REJECTED = Counter("atlas_circuit_breaker_rejected_total", "Calls refused by an open circuit breaker", ("breaker",))
+
+
+class CircuitOpen(Exception):
+    """Raised instead of making a call while the breaker is open"""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, window: float = 30.0, min_calls: int = 10, error_rate: float = 0.5,
+                 slow_threshold: float = 3.0, open_seconds: float = 15.0, half_open_calls: int = 1):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_threshold = slow_threshold
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._trials = 0
+        self._calls = deque()  # (monotonic time, failed)
+        self._failures = 0
+        self._lock = threading.Lock()
+        BREAKER_STATE.set(0, name)
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpen if the call may not be made; returns whether it is a half-open trial"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+                self._set_state(HALF_OPEN)
+            if self.state == CLOSED:
+                return False
+            if self.state == HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return True
+            self.rejected += 1
+        BREAKER_REJECTED.inc(self.name)
+        retry_in = max(0.0, self.open_seconds - (time.monotonic() - self.opened_at))
+        raise CircuitOpen(f"{self.name} is unavailable (circuit open, next attempt in {retry_in:.0f}s)")
+
+    def record(self, ok: bool, elapsed: float, trial: bool = False):
+        """Report the outcome of a call allowed by before_call()"""
+        failed = not ok or elapsed >= self.slow_threshold
+        now = time.monotonic()
+        with self._lock:
+            if trial:
+                self._trials = max(0, self._trials - 1)
+                if self.state != HALF_OPEN:
+                    return
+                if failed:
+                    self._open(now)
+                else:
+                    self._calls.clear()
+                    self._failures = 0
+                    self._set_state(CLOSED)
+                return
+            if self.state != CLOSED:
+                # Started before the breaker opened; trial calls decide from here
+                return
+            self._calls.append((now, failed))
+            self._failures += failed
+            while self._calls and self._calls[0][0] < now - self.window:
+                self._failures -= self._calls.popleft()[1]
+            if len(self._calls) >= self.min_calls and self._failures >= self.error_rate * len(self._calls):
+                self._open(now)
+
+    def _open(self, now: float):
+        self.opened_at = now
+        self.times_opened += 1
+        self._set_state(OPEN)
+
+    def _set_state(self, state: str):
+        if state == self.state:
+            return
+        if state == OPEN:
+            logger.warning(f"Circuit breaker {self.name} opened for {self.open_seconds:g}s "
+                           f"({self._failures}/{len(self._calls)} recent calls failed or were slow)")
+        else:
+            logger.info(f"Circuit breaker {self.name} is {state.replace('_', '-')}")
+        self.state = state
+        BREAKER_STATE.set(_STATE_VALUES[state], self.name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = len(self._calls)
+            return {
+                "state": self.state,
+                "recent_calls": calls,
+                "recent_failure_rate": round(self._failures / calls, 3) if calls else 0.0,
+                "error_rate_threshold": self.error_rate,
+                "slow_threshold_ms": self.slow_threshold * 1000,
+                "open_seconds": self.open_seconds,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
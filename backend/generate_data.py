@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic directory data for benchmarks.
+
+Generates N agents and on average M comments per agent from a seeded RNG:
+tags drawn from DEFAULT_TAGS, coordinates clustered around metro areas,
+Zipf-distributed brokerages and service areas, and comment ratings from
+RATING_LEVELS. The same seed always produces the same rows.
+
+    # NDJSON files for benchmarks/fake_postgrest.py --seed-dir
+    python generate_data.py --agents 1000000 --comments-per-agent 3 --out /tmp/atlas-data
+    # or bulk upsert into the Supabase project from .env
+    python generate_data.py --agents 10000 --upsert
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from bisect import bisect
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+from constants import DEFAULT_TAGS, RATING_LEVELS
+
+# (city, county, state code, state, latitude, longitude), largest markets first
+METROS = [
+    ("New York", "New York County", "NY", "New York", 40.7128, -74.0060),
+    ("Los Angeles", "Los Angeles County", "CA", "California", 34.0522, -118.2437),
+    ("Chicago", "Cook County", "IL", "Illinois", 41.8781, -87.6298),
+    ("Houston", "Harris County", "TX", "Texas", 29.7604, -95.3698),
+    ("Phoenix", "Maricopa County", "AZ", "Arizona", 33.4484, -112.0740),
+    ("Dallas", "Dallas County", "TX", "Texas", 32.7767, -96.7970),
+    ("Miami", "Miami-Dade County", "FL", "Florida", 25.7617, -80.1918),
+    ("Atlanta", "Fulton County", "GA", "Georgia", 33.7490, -84.3880),
+    ("Philadelphia", "Philadelphia County", "PA", "Pennsylvania", 39.9526, -75.1652),
+    ("Washington", "District of Columbia", "DC", "District of Columbia", 38.9072, -77.0369),
+    ("Boston", "Suffolk County", "MA", "Massachusetts", 42.3601, -71.0589),
+    ("San Francisco", "San Francisco County", "CA", "California", 37.7749, -122.4194),
+    ("Seattle", "King County", "WA", "Washington", 47.6062, -122.3321),
+    ("San Diego", "San Diego County", "CA", "California", 32.7157, -117.1611),
+    ("Denver", "Denver County", "CO", "Colorado", 39.7392, -104.9903),
+    ("Austin", "Travis County", "TX", "Texas", 30.2672, -97.7431),
+    ("Tampa", "Hillsborough County", "FL", "Florida", 27.9506, -82.4572),
+    ("Orlando", "Orange County", "FL", "Florida", 28.5383, -81.3792),
+    ("Charlotte", "Mecklenburg County", "NC", "North Carolina", 35.2271, -80.8431),
+    ("Nashville", "Davidson County", "TN", "Tennessee", 36.1627, -86.7816),
+    ("Las Vegas", "Clark County", "NV", "Nevada", 36.1699, -115.1398),
+    ("Minneapolis", "Hennepin County", "MN", "Minnesota", 44.9778, -93.2650),
+    ("Portland", "Multnomah County", "OR", "Oregon", 45.5152, -122.6784),
+    ("San Antonio", "Bexar County", "TX", "Texas", 29.4241, -98.4936),
+    ("Sacramento", "Sacramento County", "CA", "California", 38.5816, -121.4944),
+    ("Raleigh", "Wake County", "NC", "North Carolina", 35.7796, -78.6382),
+    ("Salt Lake City", "Salt Lake County", "UT", "Utah", 40.7608, -111.8910),
+    ("Columbus", "Franklin County", "OH", "Ohio", 39.9612, -82.9988),
+    ("Indianapolis", "Marion County", "IN", "Indiana", 39.7684, -86.1581),
+    ("Kansas City", "Jackson County", "MO", "Missouri", 39.0997, -94.5786),
+    ("Jacksonville", "Duval County", "FL", "Florida", 30.3322, -81.6557),
+    ("San Jose", "Santa Clara County", "CA", "California", 37.3382, -121.8863),
+    ("Pittsburgh", "Allegheny County", "PA", "Pennsylvania", 40.4406, -79.9959),
+    ("Cincinnati", "Hamilton County", "OH", "Ohio", 39.1031, -84.5120),
+    ("Boise", "Ada County", "ID", "Idaho", 43.6150, -116.2023),
+    ("Scottsdale", "Maricopa County", "AZ", "Arizona", 33.4942, -111.9261),
+    ("Naples", "Collier County", "FL", "Florida", 26.1420, -81.7948),
+    ("Charleston", "Charleston County", "SC", "South Carolina", 32.7765, -79.9311),
+    ("Albuquerque", "Bernalillo County", "NM", "New Mexico", 35.0844, -106.6504),
+    ("Honolulu", "Honolulu County", "HI", "Hawaii", 21.3069, -157.8583),
+]
+
+NATIONAL_BROKERAGES = [
+    "Keller Williams", "RE/MAX", "Coldwell Banker", "Century 21", "Compass",
+    "eXp Realty", "Berkshire Hathaway HomeServices", "Sotheby's International Realty",
+    "Redfin", "Douglas Elliman", "Howard Hanna", "Weichert Realtors",
+    "Better Homes and Gardens Real Estate", "ERA Real Estate", "Engel & Voelkers",
+]
+BROKERAGE_SUFFIXES = ["Realty", "Real Estate Group", "Properties", "Homes", "Realty Partners", "Real Estate Co"]
+
+FIRST_NAMES = [
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Carlos", "Karen",
+    "Daniel", "Lisa", "Matthew", "Nancy", "Anthony", "Betty", "Mark", "Sandra", "Luis", "Ashley",
+    "Steven", "Kimberly", "Andrew", "Emily", "Joshua", "Donna", "Kevin", "Michelle", "Brian", "Maria",
+    "Wei", "Priya", "Ahmed", "Fatima", "Hiroshi", "Mei", "Olga", "Ivan", "Aisha", "Diego",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson",
+    "Walker", "Young", "Allen", "King", "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores",
+    "Patel", "Kim", "Chen", "Singh", "Cohen", "Murphy", "O'Brien", "Novak", "Khan", "Rossi",
+]
+SUBMITTERS = ["Admin", "Sarah Team Lead", "Marcus", "Jenna", "Ops", "Referral Desk", "Dev"]
+STREETS = ["Main St", "Oak Ave", "Maple Dr", "Cedar Ln", "Park Blvd", "Lake Rd", "Hill St", "Sunset Way", "Elm St", "River Rd"]
+COMMENT_SNIPPETS = {
+    "exceptional": ["Closed ahead of schedule and kept everyone informed.", "Best negotiator we've worked with."],
+    "great": ["Very responsive, smooth closing.", "Good communication throughout the deal."],
+    "average": ["Got the deal done, but slow to respond.", "Fine overall, nothing special."],
+    "poor": ["Missed several deadlines.", "Hard to reach during escrow."],
+    "blacklist": ["Deal fell apart because of them.", "Unprofessional, would not work with again."],
+}
+# Reviews skew positive, as they do in practice
+RATING_WEIGHTS = {"exceptional": 30, "great": 35, "average": 20, "poor": 10, "blacklist": 5}
+TAG_COUNT_WEIGHTS = [(1, 15), (2, 30), (3, 30), (4, 15), (5, 10)]
+
+EPOCH = datetime(2022, 1, 1)
+SPAN_SECONDS = 3 * 365 * 24 * 3600
+# Agents per RNG stream / unit of parallel work
+CHUNK_SIZE = 10000
+
+
+def zipf_weights(n: int, s: float = 1.1) -> List[float]:
+    """Cumulative Zipf weights for ranks 1..n (for random.choices(cum_weights=...))"""
+    return list(itertools.accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def make_brokerages(seed: int, count: int) -> List[str]:
+    """National brands at the head of the distribution, local firms in the long tail"""
+    rng = random.Random(f"{seed}:brokerages")
+    local = set()
+    # Bounded by the number of distinct name combinations
+    count = min(count, len(NATIONAL_BROKERAGES) + len(LAST_NAMES) ** 2 * len(BROKERAGE_SUFFIXES) // 2)
+    while len(local) < count - len(NATIONAL_BROKERAGES):
+        local.add(f"{rng.choice(LAST_NAMES)} & {rng.choice(LAST_NAMES)} {rng.choice(BROKERAGE_SUFFIXES)}")
+    return NATIONAL_BROKERAGES + sorted(local)
+
+
+class _Picker:
+    """Weighted choice by bisecting cumulative weights (random.choices without its per-call setup)"""
+
+    def __init__(self, items, cum_weights):
+        self.items = list(items)
+        self.cum_weights = list(cum_weights)
+        self.total = self.cum_weights[-1]
+
+    def __call__(self, rng: random.Random):
+        return self.items[bisect(self.cum_weights, rng.random() * self.total)]
+
+
+@lru_cache(maxsize=None)
+def _slug(text: str) -> str:
+    return "".join(ch for ch in text.lower() if ch.isalnum())
+
+
+def _uuid(rng: random.Random) -> str:
+    h = "%032x" % rng.getrandbits(128)
+    return f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{'89ab'[int(h[16], 16) & 3]}{h[17:20]}-{h[20:]}"
+
+
+def _offset(rng: random.Random, after: int = 0) -> int:
+    """Seconds from EPOCH, uniform over the rest of the span after `after`"""
+    return after + int(rng.random() * (SPAN_SECONDS - after))
+
+
+def _timestamp(offset: int) -> str:
+    return (EPOCH + timedelta(seconds=offset)).isoformat()
+
+
+class _Vocabulary:
+    """Weighted pickers shared by every chunk of a run"""
+
+    def __init__(self, seed: int, brokerages: int):
+        self.metro = _Picker(METROS, zipf_weights(len(METROS), s=0.9))
+        names = make_brokerages(seed, brokerages)
+        self.brokerage = _Picker(names, zipf_weights(len(names)))
+        self.tag = _Picker(DEFAULT_TAGS, zipf_weights(len(DEFAULT_TAGS), s=0.7))
+        self.tag_count = _Picker([count for count, _ in TAG_COUNT_WEIGHTS],
+                                 itertools.accumulate(weight for _, weight in TAG_COUNT_WEIGHTS))
+        self.tag_order = {tag: index for index, tag in enumerate(DEFAULT_TAGS)}
+        self.submitter = _Picker(SUBMITTERS, zipf_weights(len(SUBMITTERS)))
+        self.area_type = _Picker(("city", "county", "state"), (80, 95, 100))
+        keys = [key for key in RATING_LEVELS if key in RATING_WEIGHTS]
+        self.rating = _Picker(keys, itertools.accumulate(RATING_WEIGHTS[key] for key in keys))
+        self.rating_value = {key: RATING_LEVELS[key]["value"] for key in keys}
+
+    def tags(self, rng: random.Random) -> List[str]:
+        count = self.tag_count(rng)
+        tags = set()
+        while len(tags) < count:
+            tags.add(self.tag(rng))
+        return sorted(tags, key=self.tag_order.__getitem__)
+
+
+def generate_chunk(seed: int, chunk: int, start: int, stop: int, comments_per_agent: float,
+                   brokerages: int) -> List[Tuple[dict, List[dict]]]:
+    """Agents start..stop-1 with their comments.
+
+    Each chunk has its own RNG stream derived from (seed, chunk), so the output
+    is the same however many worker processes generate it.
+    """
+    vocabulary = _vocabulary(seed, brokerages)
+    rng = random.Random(f"{seed}:{chunk}")
+    max_comments = int(comments_per_agent * 10)
+    rows = []
+    for index in range(start, stop):
+        city, county, code, state, lat, lon = vocabulary.metro(rng)
+        brokerage = vocabulary.brokerage(rng)
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        area_type = vocabulary.area_type(rng)
+        service_area = {"city": f"{city}, {code}", "county": f"{county}, {code}", "state": state}[area_type]
+        domain = _slug(brokerage)
+        name_slug = f"{_slug(first)}-{_slug(last)}"
+        agent_id = _uuid(rng)
+        # Comments are drawn after the agent so none predates it
+        created = _offset(rng)
+
+        comments = []
+        count = min(int(rng.expovariate(1 / comments_per_agent)), max_comments) if comments_per_agent else 0
+        for _ in range(count):
+            rating = vocabulary.rating(rng)
+            comments.append({
+                "id": _uuid(rng),
+                "agent_id": agent_id,
+                "author_name": vocabulary.submitter(rng),
+                "content": rng.choice(COMMENT_SNIPPETS[rating]),
+                "rating": rating,
+                "created_at": _timestamp(_offset(rng, created)),
+            })
+
+        rows.append(({
+            "id": agent_id,
+            "full_name": f"{first} {last}",
+            "brokerage": brokerage,
+            "phone": f"({int(rng.random() * 789) + 201}) {int(rng.random() * 800) + 200}-{int(rng.random() * 10000):04d}",
+            "email": f"{name_slug.replace('-', '.')}{index}@{domain}.com",
+            "website": f"https://www.{domain}.com/agents/{name_slug}-{index}",
+            "service_area_type": area_type,
+            "service_area": service_area,
+            "tags": vocabulary.tags(rng),
+            "address_last_deal": f"{int(rng.random() * 9999) + 1} {rng.choice(STREETS)}, {city}, {code}",
+            "submitted_by": vocabulary.submitter(rng),
+            "notes": None,
+            "profile_image": None,
+            # Clustered around the metro centre, roughly a 15 km spread
+            "latitude": round(rng.gauss(lat, 0.15), 6),
+            "longitude": round(rng.gauss(lon, 0.15 / max(0.2, math.cos(math.radians(lat)))), 6),
+            "rating": round(sum(vocabulary.rating_value[c["rating"]] for c in comments) / count, 2) if comments else 0.0,
+            "created_at": _timestamp(created),
+        }, comments))
+    return rows
+
+
+@lru_cache(maxsize=4)
+def _vocabulary(seed: int, brokerages: int) -> _Vocabulary:
+    return _Vocabulary(seed, brokerages)
+
+
+def _chunks(agents: int) -> List[Tuple[int, int, int]]:
+    return [(chunk, start, min(start + CHUNK_SIZE, agents))
+            for chunk, start in enumerate(range(0, agents, CHUNK_SIZE))]
+
+
+def generate(agents: int, comments_per_agent: float, seed: int = 1,
+             brokerages: int = 2000) -> Iterator[Tuple[dict, List[dict]]]:
+    """Yield (agent row, comment rows) pairs; deterministic for a given seed"""
+    for chunk, start, stop in _chunks(agents):
+        yield from generate_chunk(seed, chunk, start, stop, comments_per_agent, brokerages)
+
+
+def _encode_chunk(job) -> Tuple[str, str, int, int]:
+    rows = generate_chunk(*job)
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    agents = "".join(encode(agent) + "\n" for agent, _ in rows)
+    comments = "".join(encode(comment) + "\n" for _, agent_comments in rows for comment in agent_comments)
+    return agents, comments, len(rows), sum(len(agent_comments) for _, agent_comments in rows)
+
+
+def write_ndjson(out_dir: Path, agents: int, comments_per_agent: float, seed: int = 1,
+                 brokerages: int = 2000, workers: int = 1) -> Tuple[int, int]:
+    """Write agents.ndjson and comments.ndjson, chunks generated and encoded in parallel"""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    jobs = [(seed, chunk, start, stop, comments_per_agent, brokerages) for chunk, start, stop in _chunks(agents)]
+    agent_count = comment_count = 0
+    with open(out_dir / "agents.ndjson", "w") as agents_file, open(out_dir / "comments.ndjson", "w") as comments_file:
+        if workers > 1:
+            pool = ProcessPoolExecutor(workers)
+            results = pool.map(_encode_chunk, jobs)
+        else:
+            pool, results = None, map(_encode_chunk, jobs)
+        try:
+            # map() keeps chunk order, so files are identical for any worker count
+            for agents_text, comments_text, chunk_agents, chunk_comments in results:
+                agents_file.write(agents_text)
+                comments_file.write(comments_text)
+                agent_count += chunk_agents
+                comment_count += chunk_comments
+        finally:
+            if pool is not None:
+                pool.shutdown()
+    return agent_count, comment_count
+
+
+def upsert_batches(supabase, rows: Iterator[Tuple[dict, List[dict]]], batch_size: int = 1000) -> Tuple[int, int]:
+    """Bulk upsert into Supabase; comments go after their agents' batch (foreign key)"""
+    agent_count = comment_count = 0
+    agents, comments = [], []
+
+    def flush():
+        if agents:
+            supabase.table('agents').upsert(agents).execute()
+        for start in range(0, len(comments), batch_size):
+            supabase.table('comments').upsert(comments[start:start + batch_size]).execute()
+        agents.clear()
+        comments.clear()
+
+    for agent, agent_comments in rows:
+        agents.append(agent)
+        comments.extend(agent_comments)
+        agent_count += 1
+        comment_count += len(agent_comments)
+        if len(agents) >= batch_size:
+            flush()
+    flush()
+    return agent_count, comment_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=10000)
+    parser.add_argument("--comments-per-agent", type=float, default=3.0, help="mean (exponentially distributed)")
+    parser.add_argument("--brokerages", type=int, default=2000, help="distinct brokerages (Zipf)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", type=Path, help="directory for agents.ndjson and comments.ndjson")
+    parser.add_argument("--upsert", action="store_true", help="bulk upsert into the Supabase project from .env")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes for --out")
+    args = parser.parse_args()
+    if not args.out and not args.upsert:
+        parser.error("pass --out DIR and/or --upsert")
+
+    started = time.perf_counter()
+    if args.out:
+        written = write_ndjson(args.out, args.agents, args.comments_per_agent, args.seed, args.brokerages, args.workers)
+        print(f"Wrote {written[0]} agents and {written[1]} comments to {args.out}")
+    if args.upsert:
+        from dotenv import load_dotenv
+        from supabase import create_client
+
+        load_dotenv(Path(__file__).parent / '.env')
+        if not os.environ.get('SUPABASE_URL') or not os.environ.get('SUPABASE_SERVICE_KEY'):
+            sys.exit("Error: Missing Supabase credentials in .env file")
+        client = create_client(os.environ['SUPABASE_URL'], os.environ['SUPABASE_SERVICE_KEY'])
+        rows = generate(args.agents, args.comments_per_agent, args.seed, args.brokerages)
+        written = upsert_batches(client, rows, args.batch_size)
+        print(f"Upserted {written[0]} agents and {written[1]} comments")
+    print(f"Done in {time.perf_counter() - started:.1f}s")
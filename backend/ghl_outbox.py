@@ -0,0 +1,294 @@
+"""
+Durable outbox for GoHighLevel contact pushes.
+
+Pushes are written to a local SQLite table keyed by an idempotency key
+derived from the agent id and email, and a background dispatcher drains the
+table in batches. A push that times out is retried from the outbox instead of
+being lost, and an agent that was already synced is never sent twice. The key
+only exists locally, so a retry of a push that may have reached GoHighLevel
+(a timeout, a 5xx, or a crash mid-send) first looks the contact up by email.
+Bulk syncs go through the same table (sync_now), so an agent whose push is
+pending or in flight is left to the dispatcher, and they take their tokens
+from the dispatcher's bucket so that together they stay under GoHighLevel's
+rate limit.
+
+The table methods are blocking (SQLite with WAL commits); the dispatcher and
+sync_now run them in worker threads, and callers on the event loop should do
+the same (then call wake() after an enqueue).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import httpx
+
+from ghl_sync import (DEFAULT_BURST, DEFAULT_CONCURRENCY, DEFAULT_MAX_RETRIES, DEFAULT_RATE, MAX_BACKOFF,
+                      contact_payload, push_contact)
+from rate_limit import CombinedBuckets, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Outbox states
+PENDING = "pending"
+SENDING = "sending"
+SYNCED = "synced"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ghl_outbox (
+    id TEXT PRIMARY KEY,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    agent_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ghl_outbox_due ON ghl_outbox (status, next_attempt_at);
+"""
+
+COLUMNS = (
+    "id", "idempotency_key", "agent_id", "payload", "status", "attempts",
+    "last_error", "result", "created_at", "updated_at", "next_attempt_at",
+)
+
+
+def idempotency_key(agent_id: str, email: str) -> str:
+    return hashlib.sha256(f"{agent_id}|{email.strip().lower()}".encode()).hexdigest()
+
+
+class GHLOutbox:
+    """SQLite outbox table plus the dispatcher that drains it"""
+
+    def __init__(self, path, batch_size: int = 20, max_attempts: int = 8,
+                 poll_interval: float = 5.0, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.bucket = TokenBucket(rate, burst)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # Status counts as of the dispatcher's last pass, for the metrics gauge
+        self.counts = {PENDING: 0, SENDING: 0, SYNCED: 0, FAILED: 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def _row(self, row) -> Optional[dict]:
+        if row is None:
+            return None
+        job = dict(zip(COLUMNS, row))
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def enqueue(self, agent_id: str, payload: dict, wake: bool = True) -> dict:
+        """Record a push; returns the existing job if this agent/email was already queued"""
+        key = idempotency_key(agent_id, payload.get("email", ""))
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            existing = self._row(conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM ghl_outbox WHERE idempotency_key = ?", (key,)
+            ).fetchone())
+            if existing and existing["status"] != FAILED:
+                return existing
+            if existing:
+                # A previously failed push is retried from scratch
+                conn.execute(
+                    "UPDATE ghl_outbox SET status = ?, attempts = 0, payload = ?, updated_at = ?, "
+                    "next_attempt_at = ? WHERE id = ?",
+                    (PENDING, json.dumps(payload), now, now, existing["id"]),
+                )
+                job_id = existing["id"]
+            else:
+                job_id = str(uuid.uuid4())
+                conn.execute(
+                    "INSERT INTO ghl_outbox (id, idempotency_key, agent_id, payload, status, "
+                    "created_at, updated_at, next_attempt_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, key, agent_id, json.dumps(payload), PENDING, now, now, now),
+                )
+        if wake:
+            self.wake()
+        return self.get(job_id)
+
+    def wake(self):
+        """Have the dispatcher look for due jobs now; call from the event loop"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._row(self._connect().execute(
+                f"SELECT {', '.join(COLUMNS)} FROM ghl_outbox WHERE id = ?", (job_id,)
+            ).fetchone())
+
+    def claim(self, job_id: str) -> Optional[dict]:
+        """Mark one pending job as sending; None if another sender got it first"""
+        with self._lock:
+            conn = self._connect()
+            claimed = conn.execute(
+                "UPDATE ghl_outbox SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (SENDING, time.time(), job_id, PENDING),
+            ).rowcount
+        return self.get(job_id) if claimed else None
+
+    def claim_batch(self) -> List[dict]:
+        """Mark up to batch_size due jobs as sending and return them"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM ghl_outbox WHERE status = ? AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT ?",
+                (PENDING, now, self.batch_size),
+            ).fetchall()
+            jobs = [self._row(row) for row in rows]
+            conn.executemany(
+                "UPDATE ghl_outbox SET status = ?, updated_at = ? WHERE id = ?",
+                [(SENDING, now, job["id"]) for job in jobs],
+            )
+        return jobs
+
+    def complete(self, job: dict, outcome: dict):
+        """Store the outcome of a push attempt, scheduling a retry when needed"""
+        now = time.time()
+        attempts = job["attempts"] + outcome.get("attempts", 1)
+        if outcome["status"] == "success":
+            status, next_attempt, error = SYNCED, now, None
+        elif attempts >= self.max_attempts or outcome.get("retryable") is False:
+            status, next_attempt, error = FAILED, now, outcome.get("message")
+        else:
+            delay = min(MAX_BACKOFF * 10, 2 ** attempts)
+            status, next_attempt, error = PENDING, now + delay, outcome.get("message")
+        with self._lock:
+            self._connect().execute(
+                "UPDATE ghl_outbox SET status = ?, attempts = ?, last_error = ?, result = ?, "
+                "updated_at = ?, next_attempt_at = ? WHERE id = ?",
+                (status, attempts, error, json.dumps(outcome.get("data")), now, next_attempt, job["id"]),
+            )
+
+    def recover(self) -> int:
+        """Requeue jobs left in `sending` by a crash; they may or may not have reached GHL"""
+        with self._lock:
+            return self._connect().execute(
+                "UPDATE ghl_outbox SET status = ?, last_error = ? WHERE status = ?",
+                (PENDING, "interrupted while sending", SENDING),
+            ).rowcount
+
+    @staticmethod
+    def may_exist(job: dict) -> bool:
+        """Whether an earlier attempt could have created the contact, so it must be looked up first"""
+        return job["attempts"] > 0 or job["last_error"] is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT status, COUNT(*) FROM ghl_outbox GROUP BY status"
+            ).fetchall()
+        counts = {PENDING: 0, SENDING: 0, SYNCED: 0, FAILED: 0}
+        counts.update(dict(rows))
+        self.counts = counts
+        return {**counts, "dispatcher_running": self._task is not None and not self._task.done()}
+
+    async def start(self, client_factory: Callable[[], httpx.AsyncClient]):
+        """Start the background dispatcher"""
+        if self._task is not None:
+            return
+        recovered = await asyncio.to_thread(self.recover)
+        if recovered:
+            logger.info(f"Requeued {recovered} interrupted GoHighLevel pushes")
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._dispatch(client_factory))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _dispatch(self, client_factory: Callable[[], httpx.AsyncClient]):
+        while True:
+            # Cleared before looking, so an enqueue during the lookup isn't missed
+            self._wakeup.clear()
+            jobs = await asyncio.to_thread(self.claim_batch)
+            if not jobs:
+                await asyncio.to_thread(self.stats)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            client = client_factory()
+            outcomes = await asyncio.gather(
+                *(push_contact(client, job["payload"], self.bucket, max_retries=1, check_existing=self.may_exist(job))
+                  for job in jobs),
+                return_exceptions=True,
+            )
+            for job, outcome in zip(jobs, outcomes):
+                if isinstance(outcome, Exception):
+                    outcome = {"status": "error", "message": repr(outcome)}
+                await asyncio.to_thread(self.complete, job, outcome)
+            await asyncio.to_thread(self.stats)
+
+    async def sync_now(self, client: httpx.AsyncClient, agents: List[dict], rate: Optional[float] = None,
+                       burst: int = DEFAULT_BURST, concurrency: int = DEFAULT_CONCURRENCY,
+                       max_retries: int = DEFAULT_MAX_RETRIES,
+                       on_result: Optional[Callable[[dict], None]] = None) -> List[dict]:
+        """Push agents right away, recording each push here first.
+
+        Pushes share the dispatcher's bucket; `rate` can only slow them further.
+        Synced agents are skipped and agents whose push is pending or in flight
+        elsewhere are reported as queued. Returns one result per agent, in order.
+        """
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+        bucket = CombinedBuckets(TokenBucket(rate, burst), self.bucket) if rate is not None else self.bucket
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def sync_one(agent: dict) -> dict:
+            job = await asyncio.to_thread(self.enqueue, agent['id'], contact_payload(agent), False)
+            result = {"agent_id": agent['id'], "email": agent.get('email'), "job_id": job["id"]}
+            if job["status"] == SYNCED:
+                result.update(status="success", skipped=True)
+            else:
+                async with semaphore:
+                    claimed = await asyncio.to_thread(self.claim, job["id"])
+                    if claimed is None:
+                        result.update(status="queued")
+                    else:
+                        outcome = await push_contact(client, claimed["payload"], bucket, max_retries,
+                                                     check_existing=self.may_exist(claimed))
+                        await asyncio.to_thread(self.complete, claimed, outcome)
+                        result.update(outcome)
+            if on_result is not None:
+                on_result(result)
+            return result
+
+        return await asyncio.gather(*(sync_one(agent) for agent in agents))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Bulk GoHighLevel contact sync.
+
+Pushes many agents to GoHighLevel through a token bucket with bounded
+concurrency, retrying 429 and 5xx responses with exponential backoff. Every
+push is recorded in the outbox (GHLOutbox.sync_now) so agents already synced
+or queued are not sent twice. Used by POST /api/ghl/bulk-sync (as a
+background BulkSyncJobs job) and runnable from the command line:
+
+    python ghl_sync.py --submitted-by "Jane" --rate 5 --concurrency 4
+    python ghl_sync.py --agent-id <id> --agent-id <id> --base-url http://127.0.0.1:9100/
+"""
+
+import argparse
+import asyncio
+import email.utils
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from http_clients import OutboundClients
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# GoHighLevel allows roughly 100 requests per 10 seconds per location
+DEFAULT_RATE = 8.0
+DEFAULT_BURST = 10
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_RETRIES = 5
+MAX_BACKOFF = 30.0
+
+
+def contact_payload(agent: dict) -> dict:
+    """Map an agent row onto a GoHighLevel contact"""
+    name_parts = agent['full_name'].split(' ', 1)
+    return {
+        "firstName": name_parts[0],
+        "lastName": name_parts[1] if len(name_parts) > 1 else "",
+        "email": agent['email'],
+        "phone": agent['phone'],
+        "website": agent.get('website'),
+        "companyName": agent.get('brokerage'),
+        "source": "Atlas Directory",
+    }
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date"""
+    value = response.headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# Failures that happen before the request is sent; anything else may have created the contact
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+async def find_contact(client: httpx.AsyncClient, email: str, bucket: TokenBucket) -> Optional[dict]:
+    """The GoHighLevel contact with this email, or None; raises HTTPStatusError on 429/5xx"""
+    await bucket.acquire()
+    response = await client.get("contacts/lookup", params={"email": email})
+    if response.status_code == 429 or response.status_code >= 500:
+        raise httpx.HTTPStatusError(f"GHL API error: {response.status_code}", request=response.request,
+                                    response=response)
+    if response.status_code != 200:
+        # GHL answers 400/404/422 when no contact has the email
+        return None
+    contacts = response.json().get("contacts") or []
+    return contacts[0] if contacts else None
+
+
+async def push_contact(
+    client: httpx.AsyncClient,
+    payload: dict,
+    bucket: TokenBucket,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    base_delay: float = 0.5,
+    check_existing: bool = False,
+) -> dict:
+    """Create one contact, retrying rate limits, server errors and network failures.
+
+    A timed-out or 5xx create may still have reached GoHighLevel, so before
+    retrying one (or before the first attempt, with `check_existing`) the
+    contact is looked up by email and an existing one is returned instead.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        response = None
+        try:
+            if check_existing and payload.get("email"):
+                existing = await find_contact(client, payload["email"], bucket)
+                if existing is not None:
+                    return {"status": "success", "attempts": attempt, "data": {"contact": existing}, "existing": True}
+                check_existing = False
+            await bucket.acquire()
+            response = await client.post("contacts/", json=payload)
+        except httpx.HTTPStatusError as e:
+            response = e.response
+            message = str(e)
+        except httpx.TransportError as e:
+            message = f"Failed to create GHL contact: {e!r}"
+            check_existing = check_existing or not isinstance(e, NOT_SENT_ERRORS)
+        else:
+            if response.status_code in [200, 201]:
+                return {"status": "success", "attempts": attempt, "data": response.json()}
+            message = f"GHL API error: {response.status_code}"
+            if response.status_code != 429 and response.status_code < 500:
+                # Validation and auth errors won't get better by retrying
+                return {"status": "error", "attempts": attempt, "message": message, "retryable": False}
+            check_existing = response.status_code >= 500
+
+        if attempt > max_retries:
+            return {"status": "error", "attempts": attempt, "message": message}
+
+        delay = None
+        if response is not None and response.status_code == 429:
+            # Everyone sharing the bucket should back off, not just this task
+            bucket.drain()
+            delay = retry_after_seconds(response)
+        if delay is None:
+            delay = min(MAX_BACKOFF, base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+        await asyncio.sleep(delay)
+
+
+def select_agents(
+    supabase,
+    agent_ids: Optional[List[str]] = None,
+    submitted_by: Optional[str] = None,
+    service_area: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    limit: int = 1000,
+) -> List[dict]:
+    """Load the agents to sync, by id or by the same filters as GET /api/agents"""
+    query = supabase.table('agents').select("*")
+    if agent_ids:
+        query = query.in_('id', agent_ids)
+    if submitted_by:
+        query = query.eq('submitted_by', submitted_by)
+    if service_area:
+        query = query.ilike('service_area', f'%{service_area}%')
+    for tag in tags or []:
+        query = query.contains('tags', [tag])
+    return query.limit(limit).execute().data
+
+
+class BulkSyncJobs:
+    """Bulk syncs running in the background, kept for status polling"""
+
+    def __init__(self, history_size: int = 100):
+        self.history_size = history_size
+        self.jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self._tasks = {}
+
+    def submit(self, run: Callable[[Callable[[dict], None]], Awaitable[List[dict]]], total: int) -> dict:
+        """Start `run(on_result)` in the background and return its job"""
+        job = {
+            "id": str(uuid.uuid4()),
+            "status": "running",
+            "total": total,
+            "completed": 0,
+            "summary": None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        self.jobs[job["id"]] = job
+        while len(self.jobs) > self.history_size:
+            oldest = next(iter(self.jobs))
+            if oldest in self._tasks:
+                break
+            self.jobs.popitem(last=False)
+        self._tasks[job["id"]] = asyncio.create_task(self._run(job, run))
+        return job
+
+    async def _run(self, job: dict, run):
+        def on_result(result: dict):
+            job["completed"] += 1
+
+        try:
+            job["summary"] = summarize_results(await run(on_result))
+            job["status"] = "done"
+        except Exception as e:
+            logger.exception(f"Bulk GoHighLevel sync {job['id']} failed")
+            job["status"] = "failed"
+            job["error"] = repr(e)
+        finally:
+            job["finished_at"] = time.time()
+            self._tasks.pop(job["id"], None)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return self.jobs.get(job_id)
+
+    async def stop(self):
+        """Cancel running syncs; pushes already made are kept by GoHighLevel"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def summarize_results(results: List[dict]) -> dict:
+    succeeded = sum(1 for result in results if result["status"] == "success")
+    queued = sum(1 for result in results if result["status"] == "queued")
+    return {
+        "total": len(results),
+        "succeeded": succeeded,
+        # Already pending or being sent by the outbox dispatcher
+        "queued": queued,
+        "failed": len(results) - succeeded - queued,
+        "results": results,
+    }
+
+
+async def _main(args):
+    # Only the CLI needs a client of its own; importing supabase is slow, so keep it out of the server's startup
+    from supabase import create_client
+    from ghl_outbox import GHLOutbox
+
+    load_dotenv(Path(__file__).parent / '.env')
+    supabase = create_client(os.environ['SUPABASE_URL'], os.environ['SUPABASE_SERVICE_KEY'])
+    agents = select_agents(
+        supabase,
+        agent_ids=args.agent_id,
+        submitted_by=args.submitted_by,
+        service_area=args.service_area,
+        tags=args.tag,
+        limit=args.limit,
+    )
+    clients = OutboundClients(
+        args.base_url or os.environ['GOHIGHLEVEL_BASE_URL'],
+        args.api_key or os.environ['GOHIGHLEVEL_API_KEY'],
+    )
+    # The server's outbox, so pushes it has made or queued are not repeated
+    outbox = GHLOutbox(os.environ.get('GHL_OUTBOX_PATH', str(Path(__file__).parent / 'data' / 'ghl_outbox.sqlite3')))
+    try:
+        results = await outbox.sync_now(
+            clients.ghl, agents, rate=args.rate, burst=args.burst,
+            concurrency=args.concurrency, max_retries=args.max_retries,
+        )
+    finally:
+        await clients.aclose()
+        outbox.close()
+    print(json.dumps(summarize_results(results), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync agents to GoHighLevel")
+    parser.add_argument("--agent-id", action="append", help="agent id to sync (repeatable)")
+    parser.add_argument("--submitted-by")
+    parser.add_argument("--service-area")
+    parser.add_argument("--tag", action="append", help="only agents with this tag (repeatable)")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="requests per second")
+    parser.add_argument("--burst", type=int, default=DEFAULT_BURST)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES)
+    parser.add_argument("--base-url", help="override GOHIGHLEVEL_BASE_URL, e.g. a local stand-in server")
+    parser.add_argument("--api-key", help="override GOHIGHLEVEL_API_KEY")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,142 @@
+"""
+Background dependency probing for the health endpoint.
+
+Checks of Supabase, GoHighLevel and local disk run on an interval in a
+background task; GET /api/health only reads the cached results, so uptime
+checkers and load balancers never put query load on the database and get
+an answer in constant time even while a dependency is slow. A dependency is
+only reported down after `failure_threshold` consecutive failed probes, so
+one dropped packet doesn't flip the status.
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+from metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+DEPENDENCY_UP = Gauge("atlas_dependency_up", "Whether the last probe of a dependency succeeded", ("dependency",))
+DEPENDENCY_LATENCY = Gauge("atlas_dependency_probe_seconds", "Latency of the last dependency probe", ("dependency",))
+
+
+def check_disk(paths: Iterable[str], min_free_bytes: int) -> dict:
+    """Free space and writability of the directories the server writes to; raises if either is short"""
+    detail = {}
+    for path in paths:
+        os.makedirs(path, exist_ok=True)
+        free = shutil.disk_usage(path).free
+        detail[path] = free
+        if not os.access(path, os.W_OK):
+            raise RuntimeError(f"{path} is not writable")
+        if free < min_free_bytes:
+            raise RuntimeError(f"{path} has {free // (1024 * 1024)} MB free")
+    return {"free_bytes": detail}
+
+
+class HealthProber:
+    def __init__(self, interval: float = 15.0, timeout: float = 5.0, failure_threshold: int = 1):
+        if failure_threshold < 1:
+            raise ValueError(f"failure_threshold must be at least 1, got {failure_threshold}")
+        self.interval = interval
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.checks: Dict[str, Callable[[], Awaitable[Optional[dict]]]] = {}
+        self.critical = set()
+        self.results: Dict[str, dict] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, name: str, check: Callable[[], Awaitable[Optional[dict]]], critical: bool = False):
+        """Register an async check; it raises on failure and may return details to report"""
+        self.checks[name] = check
+        if critical:
+            self.critical.add(name)
+
+    async def start(self, after: Optional[Awaitable] = None):
+        """Probe in the background, first waiting for `after` (e.g. a warm-up step the checks need)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(after))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, after: Optional[Awaitable] = None):
+        if after is not None:
+            await after
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.interval)
+
+    async def probe_all(self):
+        await asyncio.gather(*(self._probe(name, check) for name, check in self.checks.items()))
+
+    async def _probe(self, name: str, check):
+        # A check that outlived its timeout keeps running (threads can't be cancelled);
+        # wait on it again rather than piling up another one
+        pending = self._pending.get(name)
+        if pending is None or pending.done():
+            pending = self._pending[name] = asyncio.ensure_future(check())
+            pending.add_done_callback(lambda future: future.cancelled() or future.exception())
+        start = time.monotonic()
+        detail, error = None, None
+        try:
+            detail = await asyncio.wait_for(asyncio.shield(pending), self.timeout)
+        except asyncio.TimeoutError:
+            error = f"no answer within {self.timeout:g}s"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        latency = time.monotonic() - start
+        previous = self.results.get(name)
+        failures = (previous["consecutive_failures"] + 1 if previous else 1) if error else 0
+        # Down once the threshold is reached; a dependency never seen up is down straight away
+        ok = not error or (failures < self.failure_threshold and previous is not None and previous["ok"])
+        if not ok and (previous is None or previous["ok"]):
+            logger.warning(f"Health probe of {name} failed: {error}")
+        elif ok and previous is not None and not previous["ok"]:
+            logger.info(f"Health probe of {name} recovered")
+        self.results[name] = {
+            "ok": ok,
+            "latency_ms": round(latency * 1000, 1),
+            "checked_at": time.monotonic(),
+            "error": error,
+            "detail": detail,
+            "consecutive_failures": failures,
+        }
+        DEPENDENCY_UP.set(1 if ok else 0, name)
+        DEPENDENCY_LATENCY.set(latency, name)
+
+    def snapshot(self) -> dict:
+        """The cached state; no I/O"""
+        now = time.monotonic()
+        dependencies = {}
+        for name in self.checks:
+            result = self.results.get(name)
+            if result is None:
+                dependencies[name] = {"ok": None, "latency_ms": None, "age_seconds": None, "error": None,
+                                      "consecutive_failures": None}
+                continue
+            dependencies[name] = {
+                "ok": result["ok"],
+                "latency_ms": result["latency_ms"],
+                "age_seconds": round(now - result["checked_at"], 1),
+                "error": result["error"],
+                "consecutive_failures": result["consecutive_failures"],
+                **({"detail": result["detail"]} if result["detail"] else {}),
+            }
+        if len(self.results) < len(self.checks):
+            status = "starting"
+        elif any(not self.results[name]["ok"] for name in self.critical):
+            status = "unhealthy"
+        elif any(not result["ok"] for result in self.results.values()):
+            status = "degraded"
+        else:
+            status = "healthy"
+        return {"status": status, "probe_interval_seconds": self.interval, "dependencies": dependencies}
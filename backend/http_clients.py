@@ -0,0 +1,172 @@
+"""
+Application-lifetime httpx clients for outbound HTTP.
+
+Scraping and GoHighLevel traffic get their own pooled clients so that
+connections (DNS, TCP and TLS setup) are reused across requests instead of
+being paid for on every call.
+"""
+
+import asyncio
+import importlib.util
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from metrics import Gauge, Histogram
+from tracing import span
+
+# HTTP/2 needs the optional `h2` package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Scraping fans out to many different brokerage sites
+SCRAPE_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30)
+SCRAPE_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+# GoHighLevel is a single host, so keep a smaller warm pool
+GHL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+GHL_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+# Max concurrent requests to any one host
+DEFAULT_PER_HOST_LIMIT = 4
+
+
+UPSTREAM_LATENCY = Histogram(
+    "atlas_upstream_request_duration_seconds",
+    "Outbound HTTP latency until response headers",
+    ("upstream", "status"),
+)
+UPSTREAM_IN_FLIGHT = Gauge("atlas_upstream_requests_in_flight", "Outbound HTTP requests in flight", ("upstream",))
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Pooled transport that records latency per upstream and status"""
+
+    def __init__(self, upstream: str, limits: httpx.Limits, verify=True):
+        self.upstream = upstream
+        self._transport = httpx.AsyncHTTPTransport(limits=limits, http2=HTTP2_AVAILABLE, verify=verify)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        status = "error"
+        start = time.perf_counter()
+        UPSTREAM_IN_FLIGHT.inc(self.upstream)
+        try:
+            with span("http", f"{request.method} {request.url.host}", upstream=self.upstream) as current:
+                response = await self._transport.handle_async_request(request)
+                status = str(response.status_code)
+                current.set("status", status)
+            return response
+        finally:
+            UPSTREAM_IN_FLIGHT.dec(self.upstream)
+            UPSTREAM_LATENCY.observe(time.perf_counter() - start, self.upstream, status)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+async def read_limited(response: httpx.Response, max_bytes: int) -> bytes:
+    """Read a streamed response body, stopping once max_bytes have arrived"""
+    chunks = []
+    received = 0
+    async for chunk in response.aiter_bytes():
+        chunks.append(chunk)
+        received += len(chunk)
+        if received >= max_bytes:
+            break
+    return b"".join(chunks)[:max_bytes]
+
+
+class HostLimiter:
+    """Caps the number of concurrent requests per host.
+
+    Scrapes reach arbitrary agent websites, so a host's semaphore only lives
+    while requests to it hold or wait for a slot.
+    """
+
+    def __init__(self, per_host: int = DEFAULT_PER_HOST_LIMIT):
+        self.per_host = per_host
+        self._hosts: Dict[str, list] = {}  # host -> [semaphore, requests holding or waiting]
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """Hold (`async with`) while talking to the url's host"""
+        host = urlsplit(url).netloc.lower()
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = self._hosts[host] = [asyncio.Semaphore(self.per_host), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._hosts[host]
+
+    def in_use(self) -> Dict[str, int]:
+        return {
+            host: self.per_host - semaphore._value
+            for host, (semaphore, _) in self._hosts.items()
+            if semaphore._value < self.per_host
+        }
+
+
+class OutboundClients:
+    """Holds the shared scrape and GoHighLevel clients"""
+
+    def __init__(self, ghl_base_url: str, ghl_api_key: str, per_host_limit: int = DEFAULT_PER_HOST_LIMIT):
+        self.ghl_base_url = ghl_base_url
+        self.ghl_api_key = ghl_api_key
+        self.hosts = HostLimiter(per_host_limit)
+        self._scrape: Optional[httpx.AsyncClient] = None
+        self._ghl: Optional[httpx.AsyncClient] = None
+        self._ssl_context = None
+
+    def ssl_context(self):
+        """One context for both clients: loading the CA bundle is most of the cost of creating a client"""
+        if self._ssl_context is None:
+            self._ssl_context = httpx.create_ssl_context()
+        return self._ssl_context
+
+    @property
+    def scrape(self) -> httpx.AsyncClient:
+        if self._scrape is None or self._scrape.is_closed:
+            self._scrape = httpx.AsyncClient(
+                transport=InstrumentedTransport("scrape", SCRAPE_LIMITS, self.ssl_context()),
+                timeout=SCRAPE_TIMEOUT,
+                follow_redirects=True,
+                headers={"User-Agent": "AtlasDirectory/1.0 (+profile image scraper)"},
+            )
+        return self._scrape
+
+    @property
+    def ghl(self) -> httpx.AsyncClient:
+        if self._ghl is None or self._ghl.is_closed:
+            self._ghl = httpx.AsyncClient(
+                base_url=self.ghl_base_url,
+                transport=InstrumentedTransport("ghl", GHL_LIMITS, self.ssl_context()),
+                timeout=GHL_TIMEOUT,
+                headers={
+                    "Authorization": f"Bearer {self.ghl_api_key}",
+                    "Content-Type": "application/json",
+                },
+            )
+        return self._ghl
+
+    async def start(self):
+        """Create both clients up front (called during start-up warm-up)"""
+        # Only the CA bundle load is slow; it runs in a thread so the loop is never
+        # blocked, and the clients are created here on the loop, their only user
+        context = await asyncio.to_thread(httpx.create_ssl_context)
+        if self._ssl_context is None:
+            self._ssl_context = context
+        return self.scrape, self.ghl
+
+    async def aclose(self):
+        for client in (self._scrape, self._ghl):
+            if client is not None:
+                await client.aclose()
+        self._scrape = None
+        self._ghl = None
@@ -0,0 +1,146 @@
+"""
+Image candidate extraction for profile image scraping.
+
+Only <img> tags matter, so instead of building a full BeautifulSoup tree we
+use selectolax or lxml when installed and fall back to a SAX-style
+HTMLParser subclass from the standard library.
+"""
+
+import codecs
+from html.parser import HTMLParser
+from typing import List, Optional
+from urllib.parse import urljoin
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+try:
+    from lxml import etree as lxml_etree, html as lxml_html
+except ImportError:
+    lxml_html = None
+
+if SelectolaxParser is not None:
+    PARSER_BACKEND = "selectolax"
+elif lxml_html is not None:
+    PARSER_BACKEND = "lxml"
+else:
+    PARSER_BACKEND = "htmlparser"
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+
+def is_html_content_type(content_type: Optional[str]) -> bool:
+    """Whether a Content-Type header is worth parsing for images"""
+    if not content_type:
+        # Plenty of small brokerage sites omit the header entirely
+        return True
+    return content_type.split(';', 1)[0].strip().lower() in HTML_CONTENT_TYPES
+
+
+def resolve_image_src(src: str, page_url: str) -> Optional[str]:
+    """Make an <img> src absolute; returns None for sources we don't follow"""
+    if src.startswith('//'):
+        return f"https:{src}"
+    elif src.startswith('/'):
+        return urljoin(page_url, src)
+    elif src.startswith('http'):
+        return src
+    return None
+
+
+def _alt_matches(alt: str, name_parts: List[str]) -> bool:
+    return any(part in alt for part in name_parts)
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class ImageTagParser(HTMLParser):
+    """Incremental parser that only looks at <img> tags.
+
+    With `agent_name` set it stops at the first image whose alt text mentions
+    the agent; otherwise it collects every candidate.
+    """
+
+    def __init__(self, page_url: str, agent_name: Optional[str] = None, encoding: str = 'utf-8'):
+        super().__init__(convert_charrefs=True)
+        self.page_url = page_url
+        self.name_parts = agent_name.lower().split() if agent_name else None
+        self.candidates: List[dict] = []
+        self.match: Optional[str] = None
+        self._decoder = codecs.getincrementaldecoder(_codec_or_utf8(encoding))(errors='replace')
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'img':
+            return
+        attributes = dict(attrs)
+        src = resolve_image_src(attributes.get('src') or '', self.page_url)
+        if not src:
+            return
+        alt = (attributes.get('alt') or '').lower()
+        self.candidates.append({"alt": alt, "src": src})
+        if self.name_parts is not None and _alt_matches(alt, self.name_parts):
+            self.match = src
+            raise _StopParsing()
+
+    def feed_bytes(self, chunk: bytes) -> bool:
+        """Feed raw bytes; returns True once a match has been found"""
+        try:
+            self.feed(self._decoder.decode(chunk))
+        except _StopParsing:
+            return True
+        return self.match is not None
+
+
+def _codec_or_utf8(encoding: Optional[str]) -> str:
+    try:
+        return codecs.lookup(encoding or 'utf-8').name
+    except LookupError:
+        return 'utf-8'
+
+
+def extract_image_candidates(html: bytes, page_url: str) -> List[dict]:
+    """List every <img> on the page as {"alt": lowercased alt, "src": absolute url}"""
+    if PARSER_BACKEND == "selectolax":
+        images = ((node.attributes.get('alt'), node.attributes.get('src'))
+                  for node in SelectolaxParser(html).tags('img'))
+    elif PARSER_BACKEND == "lxml":
+        try:
+            root = lxml_html.fromstring(html)
+        except (ValueError, lxml_etree.ParserError):
+            # Empty or unparseable documents
+            return []
+        images = ((el.get('alt'), el.get('src')) for el in root.iter('img'))
+    else:
+        parser = ImageTagParser(page_url)
+        parser.feed_bytes(html)
+        parser.close()
+        return parser.candidates
+
+    candidates = []
+    for alt, src in images:
+        src = resolve_image_src(src or '', page_url)
+        if src:
+            candidates.append({"alt": (alt or '').lower(), "src": src})
+    return candidates
+
+
+def find_agent_image(html: bytes, page_url: str, agent_name: str, chunk_size: int = 16384) -> Optional[str]:
+    """Scan a page for the agent's image, stopping at the first match"""
+    parser = ImageTagParser(page_url, agent_name)
+    for start in range(0, len(html), chunk_size):
+        if parser.feed_bytes(html[start:start + chunk_size]):
+            break
+    return parser.match
+
+
+def match_agent_image(candidates: List[dict], agent_name: str) -> Optional[str]:
+    """First candidate whose alt text mentions any part of the agent's name"""
+    name_parts = agent_name.lower().split()
+    for candidate in candidates:
+        if _alt_matches(candidate["alt"], name_parts):
+            return candidate["src"]
+    return None
@@ -0,0 +1,181 @@
+"""
+Content-addressed thumbnail store for agent profile images.
+
+Each scraped profile image is downloaded once, resized with Pillow into a few
+fixed sizes (WebP and JPEG) and kept on local disk under the SHA-256 of the
+original bytes. Thumbnails never change for a given hash, so they can be
+served with immutable cache headers. Total disk usage is capped and the
+least recently served images are evicted first.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PIL import Image, ImageOps, features
+
+# Longest edge in pixels for each thumbnail size
+THUMBNAIL_SIZES: Dict[str, int] = {"sm": 96, "md": 320, "lg": 800}
+DEFAULT_SIZE = "md"
+WEBP_AVAILABLE = features.check("webp")
+
+# Refuse absurd inputs before decoding them
+MAX_SOURCE_BYTES = 15 * 1024 * 1024
+Image.MAX_IMAGE_PIXELS = 40_000_000
+
+
+def image_path(hash_: str, size: str = DEFAULT_SIZE) -> str:
+    """Public URL path of a stored thumbnail"""
+    return f"/api/images/{hash_}/{size}"
+
+
+def render_thumbnails(data: bytes) -> Dict[str, bytes]:
+    """Decode an image once and encode every size as WebP and JPEG (CPU bound)"""
+    files = {}
+    with Image.open(io.BytesIO(data)) as source:
+        largest = max(THUMBNAIL_SIZES.values())
+        # Let the JPEG decoder downscale while decoding, which is far cheaper
+        source.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(source)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        for size, edge in sorted(THUMBNAIL_SIZES.items(), key=lambda item: -item[1]):
+            image.thumbnail((edge, edge), Image.LANCZOS)
+            if WEBP_AVAILABLE:
+                buffer = io.BytesIO()
+                image.save(buffer, "WEBP", quality=80, method=4)
+                files[f"{size}.webp"] = buffer.getvalue()
+            buffer = io.BytesIO()
+            rgb = image if image.mode == "RGB" else image.convert("RGB")
+            rgb.save(buffer, "JPEG", quality=82, optimize=True, progressive=True)
+            files[f"{size}.jpg"] = buffer.getvalue()
+    return files
+
+
+class ImageStore:
+    """Thumbnails on disk, laid out as <root>/<hash[:2]>/<hash>/<size>.<ext>
+
+    The async methods do their disk work (and the hashing and resizing) in
+    worker threads; the index is shared between them under a lock.
+    """
+
+    def __init__(self, root, quota_bytes: int = 1024 * 1024 * 1024):
+        self.root = Path(root)
+        self.quota_bytes = quota_bytes
+        self.total_bytes = 0
+        self.evictions = 0
+        # hash -> bytes on disk, oldest access first
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Rebuild the LRU index from disk, using directory mtimes as access times (blocking)"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for directory in self.root.glob("??/*"):
+            if directory.is_dir() and not directory.name.startswith("."):
+                size = sum(f.stat().st_size for f in directory.iterdir())
+                entries.append((directory.stat().st_mtime, directory.name, size))
+        index = OrderedDict((hash_, size) for _, hash_, size in sorted(entries))
+        with self._lock:
+            # Keep anything stored while the disk was being scanned
+            for hash_, size in self._index.items():
+                index.setdefault(hash_, size)
+            self._index = index
+            self.total_bytes = sum(index.values())
+            self._loaded = True
+
+    def _dir(self, hash_: str) -> Path:
+        return self.root / hash_[:2] / hash_
+
+    def has(self, hash_: str) -> bool:
+        if not self._loaded:
+            self.load()
+        return hash_ in self._index
+
+    async def add(self, data: bytes) -> str:
+        """Store thumbnails for an image and return its content hash"""
+        # Pillow releases the GIL while resizing, so a thread keeps the loop free
+        return await asyncio.to_thread(self._add, data)
+
+    def _add(self, data: bytes) -> str:
+        hash_ = hashlib.sha256(data).hexdigest()
+        if self.has(hash_):
+            return hash_
+        files = render_thumbnails(data)
+        target = self._dir(hash_)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Write into a temp dir and rename so readers never see partial files
+        staging = Path(tempfile.mkdtemp(dir=target.parent, prefix=".tmp-"))
+        for name, content in files.items():
+            (staging / name).write_bytes(content)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # The same image was stored concurrently
+            shutil.rmtree(staging, ignore_errors=True)
+        with self._lock:
+            if hash_ in self._index:
+                return hash_
+            size = sum(len(content) for content in files.values())
+            self._index[hash_] = size
+            self.total_bytes += size
+            evicted = self._evict()
+        for old in evicted:
+            shutil.rmtree(self._dir(old), ignore_errors=True)
+        return hash_
+
+    async def get(self, hash_: str, size: str, webp: bool) -> Optional[Path]:
+        """Path of a thumbnail file, marking the image as recently used"""
+        if size not in THUMBNAIL_SIZES:
+            return None
+        return await asyncio.to_thread(self._get, hash_, size, webp)
+
+    def _get(self, hash_: str, size: str, webp: bool) -> Optional[Path]:
+        if not self.has(hash_):
+            return None
+        extension = "webp" if webp and WEBP_AVAILABLE else "jpg"
+        path = self._dir(hash_) / f"{size}.{extension}"
+        if not path.exists():
+            return None
+        with self._lock:
+            if hash_ not in self._index:
+                return None
+            self._index.move_to_end(hash_)
+        try:
+            now = time.time()
+            os.utime(self._dir(hash_), (now, now))
+        except OSError:
+            pass
+        return path
+
+    def _evict(self) -> List[str]:
+        """Drop the least recently used images over quota from the index (holding the lock)"""
+        evicted = []
+        while self.total_bytes > self.quota_bytes and len(self._index) > 1:
+            hash_, size = self._index.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            evicted.append(hash_)
+        return evicted
+
+    def stats(self) -> dict:
+        """Index counts; empty until warm-up (or the first add or get) has loaded the index"""
+        with self._lock:
+            return {
+                "loaded": self._loaded,
+                "images": len(self._index),
+                "bytes": self.total_bytes,
+                "quota_bytes": self.quota_bytes,
+                "evictions": self.evictions,
+                "sizes": THUMBNAIL_SIZES,
+                "webp": WEBP_AVAILABLE,
+            }
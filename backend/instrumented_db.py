@@ -0,0 +1,253 @@
+"""
+Timing wrapper around the Supabase client.
+
+`InstrumentedClient(create_client(...))` behaves like the wrapped client, but
+every PostgREST `.execute()` is timed and recorded per table and operation
+(and as a `db` span when the request is traced).
+
+Queries are also fingerprinted by shape - table, filtered columns, ordering
+and limit, without the filter values - so that slow combinations of the
+dynamically built filters can be found.
+
+Every query also goes through the `supabase` circuit breaker, and reads made
+while serving a request fall back to their last good result when Supabase
+is unavailable (see stale_cache.py).
+"""
+
+import logging
+import math
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from circuit_breaker import CircuitBreaker
+from metrics import Counter, Gauge, Histogram
+from stale_cache import StaleReadCache
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+DB_LATENCY = Histogram("atlas_db_query_duration_seconds", "Supabase query latency", ("table", "operation"))
+DB_ERRORS = Counter("atlas_db_query_errors_total", "Supabase queries that raised", ("table", "operation"))
+DB_IN_FLIGHT = Gauge("atlas_db_queries_in_flight", "Supabase queries currently executing")
+
+# Builder methods that decide what kind of query is being built
+OPERATIONS = {"select", "insert", "upsert", "update", "delete", "rpc"}
+
+# `or_` filter strings look like "full_name.ilike.%x%,brokerage.ilike.%x%"
+_OR_TERM = re.compile(r"(\w+)\.(?:not\.)?(\w+)\.")
+
+
+def shape_part(name: str, args: tuple, kwargs: dict) -> str:
+    """Value-free description of one builder call"""
+    first = args[0] if args and isinstance(args[0], str) else None
+    if name == "select":
+        return f"select({' '.join(first.split()) if first else '*'})"
+    if name in OPERATIONS:
+        return name
+    if name == "or_":
+        terms = sorted({f"{column}.{op}" for column, op in _OR_TERM.findall(first or "")})
+        return f"or({','.join(terms)})"
+    if name == "limit":
+        # Bucket to the next power of ten so every page size isn't its own shape
+        size = args[0] if args and isinstance(args[0], int) else 0
+        return f"limit(<={10 ** math.ceil(math.log10(size))})" if size > 0 else "limit"
+    if name == "order":
+        return f"order({first}{' desc' if kwargs.get('desc') else ''})"
+    return f"{name}({first})" if first else name
+
+
+class QueryStats:
+    """Latency and row counts per query shape, plus a log of slow queries"""
+
+    def __init__(self, slow_threshold: float = 0.5, max_shapes: int = 500, samples: int = 512):
+        self.slow_threshold = slow_threshold
+        self.max_shapes = max_shapes
+        self.samples = samples
+        self.slow_count = 0
+        self._shapes: Dict[str, dict] = {}
+        # execute() also runs in worker threads (asyncio.to_thread)
+        self._lock = threading.Lock()
+
+    def record(self, fingerprint: str, seconds: float, rows: Optional[int]):
+        slow = seconds >= self.slow_threshold
+        with self._lock:
+            shape = self._shapes.get(fingerprint)
+            if shape is None:
+                if len(self._shapes) >= self.max_shapes:
+                    fingerprint = "(other)"
+                shape = self._shapes.setdefault(fingerprint, {
+                    "count": 0, "total": 0.0, "max": 0.0, "rows": 0, "slow": 0,
+                    "latencies": deque(maxlen=self.samples),
+                })
+            shape["count"] += 1
+            shape["total"] += seconds
+            shape["max"] = max(shape["max"], seconds)
+            shape["rows"] += rows or 0
+            shape["latencies"].append(seconds)
+            if slow:
+                shape["slow"] += 1
+                self.slow_count += 1
+        if slow:
+            logger.warning(f"Slow query ({seconds * 1000:.0f} ms, {rows} rows): {fingerprint}")
+
+    def top(self, limit: int = 10, sort: str = "p95") -> List[dict]:
+        """Slowest shapes with p50/p95/p99 over their recent samples, in milliseconds"""
+        with self._lock:
+            snapshot = [(fingerprint, dict(shape), sorted(shape["latencies"]))
+                        for fingerprint, shape in self._shapes.items()]
+        report = []
+        for fingerprint, shape, latencies in snapshot:
+            report.append({
+                "shape": fingerprint,
+                "count": shape["count"],
+                "slow": shape["slow"],
+                "avg_rows": round(shape["rows"] / shape["count"], 1),
+                "mean_ms": round(shape["total"] / shape["count"] * 1000, 2),
+                "p50_ms": _percentile_ms(latencies, 0.50),
+                "p95_ms": _percentile_ms(latencies, 0.95),
+                "p99_ms": _percentile_ms(latencies, 0.99),
+                "max_ms": round(shape["max"] * 1000, 2),
+            })
+        report.sort(key=lambda row: row.get(f"{sort}_ms", row.get(sort, 0)), reverse=True)
+        return report[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+            self.slow_count = 0
+
+
+def _percentile_ms(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return round(sorted_values[index] * 1000, 2)
+
+
+QUERY_STATS = QueryStats()
+
+# Trips on errors or slow queries so handlers fail fast (and reads fall back to the cache)
+DB_BREAKER = CircuitBreaker("supabase")
+READ_CACHE = StaleReadCache()
+
+
+class InstrumentedClient:
+    """Proxy for a supabase Client whose table queries are timed
+
+    Given `factory` instead of a client, the client is created on first use
+    (or by `connect()`), keeping the supabase import off the startup path.
+    """
+
+    def __init__(self, client=None, factory: Optional[Callable] = None):
+        self._client = client
+        self._factory = factory
+        self._lock = threading.Lock()
+
+    def connect(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def table(self, name: str):
+        return QueryProxy(self.connect().table(name), name)
+
+    from_ = table
+
+    def __getattr__(self, name):
+        return getattr(self.connect(), name)
+
+
+class QueryProxy:
+    """Wraps a PostgREST builder, following it through chained calls"""
+
+    __slots__ = ("_builder", "_table", "_operation", "_shape")
+
+    def __init__(self, builder, table: str, operation: str = "select", shape: tuple = ()):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+        self._shape = shape
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            # Properties such as `not_` return builders too
+            return self._wrap(attr, name, (), {}) if hasattr(attr, "execute") else attr
+
+        def call(*args, **kwargs):
+            return self._wrap(attr(*args, **kwargs), name, args, kwargs)
+
+        return call
+
+    def _wrap(self, result, name: str, args: tuple, kwargs: dict):
+        if hasattr(result, "execute"):
+            operation = name if name in OPERATIONS else self._operation
+            return QueryProxy(result, self._table, operation, self._shape + (shape_part(name, args, kwargs),))
+        return result
+
+    @property
+    def fingerprint(self) -> str:
+        return f"{self._table}: {' '.join(self._shape) or self._operation}"
+
+    def execute(self):
+        key = self._cache_key() if READ_CACHE.active() else None
+        try:
+            return self._execute(key)
+        except Exception as e:
+            if key is None or not is_upstream_failure(e):
+                raise
+            cached = READ_CACHE.get_stale(key, lambda: self._execute(key))
+            if cached is None:
+                raise
+            return cached
+
+    def _cache_key(self) -> Optional[str]:
+        config = getattr(self._builder, "request", None)
+        if self._operation != "select" or config is None or config.http_method != "GET":
+            return None
+        # The builder type tells single() and maybe_single() apart from list reads
+        return f"{type(self._builder).__name__} {config.path}?{config.params}"
+
+    def _execute(self, cache_key: Optional[str] = None):
+        trial = DB_BREAKER.before_call()
+        labels = (self._table, self._operation)
+        rows = None
+        ok = True
+        start = time.perf_counter()
+        DB_IN_FLIGHT.inc()
+        try:
+            with span("db", f"{self._table}.{self._operation}", table=self._table, operation=self._operation):
+                result = self._builder.execute()
+            data = getattr(result, "data", None)
+            rows = len(data) if isinstance(data, list) else getattr(result, "count", None)
+            if cache_key is not None:
+                READ_CACHE.put(cache_key, result, rows or 1)
+            return result
+        except Exception as e:
+            DB_ERRORS.inc(*labels)
+            ok = not is_upstream_failure(e)
+            raise
+        finally:
+            DB_IN_FLIGHT.dec()
+            elapsed = time.perf_counter() - start
+            DB_BREAKER.record(ok, elapsed, trial)
+            DB_LATENCY.observe(elapsed, *labels)
+            QUERY_STATS.record(self.fingerprint, elapsed, rows)
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """Whether an error says Supabase is unwell, as opposed to the query being refused"""
+    code = getattr(error, "code", None)
+    if code is None:
+        # Network errors, timeouts, CircuitOpen
+        return True
+    code = str(code)
+    # PostgREST APIError: HTTP status for non-JSON (gateway) errors, PGRST00x when
+    # PostgREST can't reach the database, 57014 for statement timeouts
+    return (len(code) == 3 and code >= "500") or code.startswith("PGRST00") or code == "57014"
+
@@ -0,0 +1,103 @@
+"""
+Event loop lag monitor.
+
+A heartbeat task sleeps for a fixed interval and measures how late it wakes
+up; that delay is time the loop spent running something else without
+yielding. A watchdog thread notices when the heartbeat stops and logs the
+loop thread's stack while it is still blocked, so the offending call shows
+up by name.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG = Histogram(
+    "atlas_event_loop_lag_seconds", "Event loop scheduling delay",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_STALLS = Counter("atlas_event_loop_stalls_total", "Event loop stalls over the lag threshold")
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25, max_frames: int = 30):
+        self.interval = interval
+        self.threshold = threshold
+        self.max_frames = max_frames
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.last_stall_stack: Optional[str] = None
+        self._last_beat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=self.interval * 2)
+            self._watchdog = None
+
+    async def _heartbeat(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - start - self.interval)
+            self._last_beat = now
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG.observe(lag)
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stop.wait(self.interval / 2):
+            beat = self._last_beat
+            blocked_for = time.monotonic() - beat - self.interval
+            # Report each stall once, while the loop thread is still inside the blocking call
+            if blocked_for < self.threshold or beat == reported_beat:
+                continue
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame, limit=self.max_frames))
+            self.stalls += 1
+            self.last_stall_stack = stack
+            LOOP_STALLS.inc()
+            logger.warning(f"Event loop blocked for {blocked_for * 1000:.0f} ms+, loop thread stack:\n{stack}")
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "last_lag_ms": round(self.last_lag * 1000, 2),
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "stalls": self.stalls,
+            "last_stall_stack": self.last_stall_stack,
+        }
@@ -0,0 +1,215 @@
+"""
+Minimal Prometheus metrics: counters, gauges and histograms rendered in the
+text exposition format.
+
+Metrics are updated from the event loop, from asyncio.to_thread workers
+(database timings) and from the loop monitor's watchdog thread, so each
+metric guards its values with its own lock, as QueryStats does. The lock
+is uncontended nearly always; a histogram observation is one bisect over
+its bucket bounds under it. Rendering copies the values under the lock.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, from sub-millisecond handlers to slow upstreams
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class _SimpleMetric(_Metric):
+    """Counter/gauge storage, optionally computed at scrape time from `function`.
+
+    `function` returns a number, or a dict of label tuples to numbers; it lets
+    stats that components already keep be exported without double counting.
+    """
+
+    def __init__(self, *args, function: Optional[Callable] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[tuple, float] = {}
+        self.function = function
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self.values)
+        if self.function is not None:
+            try:
+                result = self.function()
+            except Exception:
+                return []
+            values = result if isinstance(result, dict) else {(): result}
+        lines = self._header()
+        for labels, value in values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_SimpleMetric):
+    kind = "counter"
+
+
+class Gauge(_SimpleMetric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self.values[labels] = value
+
+    def dec(self, *labels, amount: float = 1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) - amount
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self.values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.values.get(labels)
+            if series is None:
+                series = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = {labels: list(series) for labels, series in self.values.items()}
+        lines = self._header()
+        for labels, series in values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+# HTTP server metrics
+HTTP_REQUESTS = Counter("atlas_http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+HTTP_LATENCY = Histogram("atlas_http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"))
+HTTP_IN_FLIGHT = Gauge("atlas_http_requests_in_flight", "HTTP requests currently being served")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts and latency per route template"""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Dict[object, str] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            labels = (scope["method"], self._route(scope), str(status))
+            HTTP_LATENCY.observe(time.perf_counter() - start, *labels)
+            HTTP_REQUESTS.inc(*labels)
+
+    def _route(self, scope) -> str:
+        """Route template such as /api/agents/{agent_id}, to keep label cardinality bounded"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        route = self._routes.get(endpoint)
+        if route is None:
+            for candidate in scope["app"].routes:
+                if getattr(candidate, "endpoint", None) is not None:
+                    self._routes[candidate.endpoint] = candidate.path
+            route = self._routes.setdefault(endpoint, "unmatched")
+        return route
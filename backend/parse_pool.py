@@ -0,0 +1,117 @@
+"""
+Executor offload for CPU-bound HTML parsing.
+
+Image candidate extraction runs in a process pool (or a thread pool when the
+parser backend releases the GIL) so that large brokerage pages don't stall
+the event loop that is serving API requests.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+import image_extractor
+
+logger = logging.getLogger(__name__)
+
+# lxml parses with the GIL released, so threads are enough for it
+GIL_RELEASING_BACKENDS = ("lxml",)
+
+
+def _timed_extract(html: bytes, page_url: str):
+    """Runs in the worker: extract candidates and report how long it took"""
+    start = time.perf_counter()
+    candidates = image_extractor.extract_image_candidates(html, page_url)
+    return candidates, time.perf_counter() - start
+
+
+def _warm_up() -> str:
+    """Import the parser backend and exercise it once so the first real page is fast"""
+    image_extractor.extract_image_candidates(b"<html><img alt='warm' src='/w.jpg'></html>", "http://localhost/")
+    return image_extractor.PARSER_BACKEND
+
+
+class ParsePool:
+    """Runs extract_image_candidates off the event loop with a bounded backlog"""
+
+    def __init__(self, mode: str = "auto", workers: int = 2, max_pending: int = 64):
+        if mode == "auto":
+            mode = "thread" if image_extractor.PARSER_BACKEND in GIL_RELEASING_BACKENDS else "process"
+        if mode not in ("process", "thread", "inline"):
+            raise ValueError(f"Unknown parse pool mode: {mode}")
+        self.mode = mode
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.parse_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.max_parse_seconds = 0.0
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def start(self):
+        """Create the executor and pre-warm every worker"""
+        self._slots = asyncio.Semaphore(self.max_pending)
+        if self.mode == "inline" or self._executor is not None:
+            return
+        if self.mode == "process":
+            # spawn rather than fork: the server process already runs threads
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="parse")
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _warm_up) for _ in range(self.workers)))
+        logger.info(
+            f"Parse pool ready: {self.workers} {self.mode} workers "
+            f"({image_extractor.PARSER_BACKEND}) in {time.perf_counter() - start:.2f}s"
+        )
+
+    async def extract(self, html: bytes, page_url: str) -> List[dict]:
+        """Extract image candidates in the pool, waiting if the backlog is full"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        submitted = time.perf_counter()
+        async with self._slots:
+            self.pending += 1
+            try:
+                if self._executor is None:
+                    candidates, elapsed = _timed_extract(html, page_url)
+                else:
+                    loop = asyncio.get_running_loop()
+                    candidates, elapsed = await loop.run_in_executor(self._executor, _timed_extract, html, page_url)
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self.pending -= 1
+        self.completed += 1
+        self.parse_seconds += elapsed
+        self.wait_seconds += time.perf_counter() - submitted - elapsed
+        self.max_parse_seconds = max(self.max_parse_seconds, elapsed)
+        return candidates
+
+    def stats(self) -> dict:
+        done = self.completed or 1
+        return {
+            "mode": self.mode,
+            "backend": image_extractor.PARSER_BACKEND,
+            "workers": self.workers if self._executor is not None else 0,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_parse_ms": round(self.parse_seconds / done * 1000, 3),
+            "max_parse_ms": round(self.max_parse_seconds * 1000, 3),
+            "avg_wait_ms": round(self.wait_seconds / done * 1000, 3),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,125 @@
+"""
+On-demand CPU and memory profiling of the running server.
+
+Nothing here runs until a profile is requested: the stack sampler is a
+thread that only exists for the duration of a profile, and cProfile and
+tracemalloc are switched on and off around it.
+"""
+
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import List, Optional
+
+MAX_PROFILE_SECONDS = 60
+
+# Only one profile at a time; overlapping profilers distort each other
+_busy = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def collapse_stack(frame) -> str:
+    """Root-first `file:function;file:function` line, the flamegraph.pl input format"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def sample_stacks(seconds: float, interval: float = 0.005, thread_id: Optional[int] = None) -> Counter:
+    """Sample the stacks of one thread (or all others) every `interval` seconds"""
+    me = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == me or (thread_id is not None and ident != thread_id):
+                continue
+            prefix = names.get(ident, str(ident)) if thread_id is None else None
+            stack = collapse_stack(frame)
+            stacks[f"{prefix};{stack}" if prefix else stack] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def format_collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+async def sampled_cpu_profile(seconds: float, interval: float = 0.005, all_threads: bool = False) -> str:
+    """Collapsed stacks of the event loop thread (or every thread) over `seconds`"""
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        thread_id = None if all_threads else threading.get_ident()
+        stacks = await asyncio.to_thread(sample_stacks, min(seconds, MAX_PROFILE_SECONDS), interval, thread_id)
+        return format_collapsed(stacks)
+    finally:
+        _busy.release()
+
+
+async def cprofile_event_loop(seconds: float, limit: int = 50, sort: str = "cumulative") -> str:
+    """Deterministic profile of everything the event loop thread runs for `seconds`"""
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        await asyncio.sleep(min(seconds, MAX_PROFILE_SECONDS))
+    finally:
+        profiler.disable()
+        _busy.release()
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats(sort).print_stats(limit)
+    return output.getvalue()
+
+
+async def memory_diff(seconds: float, limit: int = 25, frames: int = 1) -> List[dict]:
+    """Top allocation sites by growth between two tracemalloc snapshots `seconds` apart"""
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    started = not tracemalloc.is_tracing()
+    try:
+        if started:
+            tracemalloc.start(frames)
+        # Snapshots and the comparison walk every traced block; on a large heap that takes
+        # hundreds of ms, so it happens in a thread where the loop can keep interleaving
+        before = await asyncio.to_thread(tracemalloc.take_snapshot)
+        await asyncio.sleep(min(seconds, MAX_PROFILE_SECONDS))
+        after = await asyncio.to_thread(tracemalloc.take_snapshot)
+    finally:
+        if started:
+            tracemalloc.stop()
+        _busy.release()
+    return await asyncio.to_thread(_compare_snapshots, before, after, limit, frames)
+
+
+def _compare_snapshots(before, after, limit: int, frames: int) -> List[dict]:
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    diff = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "traceback" if frames > 1 else "lineno")
+    return [
+        {
+            "site": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            "size_diff_kb": round(stat.size_diff / 1024, 1),
+            "size_kb": round(stat.size / 1024, 1),
+            "count_diff": stat.count_diff,
+        }
+        for stat in diff[:limit]
+    ]
@@ -0,0 +1,201 @@
+"""
+Token bucket rate limiting and load shedding.
+"""
+
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError(f"Token bucket needs a positive rate and capacity, got {rate} and {capacity}")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take tokens if available without waiting"""
+        self._refill(time.monotonic())
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` will be available"""
+        self._refill(time.monotonic())
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until tokens are available and take them"""
+        while not self.try_acquire(tokens):
+            await asyncio.sleep(self.wait_time(tokens))
+
+    def drain(self):
+        """Empty the bucket, e.g. after the remote side answered 429"""
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, 0.0)
+
+
+class CombinedBuckets:
+    """Takes each token from every bucket, e.g. a caller's own limit under a shared one"""
+
+    def __init__(self, *buckets: TokenBucket):
+        self.buckets = buckets
+
+    async def acquire(self, tokens: float = 1.0):
+        for bucket in self.buckets:
+            await bucket.acquire(tokens)
+
+    def drain(self):
+        for bucket in self.buckets:
+            bucket.drain()
+
+
+class RouteLimit:
+    """Per-client and whole-route token buckets for requests matching a method and path prefix"""
+
+    def __init__(self, method: str, path_prefix: str, client_rate: float, client_burst: float,
+                 route_rate: Optional[float] = None, route_burst: Optional[float] = None):
+        self.method = method.upper()
+        self.path_prefix = path_prefix
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.route_bucket = TokenBucket(route_rate, route_burst or route_rate) if route_rate else None
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.method == "*" or self.method == method) and path.startswith(self.path_prefix)
+
+
+class RateLimiter:
+    """Token-bucket rate limits plus a global concurrency cap with load shedding.
+
+    Every decision is a few dict lookups and arithmetic, so rejected requests
+    are answered with 429/503 and Retry-After before any handler runs.
+    """
+
+    def __init__(self, rules: List[RouteLimit], max_concurrency: int = 64, max_queue: int = 128,
+                 max_clients: int = 10000, exempt_paths: Tuple[str, ...] = ()):
+        self.rules = rules
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_clients = max_clients
+        self.exempt_paths = exempt_paths
+        self.in_flight = 0
+        self.queued = 0
+        self.counts = {"allowed": 0, "rate_limited": 0, "shed": 0}
+        self._clients: "OrderedDict[tuple, TokenBucket]" = OrderedDict()
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def handle(self, app, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            return await app(scope, receive, send)
+
+        retry_after = self._check_rate(scope)
+        if retry_after is not None:
+            self.counts["rate_limited"] += 1
+            return await self._reject(send, 429, "Too many requests", retry_after)
+
+        # Shed instead of queueing without bound when the server is saturated
+        if self.in_flight >= self.max_concurrency and self.queued >= self.max_queue:
+            self.counts["shed"] += 1
+            return await self._reject(send, 503, "Server busy, try again shortly", 1)
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        self.counts["allowed"] += 1
+        try:
+            await app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def _check_rate(self, scope) -> Optional[float]:
+        """Seconds to wait if a bucket is empty, else None (and a token is taken from each)"""
+        method, path = scope["method"], scope["path"]
+        rule = next((rule for rule in self.rules if rule.matches(method, path)), None)
+        if rule is None:
+            return None
+        key = (id(rule), client_address(scope))
+        bucket = self._clients.get(key)
+        if bucket is None:
+            bucket = self._clients[key] = TokenBucket(rule.client_rate, rule.client_burst)
+            if len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(key)
+        # Check both before taking from either, so a request the route turns away costs the client nothing
+        wait = bucket.wait_time()
+        if rule.route_bucket is not None:
+            wait = max(wait, rule.route_bucket.wait_time())
+        if wait > 0:
+            return wait
+        bucket.try_acquire()
+        if rule.route_bucket is not None:
+            rule.route_bucket.try_acquire()
+        return None
+
+    async def _reject(self, send, status: int, message: str, retry_after: float):
+        body = json.dumps({"detail": message}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "tracked_clients": len(self._clients),
+            **self.counts,
+        }
+
+
+class RateLimitMiddleware:
+    """ASGI wrapper applying a shared RateLimiter to every request"""
+
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        await self.limiter.handle(self.app, scope, receive, send)
+
+
+def client_address(scope) -> str:
+    """Client IP of the connection.
+
+    Never read from X-Forwarded-For here: clients can send it themselves.
+    Behind nginx, uvicorn runs with --proxy-headers and trusts only the hop
+    nginx appends, so the scope already holds the real client address.
+    """
+    client = scope.get("client")
+    return client[0] if client else "unknown"
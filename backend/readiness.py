@@ -0,0 +1,89 @@
+"""
+Start-up warm-up tracking for the readiness probe.
+
+The app accepts connections as soon as it is imported and its startup hook
+has returned; slow initialization (creating the Supabase client, spawning
+parse workers, indexing the image store) runs afterwards as named warm-up
+steps. /api/health/live only says the process is serving, while
+/api/health/ready answers 200 once every step has completed.
+
+Plain functions run in a worker thread so that file and network work never
+blocks the loop; coroutine functions run on it. A failed step is retried with
+capped exponential backoff, so a dependency that is down at boot doesn't
+leave the probe at 503 for the life of the process.
+"""
+
+import asyncio
+import inspect
+import logging
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    def __init__(self, retry_delay: float = 1.0, max_retry_delay: float = 60.0):
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.started_at = time.monotonic()
+        self.steps: Dict[str, dict] = {}
+        self._done: Dict[str, asyncio.Event] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, steps: Dict[str, Callable]):
+        """Run the steps concurrently in the background; each is a sync or async callable"""
+        self.started_at = time.monotonic()
+        self.steps = {name: {"status": "pending", "seconds": None, "attempts": 0, "error": None} for name in steps}
+        self._done = {name: asyncio.Event() for name in steps}
+        self._task = asyncio.create_task(self._run(steps))
+
+    async def _run(self, steps: Dict[str, Callable]):
+        await asyncio.gather(*(self._step(name, fn) for name, fn in steps.items()))
+        if self.ready:
+            logger.info(f"Warm-up finished in {time.monotonic() - self.started_at:.2f}s")
+
+    async def _step(self, name: str, fn: Callable):
+        state = self.steps[name]
+        start = time.monotonic()
+        while True:
+            state["status"] = "running"
+            state["attempts"] += 1
+            try:
+                if inspect.iscoroutinefunction(fn):
+                    await fn()
+                else:
+                    await asyncio.to_thread(fn)
+                state["status"] = "done"
+                state["error"] = None
+                self._done[name].set()
+                break
+            except Exception as e:
+                state["status"] = "failed"
+                state["error"] = str(e)
+                delay = min(self.max_retry_delay, self.retry_delay * 2 ** (state["attempts"] - 1))
+                logger.exception(f"Warm-up step {name} failed (attempt {state['attempts']}); retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+            finally:
+                state["seconds"] = round(time.monotonic() - start, 3)
+
+    async def wait(self, name: str):
+        """Return once the named step has completed"""
+        await self._done[name].wait()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.steps) and all(state["status"] == "done" for state in self.steps.values())
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "uptime_seconds": round(time.monotonic() - self.started_at, 3),
+            "steps": self.steps,
+        }
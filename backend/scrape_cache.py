@@ -0,0 +1,155 @@
+"""
+Persistent per-URL cache of the image candidates found on scraped pages.
+
+Many agents share a brokerage website, so pages are fetched once, their
+candidates kept in a local SQLite file and revalidated with conditional
+GETs (ETag/Last-Modified) once their TTL runs out. The file is capped by
+size and evicts the least recently used pages first. Every method does
+blocking SQLite I/O; call them from a worker thread.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+DEFAULT_TTL = 24 * 60 * 60  # serve without revalidating for a day
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Last-use times are only rewritten when older than this, so hits don't each cost a write
+ACCESS_RESOLUTION = 10 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    candidates TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at);
+"""
+
+
+class CachedPage:
+    def __init__(self, url, etag, last_modified, candidates, fetched_at):
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.candidates = candidates
+        self.fetched_at = fetched_at
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ScrapeCache:
+    """SQLite-backed candidate cache with TTLs and size-based LRU eviction"""
+
+    def __init__(self, path, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats_counts = {"hits": 0, "revalidated": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total_bytes = 0
+        self._entries = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._entries, self._total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages"
+            ).fetchone()
+        return self._conn
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT etag, last_modified, candidates, fetched_at, accessed_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[4] > ACCESS_RESOLUTION:
+                conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (now, url))
+        return CachedPage(url, row[0], row[1], json.loads(row[2]), row[3])
+
+    def put(self, url: str, candidates: List[dict], etag: Optional[str] = None, last_modified: Optional[str] = None):
+        encoded = json.dumps(candidates)
+        size = len(url) + len(encoded)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            previous = conn.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, candidates, size, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, encoded, size, now, now),
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            self._entries += previous is None
+            if self._total_bytes > self.max_bytes:
+                self._evict(conn)
+
+    def mark_revalidated(self, url: str):
+        """Restart the TTL of a page the origin answered 304 for"""
+        now = time.time()
+        with self._lock:
+            self._connect().execute(
+                "UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url)
+            )
+
+    def _evict(self, conn: sqlite3.Connection):
+        # Drop least recently used pages until we're back under 90% of the cap
+        target = int(self.max_bytes * 0.9)
+        rows = conn.execute("SELECT url, size FROM pages ORDER BY accessed_at").fetchall()
+        evicted = []
+        for url, size in rows:
+            if self._total_bytes <= target:
+                break
+            evicted.append((url,))
+            self._total_bytes -= size
+        conn.executemany("DELETE FROM pages WHERE url = ?", evicted)
+        self._entries -= len(evicted)
+        self.stats_counts["evictions"] += len(evicted)
+
+    def record(self, result: str):
+        """Count a lookup as a hit, revalidated or miss"""
+        self.stats_counts[result] += 1
+
+    def stats(self) -> dict:
+        """Counters kept in memory; no I/O or locking once the file has been opened"""
+        if self._conn is None:
+            with self._lock:
+                self._connect()
+        return {
+            "entries": self._entries,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            **self.stats_counts,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,154 @@
+"""
+Background job queue for profile image scraping.
+
+Agents are inserted immediately and the scrape is handed to a small pool of
+asyncio workers so that third-party websites never sit on the request path.
+An agent with a scrape already queued or running gets that job back rather
+than a second one.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# What the public status endpoint shows; the agent's details stay out
+STATUS_FIELDS = ("id", "agent_id", "status", "attempts", "profile_image", "created_at", "finished_at")
+
+
+class ScrapeJobQueue:
+    """Bounded queue of scrape jobs drained by a fixed number of workers"""
+
+    def __init__(
+        self,
+        handler: Callable[[dict], Awaitable[Optional[str]]],
+        concurrency: int = 4,
+        max_retries: int = 3,
+        retry_delay: float = 1.0,
+        maxsize: int = 1000,
+        history_size: int = 1000,
+    ):
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.maxsize = maxsize
+        self.history_size = history_size
+        self.jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self.counts = {JOB_DONE: 0, JOB_FAILED: 0, "retries": 0}
+        self.in_flight = 0
+        self._active: Dict[str, dict] = {}  # agent id -> its queued or running job
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+
+    async def start(self):
+        """Spawn the worker tasks (called from the app startup hook)"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.concurrency)
+        ]
+        logger.info(f"Scrape queue started with {self.concurrency} workers")
+
+    async def stop(self):
+        """Cancel the workers; queued jobs that have not started are dropped"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def enqueue(self, agent_id: str, full_name: str, website: str, service_area: str) -> dict:
+        """Queue a scrape for an agent. Raises asyncio.QueueFull when saturated."""
+        if self._queue is None:
+            raise RuntimeError("Scrape queue is not running")
+        active = self._active.get(agent_id)
+        if active is not None:
+            return active
+        job = {
+            "id": str(uuid.uuid4()),
+            "agent_id": agent_id,
+            "full_name": full_name,
+            "website": website,
+            "service_area": service_area,
+            "status": JOB_QUEUED,
+            "attempts": 0,
+            "profile_image": None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        self._queue.put_nowait(job)
+        self._active[agent_id] = job
+        self._remember(job)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        return self.jobs.get(job_id)
+
+    @staticmethod
+    def public_status(job: dict) -> dict:
+        return {field: job[field] for field in STATUS_FIELDS}
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_capacity": self.maxsize,
+            "workers": len(self._workers),
+            "in_flight": self.in_flight,
+            "completed": self.counts[JOB_DONE],
+            "failed": self.counts[JOB_FAILED],
+            "retries": self.counts["retries"],
+        }
+
+    def _remember(self, job: dict):
+        self.jobs[job["id"]] = job
+        # Keep only the most recent jobs so the status map stays bounded
+        while len(self.jobs) > self.history_size:
+            self.jobs.popitem(last=False)
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            self.in_flight += 1
+            try:
+                await self._run(job)
+            finally:
+                self.in_flight -= 1
+                self._queue.task_done()
+
+    async def _run(self, job: dict):
+        job["status"] = JOB_RUNNING
+        while True:
+            job["attempts"] += 1
+            try:
+                job["profile_image"] = await self.handler(job)
+                job["status"] = JOB_DONE
+                job["error"] = None
+                self.counts[JOB_DONE] += 1
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job["error"] = str(e)
+                if job["attempts"] > self.max_retries:
+                    job["status"] = JOB_FAILED
+                    self.counts[JOB_FAILED] += 1
+                    logger.warning(f"Scrape job {job['id']} for agent {job['agent_id']} failed: {e}")
+                    break
+                self.counts["retries"] += 1
+                # Exponential backoff between attempts
+                await asyncio.sleep(self.retry_delay * (2 ** (job["attempts"] - 1)))
+        job["finished_at"] = time.time()
+        if self._active.get(job["agent_id"]) is job:
+            del self._active[job["agent_id"]]
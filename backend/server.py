@@ -1,19 +1,40 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import List, Optional
 import uuid
-from datetime import datetime
-from supabase import create_client, Client
+from datetime import datetime, timezone
 import json
 import httpx
 import asyncio
-from bs4 import BeautifulSoup
 import re
+from constants import DEFAULT_TAGS, RATING_LEVELS, SERVICE_AREA_TYPES
+from scrape_jobs import ScrapeJobQueue
+from http_clients import OutboundClients, read_limited
+from scrape_cache import ScrapeCache
+from image_extractor import is_html_content_type, match_agent_image
+from parse_pool import ParsePool
+from image_store import ImageStore, MAX_SOURCE_BYTES, image_path
+from ghl_sync import BulkSyncJobs, contact_payload, select_agents
+from ghl_outbox import GHLOutbox, SYNCED
+from agent_index import AgentIndex, dedupe_report, is_strong_match, iter_agent_rows
+from rate_limit import RateLimiter, RateLimitMiddleware, RouteLimit, client_address
+from instrumented_db import DB_BREAKER, QUERY_STATS, READ_CACHE, InstrumentedClient
+from stale_cache import StaleHeaderMiddleware
+from metrics import REGISTRY, Counter, Gauge, MetricsMiddleware
+from loop_monitor import LoopLagMonitor
+from readiness import WarmUp
+from write_batcher import WriteBatcher, WriteQueueFull
+from change_feed import ChangeFeed, ClientStreamLimit, FeedFull
+from health import HealthProber, check_disk
+from profiling import ProfilerBusy, cprofile_event_loop, memory_diff, sampled_cpu_profile
+from tracing import JsonlExporter, TimedRoute, TracingMiddleware, span
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -27,64 +48,146 @@ supabase_service_key = os.environ['SUPABASE_SERVICE_KEY']
 ghl_api_key = os.environ['GOHIGHLEVEL_API_KEY']
 ghl_base_url = os.environ['GOHIGHLEVEL_BASE_URL']
 
-# Create Supabase client (using service key for server-side operations)
-supabase: Client = create_client(supabase_url, supabase_service_key)
+# Shared pooled clients for scraping and GoHighLevel
+http_clients = OutboundClients(
+    ghl_base_url,
+    ghl_api_key,
+    per_host_limit=int(os.environ.get('SCRAPE_PER_HOST_LIMIT', '4')),
+)
 
-# Create the main app without a prefix
-app = FastAPI(title="Atlas API", description="Real Estate Agent Directory")
+# On-disk cache of scraped pages, shared by agents of the same brokerage
+scrape_cache = ScrapeCache(
+    os.environ.get('SCRAPE_CACHE_PATH', str(ROOT_DIR / 'cache' / 'scrape_cache.sqlite3')),
+    ttl=float(os.environ.get('SCRAPE_CACHE_TTL', '86400')),
+    max_bytes=int(os.environ.get('SCRAPE_CACHE_MAX_BYTES', str(256 * 1024 * 1024))),
+)
 
-# Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+# Normalized email/phone/name index for duplicate detection, loaded at startup
+agent_index = AgentIndex()
 
-# Default tags (can be customized via admin settings)
-DEFAULT_TAGS = [
-    "Residential Sales", "Commercial Sales", "Luxury Properties", "Investment Properties",
-    "First-Time Buyers", "Military Relocation", "Senior Living", "New Construction",
-    "Foreclosures", "Short Sales", "Property Management", "Land Sales",
-    "Condominiums", "Townhomes", "Multi-Family", "Vacation Homes",
-    "Buyer Representation", "Seller Representation", "Relocation Services", "Staging Services"
-]
+# Durable outbox for GoHighLevel contact pushes
+ghl_outbox = GHLOutbox(
+    os.environ.get('GHL_OUTBOX_PATH', str(ROOT_DIR / 'data' / 'ghl_outbox.sqlite3')),
+    batch_size=int(os.environ.get('GHL_OUTBOX_BATCH_SIZE', '20')),
+)
 
-# Service area types
-SERVICE_AREA_TYPES = ["city", "county", "state"]
-
-# New rating system
-RATING_LEVELS = {
-    "exceptional": {
-        "label": "Exceptional",
-        "description": "Rockstar agents who go above and beyond consistently on multiple deals",
-        "color": "#10B981",  # Green
-        "value": 5
-    },
-    "great": {
-        "label": "Great", 
-        "description": "Agents who have done a great job on one or multiple deals",
-        "color": "#3B82F6",  # Blue
-        "value": 4
-    },
-    "average": {
-        "label": "Average",
-        "description": "Agents who have done an average job getting deals moved",
-        "color": "#F59E0B",  # Yellow
-        "value": 3
-    },
-    "poor": {
-        "label": "Poor",
-        "description": "Agents who have had issues and probably wouldn't use again",
-        "color": "#EF4444",  # Red
-        "value": 2
-    },
-    "blacklist": {
-        "label": "Black List",
-        "description": "Never would use them again. Keep them away with a ten-foot pole",
-        "color": "#1F2937",  # Dark gray
-        "value": 1
-    }
-}
+# POST /api/ghl/bulk-sync runs in the background; its jobs are polled by id
+ghl_bulk_jobs = BulkSyncJobs()
+
+# Resized profile images, served from /api/images instead of hotlinking brokerage sites
+image_store = ImageStore(
+    os.environ.get('IMAGE_STORE_PATH', str(ROOT_DIR / 'cache' / 'images')),
+    quota_bytes=int(os.environ.get('IMAGE_STORE_QUOTA_BYTES', str(1024 * 1024 * 1024))),
+)
+
+# HTML parsing runs off the event loop (PARSE_POOL_MODE: auto, process, thread or inline)
+parse_pool = ParsePool(
+    mode=os.environ.get('PARSE_POOL_MODE', 'auto'),
+    workers=int(os.environ.get('PARSE_POOL_WORKERS', '2')),
+    max_pending=int(os.environ.get('PARSE_POOL_MAX_PENDING', '64')),
+)
+
+# Event loop heartbeat; stalls longer than the threshold are logged with the blocking stack
+loop_monitor = LoopLagMonitor(
+    interval=float(os.environ.get('LOOP_LAG_INTERVAL_MS', '100')) / 1000,
+    threshold=float(os.environ.get('LOOP_LAG_THRESHOLD_MS', '250')) / 1000,
+)
+
+# Slow initialization runs after the server starts listening; /api/health/ready reports it
+warm_up = WarmUp()
+
+# Dependency checks run in the background; GET /api/health only reads their cached results
+health_prober = HealthProber(
+    interval=float(os.environ.get('HEALTH_PROBE_INTERVAL', '15')),
+    timeout=float(os.environ.get('HEALTH_PROBE_TIMEOUT', '5')),
+    # Consecutive failed probes before a dependency is reported down
+    failure_threshold=int(os.environ.get('HEALTH_PROBE_FAILURES', '2')),
+)
+DISK_MIN_FREE_BYTES = int(os.environ.get('DISK_MIN_FREE_MB', '200')) * 1024 * 1024
+
+# Server-Sent Events at /api/stream: agent-created, agent-updated, comment-created and tags-changed
+change_feed = ChangeFeed(
+    buffer_size=int(os.environ.get('STREAM_CLIENT_BUFFER', '256')),
+    history=int(os.environ.get('STREAM_HISTORY', '1024')),
+    max_clients=int(os.environ.get('STREAM_MAX_CLIENTS', '10000')),
+    max_per_client=int(os.environ.get('STREAM_MAX_PER_CLIENT', '32')),
+    max_seconds=float(os.environ.get('STREAM_MAX_SECONDS', '300')),
+)
+
+# Background scraping configuration
+scrape_max_bytes = int(os.environ.get('SCRAPE_MAX_BYTES', str(2 * 1024 * 1024)))
+scrape_workers = int(os.environ.get('SCRAPE_WORKERS', '4'))
+scrape_max_retries = int(os.environ.get('SCRAPE_MAX_RETRIES', '3'))
+scrape_queue_size = int(os.environ.get('SCRAPE_QUEUE_SIZE', '1000'))
+
+def create_supabase_client():
+    """Supabase client using the service key for server-side operations"""
+    # Deferred import: supabase and its auth/storage/realtime dependencies take ~250ms to load
+    from supabase import create_client
+    return create_client(supabase_url, supabase_service_key)
+
+# Supabase client, created during warm-up (or on first use), timed per table/operation
+supabase = InstrumentedClient(factory=create_supabase_client)
+# Queries slower than this are logged with their shape
+QUERY_STATS.slow_threshold = float(os.environ.get('SLOW_QUERY_MS', '500')) / 1000
+# Fail fast once this share of recent queries errored or took longer than DB_BREAKER_SLOW_MS
+DB_BREAKER.error_rate = float(os.environ.get('DB_BREAKER_ERROR_RATE', '0.5'))
+DB_BREAKER.slow_threshold = float(os.environ.get('DB_BREAKER_SLOW_MS', '3000')) / 1000
+DB_BREAKER.open_seconds = float(os.environ.get('DB_BREAKER_OPEN_SECONDS', '15'))
+# Last good read results, served with `X-Cache-Status: stale` while Supabase is unavailable
+READ_CACHE.max_rows = int(os.environ.get('STALE_CACHE_MAX_ROWS', '50000'))
+
+# Create the main app without a prefix
+app = FastAPI(title="Atlas API", description="Real Estate Agent Directory")
+
+# Create a router with the /api prefix (TimedRoute lets traced requests time response encoding)
+api_router = APIRouter(prefix="/api", route_class=TimedRoute)
 
 # Admin settings password
 ADMIN_PASSWORD = "admin123"
 
+# Upper bound for the `limit` query parameter of GET /api/agents
+MAX_AGENTS_LIMIT = int(os.environ.get('MAX_AGENTS_LIMIT', '1000'))
+
+# How POST /api/comments writes (COMMENT_WRITE_MODE):
+#   direct        one insert per request (default)
+#   batched       concurrent comments share multi-row inserts; 200 once the row is stored
+#   write_behind  202 as soon as the comment is queued; lost if the process dies before the flush
+COMMENT_WRITE_MODE = os.environ.get('COMMENT_WRITE_MODE', 'direct')
+if COMMENT_WRITE_MODE not in ('direct', 'batched', 'write_behind'):
+    # A typo would otherwise batch comments and drop the route-wide rate limit
+    raise ValueError(f"Unknown COMMENT_WRITE_MODE: {COMMENT_WRITE_MODE}")
+comment_writer = WriteBatcher(
+    'comments',
+    lambda rows: supabase.table('comments').insert(rows).execute().data,
+    ack='queue' if COMMENT_WRITE_MODE == 'write_behind' else 'flush',
+    max_rows=int(os.environ.get('COMMENT_BATCH_MAX_ROWS', '100')),
+    max_delay=float(os.environ.get('COMMENT_BATCH_MAX_DELAY_MS', '10')) / 1000,
+    max_queue=int(os.environ.get('COMMENT_QUEUE_SIZE', '5000')),
+    # Batched comments reach other clients once they are stored, not when queued
+    on_written=lambda rows: publish_comments(rows),
+)
+
+# Rate limits per route, first match wins: (method, path prefix, per-client rate/s, burst, route rate/s, burst)
+RATE_LIMIT_RULES = [
+    RouteLimit("POST", "/api/agents", client_rate=0.2, client_burst=5, route_rate=5, route_burst=20),
+    # Batched comment writes push back through their bounded queue instead of a route-wide limit
+    RouteLimit("POST", "/api/comments", client_rate=1, client_burst=10,
+               **({} if COMMENT_WRITE_MODE != 'direct' else {"route_rate": 50, "route_burst": 200})),
+    RouteLimit("POST", "/api/ghl", client_rate=0.5, client_burst=5),
+    RouteLimit("*", "/api/admin", client_rate=1, client_burst=10),
+    RouteLimit("GET", "/api/agents", client_rate=10, client_burst=40),
+    RouteLimit("*", "/api", client_rate=20, client_burst=80),
+]
+rate_limiter = RateLimiter(
+    # RATE_LIMITS_ENABLED=0 keeps load shedding but drops per-client limits, for local load tests
+    RATE_LIMIT_RULES if os.environ.get('RATE_LIMITS_ENABLED', '1') == '1' else [],
+    max_concurrency=int(os.environ.get('MAX_CONCURRENT_REQUESTS', '64')),
+    max_queue=int(os.environ.get('MAX_QUEUED_REQUESTS', '128')),
+    # Streams stay open for minutes; they are capped by STREAM_MAX_CLIENTS and STREAM_MAX_PER_CLIENT instead
+    exempt_paths=("/api/health", "/metrics", "/api/stream"),
+)
+
 def create_tag_settings_table():
     """Create tag_settings table if it doesn't exist"""
     try:
@@ -164,6 +267,20 @@ class CommentCreate(BaseModel):
     content: str
     rating: Optional[str] = None  # Now uses rating keys
 
+# Rows read from our own database are validated once, in bulk, and encoded by
+# pydantic-core instead of per-row Model(**row) plus FastAPI's response_model pass
+TRUSTED_ROWS_FAST_PATH = os.environ.get('TRUSTED_ROWS_FAST_PATH', '1') == '1'
+AGENT_LIST = TypeAdapter(List[Agent])
+COMMENT_LIST = TypeAdapter(List[Comment])
+
+def trusted_rows_response(adapter: TypeAdapter, rows: list) -> Response:
+    """JSON response for DB rows, equivalent to what response_model would produce"""
+    with span("model", rows=len(rows)):
+        models = adapter.validate_python(rows)
+    with span("serialize", rows=len(rows)):
+        body = adapter.dump_json(models)
+    return Response(content=body, media_type="application/json")
+
 class TagSettings(BaseModel):
     tags: List[str]
 
@@ -183,49 +300,76 @@ class GoHighLevelContact(BaseModel):
     companyName: Optional[str] = None
     source: str = "Atlas Directory"
 
+class GHLBulkSync(BaseModel):
+    agent_ids: Optional[List[str]] = None
+    submitted_by: Optional[str] = None
+    service_area: Optional[str] = None
+    tags: Optional[List[str]] = None
+    limit: int = Field(1000, gt=0, le=5000)
+    # Requests per second; the outbox's shared GHL limit applies on top of this
+    rate: float = Field(8.0, gt=0, le=10)
+    concurrency: int = Field(4, gt=0, le=16)
+
 # Image scraping functions
-async def scrape_agent_image(full_name: str, website: str, service_area: str) -> Optional[str]:
-    """Try to scrape agent profile image from website or search"""
+# In-flight page fetches, so agents sharing a website wait on a single request
+_pending_fetches = {}
+
+async def fetch_image_candidates(website: str) -> list:
+    """Get the image candidates of a page, from cache or with a (conditional) GET"""
+    pending = _pending_fetches.get(website)
+    if pending is not None:
+        return await asyncio.shield(pending)
+    task = asyncio.ensure_future(_fetch_image_candidates(website))
+    _pending_fetches[website] = task
     try:
-        # First try the website
-        if website:
-            image_url = await scrape_from_website(website, full_name)
-            if image_url:
-                return image_url
-        
-        # Then try Google search
-        search_query = f"{full_name} realtor {service_area}"
-        image_url = await search_agent_image(search_query)
-        return image_url
-    except Exception as e:
-        print(f"Error scraping image for {full_name}: {e}")
-        return None
+        return await asyncio.shield(task)
+    finally:
+        if task.done():
+            _pending_fetches.pop(website, None)
+        else:
+            task.add_done_callback(lambda _: _pending_fetches.pop(website, None))
+
+async def _fetch_image_candidates(website: str) -> list:
+    cached = await asyncio.to_thread(scrape_cache.get, website)
+    if cached and cached.is_fresh(scrape_cache.ttl):
+        scrape_cache.record("hits")
+        return cached.candidates
+    
+    headers = cached.conditional_headers() if cached else {}
+    async with http_clients.hosts.slot(website):
+        async with http_clients.scrape.stream('GET', website, headers=headers) as response:
+            if response.status_code == 304 and cached:
+                scrape_cache.record("revalidated")
+                await asyncio.to_thread(scrape_cache.mark_revalidated, website)
+                return cached.candidates
+            
+            scrape_cache.record("misses")
+            # Skip error pages and non-HTML responses (PDFs, images, ...) without downloading them
+            if response.status_code != 200 or not is_html_content_type(response.headers.get('content-type')):
+                return []
+            # Profile photos sit near the top of the page, so a truncated body is fine
+            body = await read_limited(response, scrape_max_bytes)
+    
+    candidates = await parse_pool.extract(body, website)
+    await asyncio.to_thread(
+        scrape_cache.put,
+        website,
+        candidates,
+        etag=response.headers.get('etag'),
+        last_modified=response.headers.get('last-modified'),
+    )
+    return candidates
 
 async def scrape_from_website(website: str, agent_name: str) -> Optional[str]:
     """Scrape agent image from their website"""
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.get(website)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Look for images with agent name in alt text or nearby text
-                images = soup.find_all('img')
-                for img in images:
-                    alt_text = img.get('alt', '').lower()
-                    src = img.get('src', '')
-                    
-                    # Check if agent name appears in alt text
-                    name_parts = agent_name.lower().split()
-                    if any(part in alt_text for part in name_parts) and src:
-                        # Convert relative URLs to absolute
-                        if src.startswith('//'):
-                            return f"https:{src}"
-                        elif src.startswith('/'):
-                            from urllib.parse import urljoin
-                            return urljoin(website, src)
-                        elif src.startswith('http'):
-                            return src
+        with span("scrape", website=website):
+            candidates = await fetch_image_candidates(website)
+            # Look for images with agent name in alt text
+            return match_agent_image(candidates, agent_name)
+    except httpx.TransportError:
+        # Let the background worker retry network failures
+        raise
     except Exception as e:
         print(f"Error scraping website {website}: {e}")
     return None
@@ -236,30 +380,44 @@ async def search_agent_image(search_query: str) -> Optional[str]:
     # For now, we'll return None as we don't want to make unauthorized API calls
     return None
 
-# GoHighLevel integration
-async def create_ghl_contact(contact_data: GoHighLevelContact) -> dict:
-    """Create contact in GoHighLevel CRM"""
+async def store_profile_image(image_url: str) -> Optional[str]:
+    """Download a profile image once and return the path of its local thumbnails"""
     try:
-        async with httpx.AsyncClient() as client:
-            headers = {
-                "Authorization": f"Bearer {ghl_api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            response = await client.post(
-                f"{ghl_base_url}contacts/",
-                json=contact_data.dict(),
-                headers=headers,
-                timeout=30
-            )
-            
-            if response.status_code in [200, 201]:
-                return {"status": "success", "data": response.json()}
-            else:
-                return {"status": "error", "message": f"GHL API error: {response.status_code}"}
-                
+        async with http_clients.hosts.slot(image_url):
+            async with http_clients.scrape.stream('GET', image_url) as response:
+                content_type = response.headers.get('content-type', '')
+                if response.status_code != 200 or not content_type.startswith('image/'):
+                    return None
+                data = await read_limited(response, MAX_SOURCE_BYTES + 1)
+        if len(data) > MAX_SOURCE_BYTES:
+            return None
+        return image_path(await image_store.add(data))
     except Exception as e:
-        return {"status": "error", "message": f"Failed to create GHL contact: {str(e)}"}
+        logger.warning(f"Could not store profile image {image_url}: {e}")
+        return None
+
+async def process_scrape_job(job: dict) -> Optional[str]:
+    """Scrape an agent's profile image and patch it onto the stored agent"""
+    profile_image = None
+    if job['website']:
+        profile_image = await scrape_from_website(job['website'], job['full_name'])
+    if not profile_image:
+        profile_image = await search_agent_image(f"{job['full_name']} realtor {job['service_area']}")
+    if profile_image:
+        # Fall back to the original URL if it can't be thumbnailed
+        profile_image = await store_profile_image(profile_image) or profile_image
+        await asyncio.to_thread(
+            lambda: supabase.table('agents').update({'profile_image': profile_image}).eq('id', job['agent_id']).execute()
+        )
+        change_feed.publish("agent-updated", {"id": job['agent_id'], "profile_image": profile_image})
+    return profile_image
+
+scrape_queue = ScrapeJobQueue(
+    process_scrape_job,
+    concurrency=scrape_workers,
+    max_retries=scrape_max_retries,
+    maxsize=scrape_queue_size,
+)
 
 # Initialize database tables
 async def init_database():
@@ -275,12 +433,21 @@ async def root():
 
 @api_router.get("/health")
 async def health_check():
-    try:
-        # Test Supabase connection
-        result = supabase.table('agents').select("count").execute()
-        return {"status": "healthy", "database": "connected"}
-    except Exception as e:
-        return {"status": "unhealthy", "error": str(e)}
+    """Cached dependency status from the background prober, with each probe's latency and age"""
+    health = health_prober.snapshot()
+    database = health["dependencies"]["supabase"]["ok"]
+    health["database"] = "unknown" if database is None else "connected" if database else "disconnected"
+    return health
+
+@api_router.get("/health/live")
+async def liveness_check():
+    """The process is up and serving requests; no dependency is checked"""
+    return {"status": "alive"}
+
+@api_router.get("/health/ready")
+async def readiness_check():
+    """200 once start-up warm-up has finished, 503 with its progress until then"""
+    return JSONResponse(warm_up.stats(), status_code=200 if warm_up.ready else 503)
 
 @api_router.get("/tags")
 async def get_predefined_tags():
@@ -327,6 +494,7 @@ async def update_admin_tags(tag_settings: TagSettings, password: str = Query(...
         
         # Save tags
         success = save_custom_tags(tag_settings.tags)
+        change_feed.publish("tags-changed", {"tags": tag_settings.tags})
         if success:
             return {"message": "Tags updated successfully", "tags": tag_settings.tags}
         else:
@@ -354,6 +522,7 @@ async def delete_admin_tag(tag_name: str, password: str = Query(..., description
         
         # Save updated tags
         success = save_custom_tags(updated_tags)
+        change_feed.publish("tags-changed", {"tags": updated_tags})
         if success:
             return {"message": f"Tag '{tag_name}' deleted successfully", "tags": updated_tags}
         else:
@@ -363,14 +532,99 @@ async def delete_admin_tag(tag_name: str, password: str = Query(..., description
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/admin/duplicates")
+async def get_duplicate_report(password: str = Query(..., description="Admin password")):
+    """Groups of likely duplicate agents and contacts shared by different agents (admin only)"""
+    if password != ADMIN_PASSWORD:
+        raise HTTPException(status_code=401, detail="Invalid password")
+    
+    try:
+        rows = await asyncio.to_thread(lambda: list(iter_agent_rows(supabase)))
+        groups = dedupe_report(rows)
+        return {"agents_scanned": len(rows), "duplicate_groups": len(groups), "groups": groups}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/admin/slow-queries")
+async def get_slow_queries(
+    password: str = Query(..., description="Admin password"),
+    limit: int = Query(10, description="Number of query shapes"),
+    sort: str = Query("p95", description="p50, p95, p99, max, mean or count"),
+):
+    """Slowest Supabase query shapes with latency percentiles (admin only)"""
+    if password != ADMIN_PASSWORD:
+        raise HTTPException(status_code=401, detail="Invalid password")
+    
+    return {
+        "slow_threshold_ms": QUERY_STATS.slow_threshold * 1000,
+        "slow_queries": QUERY_STATS.slow_count,
+        "shapes": QUERY_STATS.top(max(1, min(limit, 100)), sort),
+    }
+
+@api_router.post("/admin/profile/cpu")
+async def profile_cpu(
+    password: str = Query(..., description="Admin password"),
+    seconds: float = Query(10, description="Profile duration (max 60)"),
+    mode: str = Query("sample", description="sample (collapsed stacks) or cprofile (pstats table)"),
+    interval_ms: float = Query(5, description="Sampling interval"),
+    all_threads: bool = Query(False, description="Sample every thread, not just the event loop"),
+):
+    """Profile the running worker; `sample` output can be fed to flamegraph.pl or speedscope (admin only)"""
+    if password != ADMIN_PASSWORD:
+        raise HTTPException(status_code=401, detail="Invalid password")
+    
+    try:
+        if mode == "cprofile":
+            report = await cprofile_event_loop(seconds)
+        elif mode == "sample":
+            report = await sampled_cpu_profile(seconds, max(interval_ms, 1) / 1000, all_threads)
+        else:
+            raise HTTPException(status_code=400, detail="mode must be 'sample' or 'cprofile'")
+        return PlainTextResponse(report)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@api_router.post("/admin/profile/memory")
+async def profile_memory(
+    password: str = Query(..., description="Admin password"),
+    seconds: float = Query(10, description="Time between the two snapshots (max 60)"),
+    limit: int = Query(25, description="Number of allocation sites"),
+    frames: int = Query(1, description="Traceback depth per site"),
+):
+    """Allocation sites that grew the most over `seconds`, from a tracemalloc snapshot diff (admin only)"""
+    if password != ADMIN_PASSWORD:
+        raise HTTPException(status_code=401, detail="Invalid password")
+    
+    try:
+        return {"seconds": seconds, "sites": await memory_diff(seconds, max(1, limit), max(1, min(frames, 25)))}
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
 @api_router.get("/service-area-types")
 async def get_service_area_types():
     """Get available service area types"""
     return {"types": SERVICE_AREA_TYPES}
 
 # Agents endpoints
+def enqueue_profile_scrape(agent: Agent) -> Optional[str]:
+    """Queue a background profile image scrape; returns the job id"""
+    try:
+        return scrape_queue.enqueue(agent.id, agent.full_name, agent.website, agent.service_area)['id']
+    except (asyncio.QueueFull, RuntimeError) as e:
+        logger.warning(f"Skipping profile image scrape for agent {agent.id}: {e!r}")
+        return None
+
+async def load_agent_index():
+    """Build the duplicate index from the agents table without blocking the loop"""
+    try:
+        rows = await asyncio.to_thread(lambda: list(iter_agent_rows(supabase)))
+        agent_index.load(rows)
+        logger.info(f"Agent index loaded with {len(agent_index)} agents")
+    except Exception as e:
+        logger.warning(f"Agent index not available, duplicate detection disabled: {e}")
+
 @api_router.post("/agents", response_model=Agent)
-async def create_agent(agent: AgentCreate):
+async def create_agent(agent: AgentCreate, response: Response):
     try:
         # Validate that at least one tag is selected
         if not agent.tags or len(agent.tags) == 0:
@@ -378,20 +632,67 @@ async def create_agent(agent: AgentCreate):
         
         agent_data = agent.dict()
         
-        # Try to scrape profile image
-        profile_image = await scrape_agent_image(
-            agent.full_name, 
-            agent.website, 
-            agent.service_area
-        )
-        if profile_image:
-            agent_data['profile_image'] = profile_image
+        # Same name and email or phone as an existing agent: return that agent instead of a copy
+        existing_id, matched_on = agent_index.find(agent_data)
+        if existing_id and is_strong_match(matched_on):
+            existing = supabase.table('agents').select("*").eq('id', existing_id).execute()
+            if existing.data:
+                response.headers['X-Duplicate-Of'] = existing_id
+                return Agent(**existing.data[0])
         
         result = supabase.table('agents').insert(agent_data).execute()
         if result.data:
-            return Agent(**result.data[0])
+            created = Agent(**result.data[0])
+            agent_index.add(result.data[0])
+            if existing_id:
+                # Shares a phone/email under another name, or only name + brokerage: keep it, but suggest a merge
+                response.headers['X-Possible-Duplicate-Of'] = existing_id
+            # Profile image is scraped in the background and patched in later
+            job_id = enqueue_profile_scrape(created)
+            if job_id:
+                response.headers['X-Scrape-Job-Id'] = job_id
+            change_feed.publish("agent-created", created.model_dump(mode="json"))
+            return created
         else:
             raise HTTPException(status_code=400, detail="Failed to create agent")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/agents/import")
+async def import_agents(agents: List[AgentCreate]):
+    """Bulk-create agents, skipping duplicates of existing agents and of each other"""
+    try:
+        batch_index = AgentIndex()
+        new_rows = []
+        duplicates = []
+        for position, agent in enumerate(agents):
+            if not agent.tags:
+                raise HTTPException(status_code=400, detail=f"Agent {position}: at least one tag must be selected")
+            agent_data = agent.dict()
+            existing_id, matched_on = agent_index.find(agent_data)
+            if existing_id and is_strong_match(matched_on):
+                duplicates.append({"index": position, "existing_id": existing_id, "matched_on": matched_on})
+                continue
+            earlier, earlier_on = batch_index.find(agent_data)
+            if earlier is not None and is_strong_match(earlier_on):
+                duplicates.append({"index": position, "duplicate_of_index": int(earlier), "matched_on": earlier_on})
+                continue
+            batch_index.add({**agent_data, "id": str(position)})
+            new_rows.append(agent_data)
+        
+        created = []
+        if new_rows:
+            result = supabase.table('agents').insert(new_rows).execute()
+            for row in result.data:
+                agent_index.add(row)
+                created.append(Agent(**row))
+                enqueue_profile_scrape(created[-1])
+                change_feed.publish("agent-created", created[-1].model_dump(mode="json"))
+        return {"created": created, "duplicates": duplicates}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -403,6 +704,7 @@ async def get_agents(
     submitted_by: Optional[str] = Query(None, description="Filter by submitted_by for 'My Agents' view"),
     limit: int = Query(100, description="Limit results")
 ):
+    limit = max(1, min(limit, MAX_AGENTS_LIMIT))
     try:
         query = supabase.table('agents').select("*")
         
@@ -425,9 +727,13 @@ async def get_agents(
         
         result = query.limit(limit).execute()
         
+        if TRUSTED_ROWS_FAST_PATH:
+            return trusted_rows_response(AGENT_LIST, result.data)
+        
         agents = []
-        for item in result.data:
-            agents.append(Agent(**item))
+        with span("model", rows=len(result.data)):
+            for item in result.data:
+                agents.append(Agent(**item))
         
         return agents
     except Exception as e:
@@ -438,41 +744,133 @@ async def get_agent(agent_id: str):
     try:
         result = supabase.table('agents').select("*").eq('id', agent_id).execute()
         if result.data:
-            return Agent(**result.data[0])
+            with span("model"):
+                return Agent(**result.data[0])
         else:
             raise HTTPException(status_code=404, detail="Agent not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Comments endpoints
 @api_router.post("/comments", response_model=Comment)
-async def create_comment(comment: CommentCreate):
+async def create_comment(comment: CommentCreate, response: Response):
     try:
         comment_data = comment.dict()
+        if COMMENT_WRITE_MODE != 'direct':
+            return await create_comment_batched(comment_data, response)
         result = supabase.table('comments').insert(comment_data).execute()
         if result.data:
+            publish_comments(result.data)
             return Comment(**result.data[0])
         else:
             raise HTTPException(status_code=400, detail="Failed to create comment")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def create_comment_batched(comment_data: dict, response: Response) -> Comment:
+    # Assigned here rather than by the database so the comment can be returned before it is written
+    comment_data['id'] = str(uuid.uuid4())
+    comment_data['created_at'] = datetime.now(timezone.utc).isoformat()
+    try:
+        stored = comment_writer.submit(comment_data)
+    except WriteQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    if stored is None:
+        # Write-behind: accepted, not yet stored
+        response.status_code = 202
+        return Comment(**comment_data)
+    return Comment(**(await stored))
+
+def publish_comments(rows: List[dict]):
+    for row in rows:
+        change_feed.publish("comment-created", row)
+
+@api_router.get("/comments/write-queue")
+async def get_comment_write_queue_stats():
+    """Get the comment write batcher's queue depth and batch sizes"""
+    return {"mode": COMMENT_WRITE_MODE, **comment_writer.stats()}
+
 @api_router.get("/agents/{agent_id}/comments", response_model=List[Comment])
 async def get_agent_comments(agent_id: str):
     try:
         result = supabase.table('comments').select("*").eq('agent_id', agent_id).order('created_at', desc=True).execute()
         
+        if TRUSTED_ROWS_FAST_PATH:
+            return trusted_rows_response(COMMENT_LIST, result.data)
+        
         comments = []
-        for item in result.data:
-            comments.append(Comment(**item))
+        with span("model", rows=len(result.data)):
+            for item in result.data:
+                comments.append(Comment(**item))
         
         return comments
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Background scrape job endpoints
+@api_router.get("/scrape-jobs")
+async def get_scrape_queue_stats():
+    """Get queue depth and worker status for profile image scraping"""
+    return scrape_queue.stats()
+
+@api_router.get("/scrape-jobs/{job_id}")
+async def get_scrape_job(job_id: str):
+    """Get the status of a single profile image scrape job (without the agent's details)"""
+    job = scrape_queue.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Scrape job not found")
+    return scrape_queue.public_status(job)
+
+@api_router.get("/scrape-cache")
+async def get_scrape_cache_stats():
+    """Get hit rates and size of the scraped page cache"""
+    return {**scrape_cache.stats(), "hosts_in_use": http_clients.hosts.in_use()}
+
+@api_router.get("/parse-pool")
+async def get_parse_pool_stats():
+    """Get worker count, backlog and timings of the HTML parsing pool"""
+    return parse_pool.stats()
+
+@api_router.get("/circuit-breaker")
+async def get_circuit_breaker_stats():
+    """Get the Supabase circuit breaker state and the stale read cache"""
+    return {"supabase": DB_BREAKER.stats(), "stale_cache": READ_CACHE.stats()}
+
+@api_router.get("/loop-lag")
+async def get_loop_lag_stats(password: str = Query(..., description="Admin password")):
+    """Get event loop lag and the stack of the last stall (admin only)"""
+    if password != ADMIN_PASSWORD:
+        raise HTTPException(status_code=401, detail="Invalid password")
+    return loop_monitor.stats()
+
+# Profile image thumbnails
+@api_router.get("/images/stats")
+async def get_image_store_stats():
+    """Get disk usage and eviction counts of the thumbnail store"""
+    return image_store.stats()
+
+@api_router.get("/images/{image_hash}/{size}")
+async def get_profile_image(image_hash: str, size: str, request: Request):
+    """Serve a stored profile image thumbnail (sm, md or lg)"""
+    if not re.fullmatch(r'[0-9a-f]{64}', image_hash):
+        raise HTTPException(status_code=404, detail="Image not found")
+    path = await image_store.get(image_hash, size, webp='image/webp' in request.headers.get('accept', ''))
+    if not path:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(
+        path,
+        media_type='image/webp' if path.suffix == '.webp' else 'image/jpeg',
+        headers={"Cache-Control": "public, max-age=31536000, immutable", "Vary": "Accept"},
+    )
+
 # GoHighLevel integration endpoint
 @api_router.post("/ghl/add-contact")
 async def add_to_gohighlevel(agent_id: str):
+    """Queue an agent for GoHighLevel; the outbox dispatcher pushes it in the background"""
     try:
         # Get agent details
         agent_result = supabase.table('agents').select("*").eq('id', agent_id).execute()
@@ -480,27 +878,67 @@ async def add_to_gohighlevel(agent_id: str):
             raise HTTPException(status_code=404, detail="Agent not found")
         
         agent = Agent(**agent_result.data[0])
+        contact_data = GoHighLevelContact(**contact_payload(agent.dict()))
         
-        # Split full name
-        name_parts = agent.full_name.split(' ', 1)
-        first_name = name_parts[0]
-        last_name = name_parts[1] if len(name_parts) > 1 else ""
+        job = await asyncio.to_thread(ghl_outbox.enqueue, agent_id, contact_data.dict(), False)
+        ghl_outbox.wake()
+        if job['status'] == SYNCED:
+            return {"status": "success", "job_id": job['id'], "skipped": True, "message": "Agent already synced"}
+        return {"status": "queued", "job_id": job['id']}
         
-        # Create GHL contact
-        contact_data = GoHighLevelContact(
-            firstName=first_name,
-            lastName=last_name,
-            email=agent.email,
-            phone=agent.phone,
-            website=agent.website,
-            companyName=agent.brokerage
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/ghl/jobs/{job_id}")
+async def get_ghl_job(job_id: str):
+    """Get the status of a queued GoHighLevel push"""
+    job = await asyncio.to_thread(ghl_outbox.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="GHL job not found")
+    return job
+
+@api_router.get("/ghl/outbox")
+async def get_ghl_outbox_stats():
+    """Get counts of pending, synced and failed GoHighLevel pushes"""
+    return await asyncio.to_thread(ghl_outbox.stats)
+
+@api_router.post("/ghl/bulk-sync", status_code=202)
+async def bulk_sync_gohighlevel(sync: GHLBulkSync, password: str = Query(..., description="Admin password")):
+    """Start pushing many agents to GoHighLevel in the background (admin only); poll the returned job"""
+    if password != ADMIN_PASSWORD:
+        raise HTTPException(status_code=401, detail="Invalid password")
+    if not sync.agent_ids and not (sync.submitted_by or sync.service_area or sync.tags):
+        raise HTTPException(status_code=400, detail="Provide agent_ids or at least one filter")
+    try:
+        agents = select_agents(
+            supabase,
+            agent_ids=sync.agent_ids,
+            submitted_by=sync.submitted_by,
+            service_area=sync.service_area,
+            tags=sync.tags,
+            limit=sync.limit,
         )
-        
-        result = await create_ghl_contact(contact_data)
-        return result
-        
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    # Through the outbox, so synced agents are skipped and queued ones are left to its dispatcher
+    return ghl_bulk_jobs.submit(
+        lambda on_result: ghl_outbox.sync_now(
+            http_clients.ghl, agents, rate=sync.rate, concurrency=sync.concurrency, on_result=on_result
+        ),
+        total=len(agents),
+    )
+
+@api_router.get("/ghl/bulk-sync/{job_id}")
+async def get_bulk_sync_job(job_id: str, password: str = Query(..., description="Admin password")):
+    """Get the progress, and once finished the per-agent results, of a bulk sync (admin only)"""
+    if password != ADMIN_PASSWORD:
+        raise HTTPException(status_code=401, detail="Invalid password")
+    job = ghl_bulk_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Bulk sync job not found")
+    return job
 
 # Search location on map endpoint
 @api_router.get("/search-location")
@@ -556,15 +994,80 @@ async def search_location(query: str):
         # Fallback to NYC
         return {"latitude": 40.7128, "longitude": -74.0060, "zoom": 10}
 
+@api_router.get("/rate-limits")
+async def get_rate_limit_stats():
+    """Get in-flight, queued, rate-limited and shed request counts"""
+    return rate_limiter.stats()
+
+@api_router.get("/stream")
+async def stream_changes(request: Request):
+    """Server-Sent Events of changes; apply them to loaded data, refetch on `resync`"""
+    try:
+        subscriber = change_feed.subscribe(request.headers.get('last-event-id'), client_address(request.scope))
+    except ClientStreamLimit as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    except FeedFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return StreamingResponse(
+        change_feed.stream(subscriber),
+        media_type="text/event-stream",
+        # Cleanup also runs if the client disconnects while the stream is waiting to send
+        background=BackgroundTask(change_feed.unsubscribe, subscriber),
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@api_router.get("/stream/stats")
+async def get_stream_stats():
+    """Get connected change feed clients and events published"""
+    return change_feed.stats()
+
+# Prometheus metrics; component stats are read at scrape time
+Gauge("atlas_scrape_queue_depth", "Profile image scrape jobs waiting",
+      function=lambda: scrape_queue.stats()["queue_depth"])
+Gauge("atlas_scrape_jobs_in_flight", "Profile image scrape jobs running",
+      function=lambda: scrape_queue.stats()["in_flight"])
+Counter("atlas_scrape_cache_lookups_total", "Scraped page cache lookups by result", ("result",),
+        function=lambda: {(key,): value for key, value in scrape_cache.stats().items()
+                          if key in ("hits", "revalidated", "misses")})
+Gauge("atlas_parse_pool_pending", "HTML parse jobs submitted to the worker pool",
+      function=lambda: parse_pool.pending)
+Gauge("atlas_change_feed_clients", "Clients connected to /api/stream",
+      function=lambda: change_feed.stats()["clients"])
+Gauge("atlas_comment_write_queue_depth", "Comments waiting for a batched insert",
+      function=lambda: comment_writer.stats()["queued"])
+Gauge("atlas_ghl_outbox_jobs", "GoHighLevel outbox jobs by status", ("status",),
+      function=lambda: {(status,): count for status, count in ghl_outbox.counts.items()})
+Counter("atlas_db_slow_queries_total", "Supabase queries over SLOW_QUERY_MS",
+        function=lambda: QUERY_STATS.slow_count)
+Counter("atlas_rate_limit_decisions_total", "Rate limiter decisions", ("decision",),
+        function=lambda: {(key,): value for key, value in rate_limiter.counts.items()})
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 # Include the router in the main app
 app.include_router(api_router)
 
+# Added before CORS so that 429/503 responses still carry CORS headers
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(StaleHeaderMiddleware)
+# Server-Timing for requests sent with `X-Debug-Timing: 1` (or all, with TRACE_ALL_REQUESTS=1)
+app.add_middleware(
+    TracingMiddleware,
+    trace_all=os.environ.get('TRACE_ALL_REQUESTS', '0') == '1',
+    exporter=JsonlExporter(os.environ['TRACE_EXPORT_PATH']) if os.environ.get('TRACE_EXPORT_PATH') else None,
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the frontend see that data was served from the stale cache
+    expose_headers=["X-Cache-Status", "Age"],
 )
 
 # Configure logging
@@ -574,14 +1077,67 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def warm_up_database():
+    """Create the Supabase client and probe tag_settings off the event loop"""
+    await asyncio.to_thread(supabase.connect)
+    # Initialize tag settings table
+    await asyncio.to_thread(create_tag_settings_table)
+    asyncio.create_task(load_agent_index())
+
+async def probe_supabase():
+    await asyncio.to_thread(lambda: supabase.table('agents').select("id").limit(1).execute())
+
+async def probe_ghl():
+    response = await http_clients.ghl.get("contacts/", params={"limit": 1})
+    # Rate limiting still means reachable and authenticated
+    if response.status_code >= 500 or response.status_code in (401, 403):
+        raise RuntimeError(f"HTTP {response.status_code}")
+    return {"status_code": response.status_code}
+
+async def probe_disk():
+    paths = dict.fromkeys(str(path) for path in (scrape_cache.path.parent, ghl_outbox.path.parent, image_store.root))
+    return await asyncio.to_thread(check_disk, paths, DISK_MIN_FREE_BYTES)
+
+health_prober.add("supabase", probe_supabase, critical=True)
+health_prober.add("ghl", probe_ghl)
+health_prober.add("disk", probe_disk, critical=True)
+
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting Atlas API server...")
+    await loop_monitor.start()
     await init_database()
-    # Initialize tag settings table
-    create_tag_settings_table()
+    # Scrapes queued before the parse pool is warm are parsed inline
+    await scrape_queue.start()
+    await ghl_outbox.start(lambda: http_clients.ghl)
+    # Everything slow happens after the server is listening; /api/health/ready waits for it
+    warm_up.start({
+        "database": warm_up_database,
+        "http_clients": http_clients.start,
+        "image_store": image_store.load,
+        "parse_pool": parse_pool.start,
+    })
+    # The GHL probe uses the shared client; let warm-up build it (and load the CA bundle) off the loop first
+    await health_prober.start(after=warm_up.wait("http_clients"))
+    await READ_CACHE.start()
+    if COMMENT_WRITE_MODE != 'direct':
+        await comment_writer.start()
     logger.info("Atlas API started successfully")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Atlas API shutting down")
+    change_feed.close()
+    await warm_up.stop()
+    # Flush queued comments while the database client is still usable
+    await comment_writer.stop(timeout=float(os.environ.get('COMMENT_FLUSH_TIMEOUT', '10')))
+    await health_prober.stop()
+    await READ_CACHE.stop()
+    await scrape_queue.stop()
+    await ghl_bulk_jobs.stop()
+    await ghl_outbox.stop()
+    ghl_outbox.close()
+    await http_clients.aclose()
+    parse_pool.shutdown()
+    scrape_cache.close()
+    await loop_monitor.stop()
@@ -0,0 +1,139 @@
+"""
+Last-known-good cache for database reads made while serving requests.
+
+Every successful read is remembered (an LRU bounded by total rows). When
+Supabase is unavailable - the circuit breaker is open or the query failed
+upstream - the remembered result is served instead and the response is
+marked with `X-Cache-Status: stale` and an `Age` header. Reads served
+stale are re-run in the background until they succeed, so the cache is
+fresh again soon after the upstream recovers.
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+STALE_READS = Counter("atlas_stale_reads_total", "Database reads answered from the last-known-good cache")
+
+# Ages of the stale results used by the current request; None outside requests
+_stale_ages: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("stale_ages", default=None)
+
+
+class StaleReadCache:
+    def __init__(self, max_rows: int = 50000, revalidate_interval: float = 5.0):
+        self.max_rows = max_rows
+        self.revalidate_interval = revalidate_interval
+        self.rows = 0
+        self.served_stale = 0
+        self.revalidated = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (result, rows, stored at)
+        self._revalidate: Dict[str, Callable] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def active() -> bool:
+        """Only reads made for a request are cached; background jobs would just churn the LRU"""
+        return _stale_ages.get() is not None
+
+    def put(self, key: str, result, rows: int):
+        if rows > self.max_rows:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.rows -= previous[1]
+            self._entries[key] = (result, rows, time.time())
+            self.rows += rows
+            while self.rows > self.max_rows:
+                evicted_key, (_, evicted_rows, _) = self._entries.popitem(last=False)
+                self.rows -= evicted_rows
+                self._revalidate.pop(evicted_key, None)
+            self._revalidate.pop(key, None)
+
+    def get_stale(self, key: str, refresh: Callable):
+        """The last good result for key, or None; schedules `refresh` to re-run the read"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self._revalidate[key] = refresh
+            self.served_stale += 1
+        result, _, stored_at = entry
+        ages = _stale_ages.get()
+        if ages is not None:
+            ages.append(time.time() - stored_at)
+        STALE_READS.inc()
+        return result
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._revalidate_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _revalidate_loop(self):
+        while True:
+            await asyncio.sleep(self.revalidate_interval)
+            with self._lock:
+                pending = list(self._revalidate.items())
+            for key, refresh in pending:
+                try:
+                    # refresh() stores the new result, which clears the key
+                    await asyncio.to_thread(refresh)
+                except Exception:
+                    # Still down (or the breaker is still open); try again next round
+                    break
+                self.revalidated += 1
+            else:
+                if pending:
+                    logger.info(f"Revalidated {len(pending)} stale cache entries")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "rows": self.rows,
+                "max_rows": self.max_rows,
+                "served_stale": self.served_stale,
+                "pending_revalidation": len(self._revalidate),
+                "revalidated": self.revalidated,
+            }
+
+
+class StaleHeaderMiddleware:
+    """Collects stale reads per request and marks such responses with X-Cache-Status and Age"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        ages = []
+        token = _stale_ages.set(ages)
+
+        async def send_with_staleness(message):
+            if message["type"] == "http.response.start" and ages:
+                headers = list(message.get("headers", []))
+                headers += [(b"x-cache-status", b"stale"), (b"age", str(int(max(ages))).encode("latin-1"))]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_staleness)
+        finally:
+            _stale_ages.reset(token)
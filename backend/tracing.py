@@ -0,0 +1,215 @@
+"""
+Per-request phase timing: Server-Timing headers and optional trace export.
+
+A request opts in with the `X-Debug-Timing: 1` header (or every request does
+when TRACE_ALL_REQUESTS=1). Code marks phases with `with span("db", ...)`;
+when no trace is active that is a single context variable lookup.
+
+Spans can also be appended as OTLP/JSON-shaped lines to a local file
+(TRACE_EXPORT_PATH) for loading into any OpenTelemetry-compatible viewer.
+"""
+
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from fastapi.routing import APIRoute
+
+DEBUG_HEADER = b"x-debug-timing"
+
+_current: contextvars.ContextVar = contextvars.ContextVar("atlas_trace", default=None)
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "phase", "name", "attributes", "start", "end")
+
+    def __init__(self, trace, phase: str, name: str, attributes: Optional[dict]):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = None
+        self.phase = phase
+        self.name = name
+        self.attributes = attributes or {}
+        self.start = 0.0
+        self.end = 0.0
+
+    def __enter__(self):
+        self.parent_id = self.trace.active
+        self.trace.active = self.span_id
+        self.start = time.perf_counter()
+        return self
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def __exit__(self, *exc):
+        self.end = time.perf_counter()
+        self.trace.active = self.parent_id
+        self.trace.spans.append(self)
+        return False
+
+
+class _NoopSpan:
+    def set(self, key: str, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class Trace:
+    def __init__(self, name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None):
+        self.name = name
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.root_id = os.urandom(8).hex()
+        self.remote_parent = parent_id
+        self.active = self.root_id
+        self.spans: List[Span] = []
+        self.start = time.perf_counter()
+        self.wall_start = time.time()
+        self.handler_done: Optional[float] = None
+
+    def server_timing(self, end: float) -> str:
+        """Server-Timing header value: total time per phase plus encode and total"""
+        phases: Dict[str, list] = {}
+        for span in self.spans:
+            totals = phases.setdefault(span.phase, [0.0, 0])
+            totals[0] += span.end - span.start
+            totals[1] += 1
+        entries = [
+            f'{phase};dur={seconds * 1000:.2f};desc="{count}x"'
+            for phase, (seconds, count) in phases.items()
+        ]
+        if self.handler_done is not None:
+            entries.append(f"encode;dur={(end - self.handler_done) * 1000:.2f}")
+        entries.append(f"total;dur={(end - self.start) * 1000:.2f}")
+        return ", ".join(entries)
+
+    def to_otlp(self, end: float, attributes: dict) -> dict:
+        """Spans in the OTLP/JSON layout (resourceSpans -> scopeSpans -> spans)"""
+        def nanos(perf: float) -> str:
+            return str(int((self.wall_start + perf - self.start) * 1e9))
+
+        def attrs(values: dict) -> list:
+            return [{"key": k, "value": {"stringValue": str(v)}} for k, v in values.items()]
+
+        spans = [{
+            "traceId": self.trace_id, "spanId": self.root_id, "parentSpanId": self.remote_parent or "",
+            "name": self.name, "kind": 2, "startTimeUnixNano": nanos(self.start),
+            "endTimeUnixNano": nanos(end), "attributes": attrs(attributes),
+        }]
+        for span in self.spans:
+            spans.append({
+                "traceId": self.trace_id, "spanId": span.span_id, "parentSpanId": span.parent_id,
+                "name": span.name, "kind": 1, "startTimeUnixNano": nanos(span.start),
+                "endTimeUnixNano": nanos(span.end), "attributes": attrs({"phase": span.phase, **span.attributes}),
+            })
+        return {"resourceSpans": [{
+            "resource": {"attributes": attrs({"service.name": "atlas-api"})},
+            "scopeSpans": [{"scope": {"name": "atlas.tracing"}, "spans": spans}],
+        }]}
+
+
+def span(phase: str, name: Optional[str] = None, **attributes):
+    """Time a phase of the current request (no-op unless the request is traced)"""
+    trace = _current.get()
+    if trace is None:
+        return _NOOP
+    return Span(trace, phase, name or phase, attributes)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+class JsonlExporter:
+    """Appends one OTLP/JSON document per traced request to a file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, document: dict):
+        line = json.dumps(document, separators=(",", ":"))
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+def _parse_traceparent(value: str):
+    # W3C traceparent: version-traceid-parentid-flags
+    parts = value.split("-")
+    if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+        return parts[1], parts[2]
+    return None, None
+
+
+class TracingMiddleware:
+    """Starts a trace for opted-in requests and adds the Server-Timing header"""
+
+    def __init__(self, app, trace_all: bool = False, exporter: Optional[JsonlExporter] = None):
+        self.app = app
+        self.trace_all = trace_all
+        self.exporter = exporter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers", ()))
+        if not (self.trace_all or headers.get(DEBUG_HEADER, b"") in (b"1", b"true")):
+            return await self.app(scope, receive, send)
+
+        trace_id, parent_id = _parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        trace = Trace(f"{scope['method']} {scope['path']}", trace_id, parent_id)
+        token = _current.set(trace)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = trace.server_timing(time.perf_counter()).encode("latin-1")
+                headers = list(message.get("headers", []))
+                # Timing-Allow-Origin lets the cross-origin frontend read the entries
+                headers += [(b"server-timing", timing), (b"timing-allow-origin", b"*")]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if self.exporter is not None:
+                self.exporter.export(trace.to_otlp(time.perf_counter(), {
+                    "http.method": scope["method"], "http.target": scope["path"], "http.status_code": status,
+                }))
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that notes when the endpoint returned, so response encoding can be timed"""
+
+    def __init__(self, path, endpoint, **kwargs):
+        if not asyncio.iscoroutinefunction(endpoint):
+            super().__init__(path, endpoint, **kwargs)
+            return
+
+        @functools.wraps(endpoint)
+        async def timed_endpoint(*args, **kw):
+            try:
+                return await endpoint(*args, **kw)
+            finally:
+                trace = _current.get()
+                if trace is not None:
+                    trace.handler_done = time.perf_counter()
+
+        super().__init__(path, timed_endpoint, **kwargs)
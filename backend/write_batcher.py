@@ -0,0 +1,211 @@
+"""
+Micro-batching of single-row inserts into multi-row inserts.
+
+Rows submitted by concurrent requests wait in a bounded queue for up to
+`max_delay` (or until `max_rows` have gathered) and are written with one
+insert per batch, so a burst of N writes costs about N / max_rows round
+trips instead of N. Two acknowledgement modes:
+
+- "flush": submit() returns a future resolved with the stored row once its
+  batch is written, or failed with the insert's error. A client that got a
+  success knows its row is stored.
+- "queue" (write-behind): submit() returns as soon as the row is queued.
+  Rows are only in memory until flushed: batches that fail because the
+  database is unavailable are retried with backoff, rows the database
+  rejects (e.g. a foreign key violation) are dropped with their ids logged,
+  and rows still queued when the process dies are lost. stop() flushes what
+  it can before shutdown and logs the ids of anything it could not write.
+
+A full queue raises WriteQueueFull so the caller can push back (503).
+`on_written`, if given, is called on the event loop with the stored rows of
+each successful insert, in either mode.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+from instrumented_db import is_upstream_failure
+from metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+BATCH_ROWS = Histogram("atlas_write_batch_rows", "Rows per batched insert", ("table",),
+                       buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500))
+BATCHED_ROWS = Counter("atlas_write_batch_rows_total", "Rows handled by the write batcher by outcome",
+                       ("table", "outcome"))
+
+MAX_RETRY_DELAY = 5.0
+
+
+class WriteQueueFull(Exception):
+    """The batcher is at capacity (or shutting down); retry later"""
+
+
+def describe_row(row: dict) -> str:
+    """Identifies a row in logs without its content (author names and comment text stay out)"""
+    return f"id={row.get('id')} agent_id={row.get('agent_id')}"
+
+
+class WriteBatcher:
+    def __init__(self, table: str, insert: Callable[[List[dict]], List[dict]], ack: str = "flush",
+                 max_rows: int = 100, max_delay: float = 0.01, max_queue: int = 5000,
+                 on_written: Optional[Callable[[List[dict]], None]] = None):
+        if ack not in ("flush", "queue"):
+            raise ValueError(f"Unknown ack mode {ack!r}")
+        self.table = table
+        self.insert = insert
+        self.ack = ack
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self.on_written = on_written
+        self.batches = 0
+        self.written = 0
+        self.failed = 0
+        self.queue_full = 0
+        self.last_batch_ms = 0.0
+        self._queue = deque()  # (row, future or None)
+        self._writing = 0
+        self._closing = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def submit(self, row: dict) -> Optional[asyncio.Future]:
+        """Queue a row; in "flush" mode the returned future resolves with the stored row"""
+        if self._task is None or self._closing:
+            raise WriteQueueFull(f"{self.table} writes are not being accepted")
+        if len(self._queue) >= self.max_queue:
+            self.queue_full += 1
+            raise WriteQueueFull(f"{self.table} write queue is full")
+        future = asyncio.get_running_loop().create_future() if self.ack == "flush" else None
+        self._queue.append((row, future))
+        self._wakeup.set()
+        if len(self._queue) >= self.max_rows:
+            self._full.set()
+        return future
+
+    async def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._full = asyncio.Event()
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop accepting rows and flush the queue, giving up after `timeout` seconds"""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        self._full.set()
+        deadline = time.monotonic() + timeout
+        while (self._queue or self._writing) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if self._queue:
+            lost = [row for row, _ in self._queue]
+            self._fail([future for _, future in self._queue], WriteQueueFull("shutting down"))
+            self._queue.clear()
+            BATCHED_ROWS.inc(self.table, "lost", amount=len(lost))
+            logger.error(f"Shutting down with {len(lost)} unwritten {self.table} rows: "
+                         f"{', '.join(describe_row(row) for row in lost)}")
+
+    async def _run(self):
+        retry_delay = 0.0
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if retry_delay:
+                await asyncio.sleep(retry_delay)
+            elif len(self._queue) < self.max_rows and not self._closing:
+                # Give concurrent writers a moment to join the batch
+                self._full.clear()
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            batch = [self._queue.popleft() for _ in range(min(self.max_rows, len(self._queue)))]
+            self._writing += 1
+            try:
+                retry = await self._write(batch)
+            finally:
+                self._writing -= 1
+            if retry:
+                # Database unavailable in write-behind mode: keep the rows at the head of the queue
+                self._queue.extendleft(reversed(batch))
+                retry_delay = min(MAX_RETRY_DELAY, max(0.1, retry_delay * 2))
+            else:
+                retry_delay = 0.0
+
+    async def _write(self, batch: list) -> bool:
+        """Insert a batch; returns True if it should be retried later"""
+        rows = [row for row, _ in batch]
+        start = time.perf_counter()
+        try:
+            stored = await asyncio.to_thread(self.insert, rows)
+        except Exception as e:
+            if is_upstream_failure(e):
+                if self.ack == "queue":
+                    logger.warning(f"Batched insert of {len(rows)} {self.table} rows failed, will retry: {e}")
+                    return True
+                self._fail([future for _, future in batch], e)
+                self.failed += len(batch)
+                BATCHED_ROWS.inc(self.table, "failed", amount=len(batch))
+                return False
+            if len(batch) > 1:
+                # One bad row fails the whole insert; write them one by one to isolate it
+                for item in batch:
+                    if await self._write([item]):
+                        self._queue.appendleft(item)
+                return False
+            self.failed += 1
+            BATCHED_ROWS.inc(self.table, "refused")
+            if batch[0][1] is None:
+                logger.error(f"Dropped {self.table} row {describe_row(rows[0])} rejected by the database ({e})")
+            self._fail([batch[0][1]], e)
+            return False
+        self.batches += 1
+        self.written += len(rows)
+        self.last_batch_ms = (time.perf_counter() - start) * 1000
+        BATCH_ROWS.observe(len(rows), self.table)
+        BATCHED_ROWS.inc(self.table, "written", amount=len(rows))
+        stored = stored if stored and len(stored) == len(rows) else rows
+        for (_, future), row in zip(batch, stored):
+            if future is not None and not future.done():
+                future.set_result(row)
+        if self.on_written is not None:
+            try:
+                self.on_written(stored)
+            except Exception:
+                logger.exception(f"on_written callback failed for {len(stored)} {self.table} rows")
+        return False
+
+    @staticmethod
+    def _fail(futures: list, error: Exception):
+        for future in futures:
+            if future is not None and not future.done():
+                future.set_exception(error)
+
+    def stats(self) -> dict:
+        return {
+            "ack": self.ack,
+            "running": self._task is not None,
+            "queued": len(self._queue),
+            "max_queue": self.max_queue,
+            "max_rows": self.max_rows,
+            "max_delay_ms": self.max_delay * 1000,
+            "batches": self.batches,
+            "written": self.written,
+            "avg_batch_rows": round(self.written / self.batches, 1) if self.batches else 0.0,
+            "last_batch_ms": round(self.last_batch_ms, 2),
+            "failed": self.failed,
+            "queue_full": self.queue_full,
+        }
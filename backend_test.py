@@ -379,7 +379,7 @@ def test_gohighlevel_integration(agent_id: str):
         # since we're testing the endpoint functionality, not the actual CRM integration
         if response.status_code == 200:
             data = response.json()
-            if data.get("status") in ["success", "error"]:
+            if data.get("status") in ["success", "error", "queued"]:
                 results.add_result("GoHighLevel CRM Integration", True)
             else:
                 results.add_result("GoHighLevel CRM Integration", False, f"Unexpected response: {data}")
@@ -5,17 +5,28 @@ set -e
 cd /backend || { echo "Backend directory not found"; exit 1; }
 
 echo "Starting FastAPI backend"
-# Start Uvicorn with proper host binding
-uvicorn server:app --host 0.0.0.0 --port 8001 &
+# Start Uvicorn with proper host binding; on shutdown, open /api/stream connections get
+# 10s before they are cut (the browser reconnects to the next server). Client addresses
+# (used for rate limits) come from X-Forwarded-For only when nginx on 127.0.0.1 set it.
+uvicorn server:app --host 0.0.0.0 --port 8001 --timeout-graceful-shutdown 10 \
+    --proxy-headers --forwarded-allow-ips=127.0.0.1 &
 BACKEND_PID=$!
 
-echo "Waiting for backend to start..."
-sleep 30
-
-if ! kill -0 $BACKEND_PID 2>/dev/null; then
-    echo "Backend failed to start at initialization, exiting"
-    exit 1
-fi
+echo "Waiting for backend to become ready..."
+# Poll the readiness probe instead of sleeping a fixed time; give up after READY_TIMEOUT seconds
+READY_TIMEOUT=${READY_TIMEOUT:-60}
+ready_deadline=$(( $(date +%s) + READY_TIMEOUT ))
+until wget -q -T 2 -O /dev/null http://127.0.0.1:8001/api/health/ready 2>/dev/null; do
+    if ! kill -0 $BACKEND_PID 2>/dev/null; then
+        echo "Backend failed to start at initialization, exiting"
+        exit 1
+    fi
+    if [ "$(date +%s)" -ge "$ready_deadline" ]; then
+        echo "Backend not ready after ${READY_TIMEOUT}s, starting nginx anyway"
+        break
+    fi
+    sleep 0.2
+done
 
 # Start Nginx
 nginx -g 'daemon off;' &
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { Map as MapboxMap, Marker, NavigationControl, Source, Layer } from 'react-map-gl';
 import { Search, MapPin, Phone, Mail, Globe, Star, MessageCircle, Plus, Filter, List, Users, Building2, X, Send, ExternalLink, UserPlus, Eye, Settings, Shield, Award, AlertTriangle, Ban, Info, User, Navigation } from 'lucide-react';
@@ -29,6 +29,8 @@ function PremiumApp() {
   const [showAddForm, setShowAddForm] = useState(false);
   const [showContactModal, setShowContactModal] = useState(false);
   const [contactingAgent, setContactingAgent] = useState(null);
+  // Agent whose comments are on screen, for comments pushed by the change feed
+  const openAgentIdRef = useRef(null);
   const [currentUser, setCurrentUser] = useState('');
   const [showMyAgents, setShowMyAgents] = useState(false);
   const [showMapViewFilter, setShowMapViewFilter] = useState(false);
@@ -309,6 +311,21 @@ function PremiumApp() {
     }
   };
 
+  // Created agents and comments arrive both from our own POSTs and from the change feed; add each once
+  const addAgent = (agent) => {
+    setAgents(prev => prev.some(a => a.id === agent.id) ? prev : [...prev, agent]);
+  };
+
+  // Partial update, e.g. the profile image found by a background scrape
+  const updateAgent = (changes) => {
+    setAgents(prev => prev.map(a => (a.id === changes.id ? { ...a, ...changes } : a)));
+  };
+
+  const addComment = (comment) => {
+    if (comment.agent_id !== openAgentIdRef.current) return;
+    setComments(prev => prev.some(c => c.id === comment.id) ? prev : [comment, ...prev]);
+  };
+
   const fetchPredefinedTags = async () => {
     try {
       const response = await axios.get(`${API}/tags`);
@@ -481,7 +498,7 @@ function PremiumApp() {
       });
       
       if (response.data) {
-        await fetchComments(contactingAgent.id); // Refresh comments
+        addComment(response.data);
         setNewComment({ author_name: '', content: '', rating: '' });
         alert('Comment added successfully!');
       }
@@ -498,7 +515,7 @@ function PremiumApp() {
     try {
       const response = await axios.post(`${API}/agents`, newAgent);
       if (response.data) {
-        await fetchAgents(); // Refresh the agent list
+        addAgent(response.data);
         setShowAddForm(false);
         setNewAgent({
           full_name: '',
@@ -688,6 +705,7 @@ function PremiumApp() {
 
   // Load comments when contact modal opens
   useEffect(() => {
+    openAgentIdRef.current = showContactModal && contactingAgent ? contactingAgent.id : null;
     if (showContactModal && contactingAgent) {
       fetchComments(contactingAgent.id);
     }
@@ -708,6 +726,23 @@ function PremiumApp() {
     loadData();
   }, []);
 
+  // Live updates from other users, applied in place instead of refetching
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return undefined;
+    const stream = new EventSource(`${API}/stream`);
+    stream.addEventListener('agent-created', (e) => addAgent(JSON.parse(e.data)));
+    stream.addEventListener('agent-updated', (e) => updateAgent(JSON.parse(e.data)));
+    stream.addEventListener('comment-created', (e) => addComment(JSON.parse(e.data)));
+    stream.addEventListener('tags-changed', (e) => setPredefinedTags(JSON.parse(e.data).tags || []));
+    // Fell behind or the server restarted: reload what is on screen
+    stream.addEventListener('resync', () => {
+      fetchAgents();
+      fetchPredefinedTags();
+      if (openAgentIdRef.current) fetchComments(openAgentIdRef.current);
+    });
+    return () => stream.close();
+  }, []);
+
   // Filter agents based on criteria
   useEffect(() => {
     let filtered = agents;
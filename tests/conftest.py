@@ -0,0 +1,36 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# server.py reads its configuration at import time; point it at nothing real
+_scratch = tempfile.mkdtemp(prefix="atlas-tests-")
+for name, value in {
+    "SUPABASE_URL": "http://127.0.0.1:9",
+    "SUPABASE_ANON_KEY": "test",
+    "SUPABASE_SERVICE_KEY": "test",
+    "GOHIGHLEVEL_API_KEY": "test",
+    "GOHIGHLEVEL_BASE_URL": "http://127.0.0.1:9/",
+    "SCRAPE_CACHE_PATH": os.path.join(_scratch, "scrape_cache.sqlite3"),
+    "GHL_OUTBOX_PATH": os.path.join(_scratch, "ghl_outbox.sqlite3"),
+    "IMAGE_STORE_PATH": os.path.join(_scratch, "images"),
+}.items():
+    os.environ[name] = value
+
+
+@pytest.fixture(scope="session")
+def server():
+    import server as server_module
+    return server_module
+
+
+@pytest.fixture
+def api(server):
+    """Test client without the startup hooks, for validation and auth checks"""
+    from fastapi.testclient import TestClient
+    return TestClient(server.app)
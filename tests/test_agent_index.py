@@ -0,0 +1,111 @@
+from agent_index import AgentIndex, dedupe_report, is_strong_match, normalize_phone
+
+NANCY = {"id": "1", "full_name": "Nancy Nguyen", "brokerage": "Keller Williams", "email": "nancy@kw.com",
+         "phone": "(512) 555-0100"}
+
+
+def indexed(*rows) -> AgentIndex:
+    index = AgentIndex()
+    index.load(rows)
+    return index
+
+
+def test_normalize_phone_to_e164():
+    assert normalize_phone("(512) 555-0100") == "+15125550100"
+    assert normalize_phone("1-512-555-0100") == "+15125550100"
+    assert normalize_phone("+44 20 7946 0958") == "+442079460958"
+    assert normalize_phone("555-0100") is None
+
+
+def test_same_name_and_phone_is_a_duplicate():
+    existing_id, matched_on = indexed(NANCY).find(
+        {"full_name": "nguyen, NANCY", "brokerage": "Other Realty", "phone": "512.555.0100"}
+    )
+    assert existing_id == "1"
+    assert is_strong_match(matched_on)
+
+
+def test_shared_phone_with_a_different_name_is_only_a_possible_duplicate():
+    existing_id, matched_on = indexed(NANCY).find(
+        {"full_name": "Totally Different Person", "brokerage": "Keller Williams", "phone": "512-555-0100"}
+    )
+    assert existing_id == "1"
+    assert matched_on == ["phone"]
+    assert not is_strong_match(matched_on)
+
+
+def test_shared_office_email_with_a_different_name_is_not_strong():
+    _, matched_on = indexed({**NANCY, "email": "info@kw.com"}).find(
+        {"full_name": "Sam Lee", "email": "INFO@kw.com"}
+    )
+    assert not is_strong_match(matched_on)
+
+
+def test_name_and_brokerage_alone_is_not_strong():
+    _, matched_on = indexed(NANCY).find({"full_name": "Nancy Nguyen", "brokerage": "Keller Williams Inc"})
+    assert matched_on == ["fingerprint"]
+    assert not is_strong_match(matched_on)
+
+
+def test_len_counts_agents():
+    rows = [{"id": str(n), "full_name": "Pat Smith", "brokerage": "Remax"} for n in range(3)]
+    assert len(indexed(*rows)) == 3
+
+
+def test_load_keeps_agents_added_while_rows_were_fetched():
+    index = AgentIndex()
+    index.add({"id": "new", "full_name": "New Agent", "email": "new@example.com"})
+    index.load([NANCY])
+    assert len(index) == 2
+    assert index.find({"full_name": "New Agent", "email": "new@example.com"})[0] == "new"
+    assert index.ready
+
+
+def test_dedupe_report_groups_and_flags_strong_matches():
+    rows = [
+        NANCY,
+        {"id": "2", "full_name": "Nancy Nguyen", "email": "NANCY@kw.com"},
+        {"id": "3", "full_name": "Front Desk", "phone": "5125550100"},
+        {"id": "4", "full_name": "Solo Agent", "email": "solo@example.com"},
+        {"id": "5", "full_name": "Alex Kim", "email": "office@remax.com"},
+        {"id": "6", "full_name": "Jo Park", "email": "office@remax.com"},
+    ]
+    report = dedupe_report(rows)
+    assert report == [
+        {"agent_ids": ["1", "2"], "matched_on": ["email", "name"], "strong": True},
+        {"agent_ids": ["1", "3"], "matched_on": ["phone"], "strong": False},
+        {"agent_ids": ["5", "6"], "matched_on": ["email"], "strong": False},
+    ]
+
+
+# Three agents at one office: A is someone else, B and C are the same Jane Doe
+OFFICE = [
+    {"id": "A", "full_name": "Pat Smith", "brokerage": "Compass", "email": "info@compass.com",
+     "phone": "(212) 555-0100"},
+    {"id": "B", "full_name": "Jane Doe", "brokerage": "Compass", "email": "info@compass.com",
+     "phone": "(212) 555-0100"},
+    {"id": "C", "full_name": "Doe, Jane", "brokerage": "Sotheby's", "email": "info@compass.com",
+     "phone": "212-555-0100"},
+]
+
+
+def test_shared_office_contact_still_finds_the_same_person():
+    existing_id, matched_on = indexed(*OFFICE[:2]).find(
+        {"full_name": "Jane Doe", "email": "INFO@compass.com", "phone": "2125550100"}
+    )
+    assert existing_id == "B"
+    assert is_strong_match(matched_on)
+
+
+def test_shared_office_contact_with_a_new_name_points_at_the_oldest_agent():
+    existing_id, matched_on = indexed(*OFFICE).find({"full_name": "Sam Lee", "phone": "2125550100"})
+    assert existing_id == "A"
+    assert not is_strong_match(matched_on)
+
+
+def test_dedupe_report_keeps_people_on_a_shared_office_line_apart():
+    report = dedupe_report(OFFICE)
+    assert report == [
+        {"agent_ids": ["B", "C"], "matched_on": ["email", "name", "phone"], "strong": True},
+        {"agent_ids": ["A", "B", "C"], "matched_on": ["email", "phone"], "strong": False},
+    ]
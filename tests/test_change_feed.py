@@ -0,0 +1,149 @@
+import asyncio
+import json
+
+import pytest
+
+from change_feed import RESYNC_FRAME, ChangeFeed, ClientStreamLimit, FeedFull
+
+
+def events(subscriber) -> list:
+    """(id, event, data) of each frame queued for a subscriber"""
+    parsed = []
+    for frame in subscriber.frames:
+        fields = dict(line.split(": ", 1) for line in frame.decode().strip().splitlines())
+        parsed.append((fields.get("id"), fields["event"], json.loads(fields["data"])))
+    return parsed
+
+
+def subscribe(feed, last_event_id=None, client="10.0.0.1"):
+    async def run():
+        return feed.subscribe(last_event_id, client)
+    return asyncio.run(run())
+
+
+def test_published_events_reach_every_subscriber():
+    feed = ChangeFeed()
+    first, second = subscribe(feed), subscribe(feed, client="10.0.0.2")
+    feed.publish("agent-updated", {"id": "a1", "profile_image": "/api/images/x"})
+    assert events(first) == events(second)
+    assert events(first)[0][1:] == ("agent-updated", {"id": "a1", "profile_image": "/api/images/x"})
+
+
+def test_slow_subscriber_overflows_into_a_resync():
+    feed = ChangeFeed(buffer_size=3)
+    subscriber = subscribe(feed)
+    for n in range(5):
+        feed.publish("comment-created", {"n": n})
+    assert subscriber.frames[0] == RESYNC_FRAME
+    assert [data["n"] for _, _, data in events(subscriber)[1:]] == [3, 4]
+    assert feed.stats()["overflows"] == 1
+
+
+def test_last_event_id_replays_missed_events():
+    feed = ChangeFeed()
+    feed.publish("agent-created", {"n": 1})
+    last_seen = feed.stats()["last_event_id"]
+    feed.publish("agent-created", {"n": 2})
+    feed.publish("tags-changed", {"n": 3})
+    subscriber = subscribe(feed, last_seen)
+    assert [data["n"] for _, _, data in events(subscriber)] == [2, 3]
+
+
+def test_last_event_id_up_to_date_replays_nothing():
+    feed = ChangeFeed()
+    feed.publish("agent-created", {"n": 1})
+    subscriber = subscribe(feed, feed.stats()["last_event_id"])
+    assert not subscriber.frames
+
+
+@pytest.mark.parametrize("last_event_id", ["deadbeef-1", "garbage", None])
+def test_unknown_or_old_ids_get_a_resync(last_event_id):
+    feed = ChangeFeed(history=2)
+    for n in range(5):
+        feed.publish("agent-created", {"n": n})
+    # Event 1 is no longer kept, so events 2 and 3 can't be replayed
+    last_event_id = last_event_id or feed.stats()["last_event_id"].replace("-5", "-1")
+    subscriber = subscribe(feed, last_event_id)
+    assert list(subscriber.frames) == [RESYNC_FRAME]
+
+
+def test_feed_refuses_clients_over_max_clients():
+    feed = ChangeFeed(max_clients=2)
+    subscribe(feed, client="10.0.0.1")
+    subscribe(feed, client="10.0.0.2")
+    with pytest.raises(FeedFull):
+        subscribe(feed, client="10.0.0.3")
+    assert feed.stats()["rejected"] == 1
+
+
+def test_one_client_cannot_take_every_slot():
+    feed = ChangeFeed(max_per_client=2)
+    first = subscribe(feed)
+    subscribe(feed)
+    with pytest.raises(ClientStreamLimit):
+        subscribe(feed)
+    # Other clients still get in
+    subscribe(feed, client="10.0.0.2")
+    # Unsubscribing twice (stream end and response cleanup) frees one slot
+    feed.unsubscribe(first)
+    feed.unsubscribe(first)
+    subscribe(feed)
+    with pytest.raises(ClientStreamLimit):
+        subscribe(feed)
+    assert feed.stats()["clients"] == 3
+    assert feed.stats()["rejected_per_client"] == 2
+
+
+def test_stream_sends_queued_frames_and_unsubscribes_when_closed():
+    async def run():
+        feed = ChangeFeed(heartbeat=1)
+        subscriber = feed.subscribe(None, "10.0.0.1")
+        stream = feed.stream(subscriber)
+        assert (await stream.__anext__()).startswith(b"retry:")
+        feed.publish("agent-created", {"n": 1})
+        assert b"event: agent-created" in await stream.__anext__()
+        feed.close()
+        with pytest.raises(StopAsyncIteration):
+            await stream.__anext__()
+        return feed
+
+    assert asyncio.run(run()).stats()["clients"] == 0
+
+
+def test_stream_endpoint_limits_streams_per_client(api, server, monkeypatch):
+    monkeypatch.setattr(server.change_feed, "max_per_client", 0)
+    response = api.get("/api/stream")
+    assert response.status_code == 429
+
+
+def test_scraped_profile_image_is_published(server, monkeypatch):
+    updates = []
+
+    class Table:
+        def update(self, values):
+            updates.append(values)
+            return self
+
+        def eq(self, column, value):
+            return self
+
+        def execute(self):
+            return None
+
+    async def scrape(website, full_name):
+        return "https://example.com/jane.jpg"
+
+    async def store(url):
+        return "/api/images/abc/256.jpg"
+
+    monkeypatch.setattr(server, "supabase", type("Client", (), {"table": lambda self, name: Table()})())
+    monkeypatch.setattr(server, "scrape_from_website", scrape)
+    monkeypatch.setattr(server, "store_profile_image", store)
+    feed = ChangeFeed()
+    monkeypatch.setattr(server, "change_feed", feed)
+    subscriber = subscribe(feed)
+
+    job = {"agent_id": "a1", "website": "https://example.com", "full_name": "Jane Doe", "service_area": "Austin"}
+    assert asyncio.run(server.process_scrape_job(job)) == "/api/images/abc/256.jpg"
+    assert updates == [{"profile_image": "/api/images/abc/256.jpg"}]
+    assert events(subscriber)[0][1:] == ("agent-updated", {"id": "a1", "profile_image": "/api/images/abc/256.jpg"})
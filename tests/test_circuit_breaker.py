@@ -0,0 +1,129 @@
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+from stale_cache import StaleReadCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+def breaker(**kwargs) -> CircuitBreaker:
+    settings = dict(window=30.0, min_calls=4, error_rate=0.5, slow_threshold=1.0, open_seconds=10.0)
+    settings.update(kwargs)
+    return CircuitBreaker("test", **settings)
+
+
+def call(cb: CircuitBreaker, ok: bool = True, elapsed: float = 0.01):
+    trial = cb.before_call()
+    cb.record(ok, elapsed, trial)
+
+
+def test_opens_once_the_error_rate_is_reached(clock):
+    cb = breaker()
+    call(cb, ok=False)
+    call(cb, ok=False)
+    call(cb)
+    assert cb.state == CLOSED  # fewer than min_calls
+    call(cb)
+    assert cb.state == OPEN
+    with pytest.raises(CircuitOpen):
+        cb.before_call()
+    assert cb.stats()["rejected"] == 1
+
+
+def test_stays_closed_below_the_error_rate(clock):
+    cb = breaker()
+    for ok in (False, True, True, True, True, True):
+        call(cb, ok=ok)
+    assert cb.state == CLOSED
+
+
+def test_slow_calls_count_as_failures(clock):
+    cb = breaker()
+    for _ in range(4):
+        call(cb, ok=True, elapsed=1.5)
+    assert cb.state == OPEN
+
+
+def test_failures_outside_the_window_are_forgotten(clock):
+    cb = breaker()
+    call(cb, ok=False)
+    call(cb, ok=False)
+    clock.now += 31
+    call(cb)
+    call(cb)
+    assert cb.state == CLOSED
+    assert cb.stats()["recent_calls"] == 2
+
+
+def test_successful_trial_closes_the_breaker(clock):
+    cb = breaker()
+    for _ in range(4):
+        call(cb, ok=False)
+    clock.now += 10
+    trial = cb.before_call()
+    assert trial and cb.state == HALF_OPEN
+    # Only half_open_calls trials at a time
+    with pytest.raises(CircuitOpen):
+        cb.before_call()
+    cb.record(True, 0.01, trial)
+    assert cb.state == CLOSED
+    assert cb.stats()["recent_calls"] == 0
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    cb = breaker()
+    for _ in range(4):
+        call(cb, ok=False)
+    clock.now += 10
+    trial = cb.before_call()
+    cb.record(False, 0.01, trial)
+    assert cb.state == OPEN
+    assert cb.times_opened == 2
+    clock.now += 5
+    with pytest.raises(CircuitOpen):
+        cb.before_call()
+
+
+def test_calls_started_before_opening_do_not_count(clock):
+    cb = breaker()
+    for _ in range(4):
+        call(cb, ok=False)
+    cb.record(True, 0.01)
+    assert cb.state == OPEN
+    assert cb.stats()["recent_calls"] == 4
+
+
+def test_stale_cache_evicts_least_recently_used_rows():
+    cache = StaleReadCache(max_rows=10)
+    cache.put("a", ["a"], 4)
+    cache.put("b", ["b"], 4)
+    assert cache.get_stale("a", lambda: None) == ["a"]
+    cache.put("c", ["c"], 4)
+    assert cache.get_stale("b", lambda: None) is None
+    assert cache.stats()["rows"] == 8
+
+
+def test_stale_cache_refresh_clears_pending_revalidation():
+    cache = StaleReadCache()
+    cache.put("agents", [1, 2], 2)
+    cache.get_stale("agents", lambda: None)
+    assert cache.stats()["pending_revalidation"] == 1
+    cache.put("agents", [1, 2, 3], 3)
+    assert cache.stats()["pending_revalidation"] == 0
+    # Results larger than the whole cache are never kept
+    cache.put("huge", list(range(10)), cache.max_rows + 1)
+    assert cache.get_stale("huge", lambda: None) is None
@@ -0,0 +1,15 @@
+from generate_data import generate_chunk
+
+
+def test_comments_never_predate_their_agent():
+    rows = generate_chunk(seed=7, chunk=0, start=0, stop=300, comments_per_agent=4, brokerages=50)
+    comments = [(agent, comment) for agent, agent_comments in rows for comment in agent_comments]
+    assert comments
+    for agent, comment in comments:
+        assert comment["created_at"] >= agent["created_at"]
+
+
+def test_chunks_are_deterministic():
+    first = generate_chunk(seed=7, chunk=3, start=30, stop=40, comments_per_agent=2, brokerages=50)
+    second = generate_chunk(seed=7, chunk=3, start=30, stop=40, comments_per_agent=2, brokerages=50)
+    assert first == second
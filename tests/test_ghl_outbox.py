@@ -0,0 +1,158 @@
+import asyncio
+
+import httpx
+import pytest
+
+from ghl_outbox import FAILED, PENDING, SENDING, SYNCED, GHLOutbox
+from rate_limit import TokenBucket
+
+PAYLOAD = {"email": "Jane@Example.com", "firstName": "Jane"}
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    box = GHLOutbox(tmp_path / "outbox.sqlite3", max_attempts=2)
+    yield box
+    box.close()
+
+
+def agent(number: int) -> dict:
+    return {"id": f"a{number}", "full_name": f"Agent {number}", "email": f"a{number}@example.com", "phone": "1"}
+
+
+def test_enqueue_is_idempotent_per_agent_and_email(outbox):
+    first = outbox.enqueue("a1", PAYLOAD)
+    again = outbox.enqueue("a1", {**PAYLOAD, "email": " jane@example.com "})
+    assert again["id"] == first["id"]
+    assert first["status"] == PENDING
+    assert outbox.stats()[PENDING] == 1
+
+
+def test_success_marks_job_synced(outbox):
+    job = outbox.enqueue("a1", PAYLOAD)
+    [claimed] = outbox.claim_batch()
+    assert claimed["status"] == PENDING and outbox.get(job["id"])["status"] == SENDING
+    outbox.complete(claimed, {"status": "success", "attempts": 1, "data": {"contact": {"id": "c1"}}})
+    stored = outbox.get(job["id"])
+    assert stored["status"] == SYNCED
+    assert stored["result"] == {"contact": {"id": "c1"}}
+    assert outbox.enqueue("a1", PAYLOAD)["status"] == SYNCED
+
+
+def test_retryable_error_is_rescheduled_then_fails_after_max_attempts(outbox):
+    job = outbox.enqueue("a1", PAYLOAD)
+    [claimed] = outbox.claim_batch()
+    outbox.complete(claimed, {"status": "error", "attempts": 1, "message": "GHL API error: 503"})
+    retry = outbox.get(job["id"])
+    assert retry["status"] == PENDING and retry["next_attempt_at"] > retry["updated_at"] - 1
+    assert outbox.claim_batch() == []  # not due yet
+    outbox.complete(retry, {"status": "error", "attempts": 1, "message": "GHL API error: 503"})
+    assert outbox.get(job["id"])["status"] == FAILED
+    # Asking again retries a failed push from scratch
+    assert outbox.enqueue("a1", PAYLOAD)["status"] == PENDING
+
+
+def test_validation_error_fails_immediately(outbox):
+    job = outbox.enqueue("a1", PAYLOAD)
+    [claimed] = outbox.claim_batch()
+    outbox.complete(claimed, {"status": "error", "attempts": 1, "message": "422", "retryable": False})
+    assert outbox.get(job["id"])["status"] == FAILED
+
+
+def test_recover_requeues_interrupted_sends_for_a_lookup(tmp_path):
+    path = tmp_path / "outbox.sqlite3"
+    crashed = GHLOutbox(path)
+    job = crashed.enqueue("a1", PAYLOAD)
+    crashed.claim_batch()
+    crashed.close()
+
+    restarted = GHLOutbox(path)
+    assert restarted.recover() == 1
+    recovered = restarted.get(job["id"])
+    assert recovered["status"] == PENDING
+    assert GHLOutbox.may_exist(recovered)
+    restarted.close()
+
+
+def test_claim_lets_only_one_sender_take_a_job(outbox):
+    job = outbox.enqueue("a1", PAYLOAD)
+    assert outbox.claim(job["id"]) is not None
+    assert outbox.claim(job["id"]) is None
+    assert outbox.claim_batch() == []
+
+
+def test_sync_now_skips_synced_and_leaves_queued_jobs_to_the_dispatcher(outbox):
+    posted = []
+
+    def handler(request):
+        posted.append(request)
+        return httpx.Response(201, json={"contact": {"id": "new"}})
+
+    synced = outbox.enqueue("a1", {"email": "a1@example.com"})
+    outbox.complete(outbox.claim(synced["id"]), {"status": "success", "attempts": 1})
+    outbox.enqueue("a2", {"email": "a2@example.com"})
+    outbox.claim_batch()  # a2 is being sent by the dispatcher
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://ghl.test/") as client:
+            return await outbox.sync_now(client, [agent(1), agent(2), agent(3)], rate=1000, burst=1000)
+
+    results = asyncio.run(run())
+    assert [result["status"] for result in results] == ["success", "queued", "success"]
+    assert results[0]["skipped"] is True
+    assert len(posted) == 1
+    assert outbox.stats()[SYNCED] == 2
+
+
+def test_dispatcher_looks_up_before_resending_an_interrupted_push(outbox):
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.path)
+        return httpx.Response(200, json={"contacts": [{"id": "c1", "email": "jane@example.com"}]})
+
+    job = outbox.enqueue("a1", PAYLOAD)
+    outbox.claim_batch()
+    outbox.recover()
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://ghl.test/") as client:
+            await outbox.start(lambda: client)
+            while outbox.get(job["id"])["status"] != SYNCED:
+                await asyncio.sleep(0.01)
+            await outbox.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert requests == ["/contacts/lookup"]
+
+
+def test_sync_now_takes_tokens_from_the_dispatchers_bucket(outbox):
+    def handler(request):
+        return httpx.Response(201, json={"contact": {"id": "new"}})
+
+    outbox.bucket = TokenBucket(0.001, 10)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://ghl.test/") as client:
+            return await outbox.sync_now(client, [agent(1), agent(2), agent(3)], rate=1000, burst=1000)
+
+    asyncio.run(run())
+    assert outbox.bucket.tokens == pytest.approx(7, abs=0.01)
+
+
+def test_dispatcher_picks_up_jobs_enqueued_from_the_loop_and_refreshes_counts(outbox):
+    def handler(request):
+        return httpx.Response(201, json={"contact": {"id": "new"}})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://ghl.test/") as client:
+            await outbox.start(lambda: client)
+            job = await asyncio.to_thread(outbox.enqueue, "a1", PAYLOAD, False)
+            outbox.wake()
+            while outbox.counts[SYNCED] != 1:
+                await asyncio.sleep(0.01)
+            await outbox.stop()
+            return job
+
+    job = asyncio.run(asyncio.wait_for(run(), 5))
+    assert outbox.get(job["id"])["status"] == SYNCED
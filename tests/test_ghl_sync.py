@@ -0,0 +1,125 @@
+import asyncio
+
+import httpx
+import pytest
+
+from ghl_outbox import GHLOutbox
+from ghl_sync import BulkSyncJobs, push_contact
+from rate_limit import TokenBucket
+
+
+def ghl_client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://ghl.test/")
+
+
+def agent(number: int) -> dict:
+    return {"id": f"a{number}", "full_name": f"Agent {number}", "email": f"a{number}@example.com", "phone": "1"}
+
+
+def test_token_bucket_rejects_zero_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0, 10)
+
+
+def test_sync_rejects_zero_concurrency(tmp_path):
+    async def run():
+        async with ghl_client(lambda request: httpx.Response(201, json={})) as client:
+            await GHLOutbox(tmp_path / "outbox.sqlite3").sync_now(client, [agent(1)], concurrency=0)
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+
+def test_push_contact_retries_server_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503 if len(calls) < 3 else 201, json={"contact": {"id": "c1"}})
+
+    async def run():
+        async with ghl_client(handler) as client:
+            return await push_contact(client, {"email": "x@example.com"}, TokenBucket(1000, 1000), base_delay=0)
+
+    result = asyncio.run(run())
+    assert result["status"] == "success"
+    assert result["attempts"] == 3
+
+
+def test_push_contact_looks_up_contact_before_retrying_a_timeout():
+    created = []
+
+    def handler(request):
+        if request.url.path == "/contacts/lookup":
+            return httpx.Response(200, json={"contacts": created})
+        created.append({"id": "c1", "email": "x@example.com"})
+        # Created, but the answer never arrives
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    async def run():
+        async with ghl_client(handler) as client:
+            return await push_contact(client, {"email": "x@example.com"}, TokenBucket(1000, 1000), base_delay=0)
+
+    result = asyncio.run(run())
+    assert result["status"] == "success"
+    assert result["existing"] is True
+    assert len(created) == 1
+
+
+def test_push_contact_skips_lookup_when_the_connection_failed():
+    paths = []
+
+    def handler(request):
+        paths.append(request.url.path)
+        if len(paths) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(201, json={})
+
+    async def run():
+        async with ghl_client(handler) as client:
+            return await push_contact(client, {"email": "x@example.com"}, TokenBucket(1000, 1000), base_delay=0)
+
+    assert asyncio.run(run())["status"] == "success"
+    assert paths == ["/contacts/", "/contacts/"]
+
+
+def test_push_contact_does_not_retry_validation_errors():
+    async def run():
+        async with ghl_client(lambda request: httpx.Response(422, json={})) as client:
+            return await push_contact(client, {}, TokenBucket(1000, 1000), base_delay=0)
+
+    result = asyncio.run(run())
+    assert result == {"status": "error", "attempts": 1, "message": "GHL API error: 422", "retryable": False}
+
+
+def test_bulk_sync_job_reports_progress_and_summary(tmp_path):
+    outbox = GHLOutbox(tmp_path / "outbox.sqlite3")
+
+    async def run():
+        jobs = BulkSyncJobs()
+        async with ghl_client(lambda request: httpx.Response(201, json={})) as client:
+            agents = [agent(number) for number in range(5)]
+            job = jobs.submit(
+                lambda on_result: outbox.sync_now(client, agents, rate=1000, burst=1000, on_result=on_result),
+                total=len(agents),
+            )
+            assert job["status"] == "running"
+            while job["status"] == "running":
+                await asyncio.sleep(0.01)
+        return job
+
+    job = asyncio.run(run())
+    assert job["status"] == "done"
+    assert job["completed"] == 5
+    assert job["summary"]["succeeded"] == 5
+
+
+@pytest.mark.parametrize("field", ["rate", "concurrency", "limit"])
+def test_bulk_sync_rejects_zero_settings(api, field):
+    response = api.post("/api/ghl/bulk-sync?password=admin123", json={"agent_ids": ["a1"], field: 0})
+    assert response.status_code == 422
+
+
+def test_bulk_sync_requires_admin_password(api):
+    response = api.post("/api/ghl/bulk-sync?password=wrong", json={"agent_ids": ["a1"]})
+    assert response.status_code == 401
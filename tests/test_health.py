@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from health import HealthProber, check_disk
+
+
+class Probe:
+    """Async check that fails while `failing` is set"""
+
+    def __init__(self):
+        self.failing = False
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.failing:
+            raise ConnectionError("refused")
+        return {"calls": self.calls}
+
+
+def prober(threshold=1, **probes) -> HealthProber:
+    health = HealthProber(timeout=0.05, failure_threshold=threshold)
+    for name, (probe, critical) in probes.items():
+        health.add(name, probe, critical=critical)
+    return health
+
+
+def test_status_moves_from_starting_to_healthy():
+    db = Probe()
+    health = prober(db=(db, True))
+    assert health.snapshot()["status"] == "starting"
+    asyncio.run(health.probe_all())
+    snapshot = health.snapshot()
+    assert snapshot["status"] == "healthy"
+    assert snapshot["dependencies"]["db"]["ok"] is True
+    assert snapshot["dependencies"]["db"]["detail"] == {"calls": 1}
+
+
+def test_critical_failure_is_unhealthy_and_optional_failure_is_degraded():
+    db, ghl = Probe(), Probe()
+    health = prober(db=(db, True), ghl=(ghl, False))
+    ghl.failing = True
+    asyncio.run(health.probe_all())
+    assert health.snapshot()["status"] == "degraded"
+    db.failing = True
+    asyncio.run(health.probe_all())
+    assert health.snapshot()["status"] == "unhealthy"
+    db.failing = ghl.failing = False
+    asyncio.run(health.probe_all())
+    assert health.snapshot()["status"] == "healthy"
+
+
+def test_dependency_is_down_only_after_consecutive_failures():
+    db = Probe()
+    health = prober(threshold=3, db=(db, True))
+    asyncio.run(health.probe_all())
+    db.failing = True
+    for _ in range(2):
+        asyncio.run(health.probe_all())
+        assert health.snapshot()["status"] == "healthy"
+    assert health.snapshot()["dependencies"]["db"]["error"] == "ConnectionError: refused"
+    asyncio.run(health.probe_all())
+    assert health.snapshot()["status"] == "unhealthy"
+    assert health.snapshot()["dependencies"]["db"]["consecutive_failures"] == 3
+    # One success resets the count
+    db.failing = False
+    asyncio.run(health.probe_all())
+    db.failing = True
+    asyncio.run(health.probe_all())
+    assert health.snapshot()["status"] == "healthy"
+
+
+def test_dependency_never_seen_up_is_down_straight_away():
+    db = Probe()
+    db.failing = True
+    health = prober(threshold=3, db=(db, True))
+    asyncio.run(health.probe_all())
+    assert health.snapshot()["status"] == "unhealthy"
+
+
+def test_slow_check_times_out_and_is_not_started_twice():
+    started = []
+
+    async def slow():
+        started.append(1)
+        await asyncio.sleep(0.2)
+
+    async def run():
+        health = prober(db=(slow, True))
+        await health.probe_all()
+        await health.probe_all()
+        return health
+
+    health = asyncio.run(run())
+    assert health.snapshot()["dependencies"]["db"]["error"].startswith("no answer within")
+    assert len(started) == 1
+
+
+def test_start_waits_for_the_given_step():
+    db = Probe()
+    health = prober(db=(db, True))
+
+    async def run():
+        ready = asyncio.Event()
+        await health.start(after=ready.wait())
+        await asyncio.sleep(0.01)
+        assert db.calls == 0
+        ready.set()
+        while not db.calls:
+            await asyncio.sleep(0.001)
+        await health.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_check_disk_reports_free_space_and_low_disk(tmp_path):
+    assert str(tmp_path) in check_disk([str(tmp_path)], 0)["free_bytes"]
+    with pytest.raises(RuntimeError):
+        check_disk([str(tmp_path)], 1 << 62)
+
+
+def test_threshold_must_be_positive():
+    with pytest.raises(ValueError):
+        HealthProber(failure_threshold=0)
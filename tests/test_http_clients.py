@@ -0,0 +1,42 @@
+import asyncio
+
+from http_clients import HostLimiter
+
+
+def test_host_limiter_caps_requests_per_host_and_forgets_idle_hosts():
+    limiter = HostLimiter(per_host=2)
+    peak = {"a.example": 0}
+    running = {"a.example": 0}
+
+    async def fetch(url, host):
+        async with limiter.slot(url):
+            running[host] += 1
+            peak[host] = max(peak[host], running[host])
+            await asyncio.sleep(0.001)
+            running[host] -= 1
+
+    async def run():
+        tasks = [asyncio.create_task(fetch(f"https://a.example/{n}", "a.example")) for n in range(6)]
+        await asyncio.sleep(0)
+        assert limiter.in_use() == {"a.example": 2}
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert peak["a.example"] == 2
+    assert limiter._hosts == {}
+
+
+def test_host_limiter_releases_slots_on_errors():
+    limiter = HostLimiter(per_host=1)
+
+    async def run():
+        for n in range(3):
+            try:
+                async with limiter.slot(f"https://site{n}.example/"):
+                    raise ValueError("bad page")
+            except ValueError:
+                pass
+
+    asyncio.run(run())
+    assert limiter._hosts == {}
+    assert limiter.in_use() == {}
@@ -0,0 +1,95 @@
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+
+from image_store import THUMBNAIL_SIZES, WEBP_AVAILABLE, ImageStore, render_thumbnails
+
+
+def photo(color="red", size=(1200, 900), fmt="JPEG") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def test_render_thumbnails_makes_every_size_within_its_edge():
+    files = render_thumbnails(photo())
+    expected = {f"{size}.jpg" for size in THUMBNAIL_SIZES}
+    if WEBP_AVAILABLE:
+        expected |= {f"{size}.webp" for size in THUMBNAIL_SIZES}
+    assert set(files) == expected
+    for size, edge in THUMBNAIL_SIZES.items():
+        with Image.open(io.BytesIO(files[f"{size}.jpg"])) as image:
+            assert max(image.size) == edge
+            assert image.format == "JPEG"
+
+
+def test_render_thumbnails_flattens_transparent_images_for_jpeg():
+    buffer = io.BytesIO()
+    Image.new("RGBA", (200, 100), (0, 0, 255, 128)).save(buffer, "PNG")
+    files = render_thumbnails(buffer.getvalue())
+    with Image.open(io.BytesIO(files["sm.jpg"])) as image:
+        assert image.mode == "RGB"
+        assert image.size == (96, 48)
+
+
+def test_same_image_is_stored_once(tmp_path):
+    store = ImageStore(tmp_path)
+
+    async def run():
+        return await asyncio.gather(store.add(photo()), store.add(photo()))
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert store.stats()["images"] == 1
+    assert len(list(tmp_path.glob("??/*"))) == 1
+    assert not list(tmp_path.glob("??/.tmp-*"))
+
+
+@pytest.mark.parametrize("webp", [True, False])
+def test_get_picks_the_format_and_size(tmp_path, webp):
+    store = ImageStore(tmp_path)
+
+    async def run():
+        hash_ = await store.add(photo())
+        return hash_, await store.get(hash_, "sm", webp), await store.get(hash_, "xl", webp)
+
+    hash_, path, unknown_size = asyncio.run(run())
+    assert path.name == ("sm.webp" if webp and WEBP_AVAILABLE else "sm.jpg")
+    assert path.parent.name == hash_
+    assert unknown_size is None
+    assert asyncio.run(store.get("0" * 64, "sm", webp)) is None
+
+
+def test_least_recently_served_images_are_evicted(tmp_path):
+    colors = ["red", "green", "blue"]
+    store = ImageStore(tmp_path)
+    sizes = {}
+
+    async def run():
+        hashes = []
+        for color in colors:
+            hashes.append(await store.add(photo(color)))
+            sizes[color] = store.stats()["bytes"] - sum(sizes.values())
+        return hashes
+
+    red, green, blue = asyncio.run(run())
+
+    # Room for two images: serving red makes green the oldest
+    store.quota_bytes = sizes["green"] + sizes["blue"] + sizes["red"] - 1
+    asyncio.run(store.get(red, "md", False))
+    asyncio.run(store.add(photo("white")))
+    assert store.evictions >= 1
+    assert asyncio.run(store.get(green, "md", False)) is None
+    assert not (tmp_path / green[:2] / green).exists()
+    assert asyncio.run(store.get(red, "md", False)) is not None
+
+
+def test_load_rebuilds_the_index_from_disk(tmp_path):
+    hash_ = asyncio.run(ImageStore(tmp_path).add(photo()))
+    reopened = ImageStore(tmp_path)
+    assert reopened.stats()["loaded"] is False
+    reopened.load()
+    assert reopened.stats()["images"] == 1
+    assert reopened.has(hash_)
@@ -0,0 +1,84 @@
+import pytest
+
+import instrumented_db
+from instrumented_db import InstrumentedClient, QueryStats, shape_part
+
+
+class FakeBuilder:
+    """Chainable stand-in for a PostgREST builder"""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return type("Result", (), {"data": self.rows})()
+
+
+class FakeClient:
+    def table(self, name):
+        return FakeBuilder([{"id": 1}, {"id": 2}])
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    stats = QueryStats(slow_threshold=0.5)
+    monkeypatch.setattr(instrumented_db, "QUERY_STATS", stats)
+    return stats
+
+
+def test_filter_values_are_stripped():
+    assert shape_part("eq", ("service_area_type", "state"), {}) == "eq(service_area_type)"
+    assert shape_part("in_", ("id", ["a1", "a2", "a3"]), {}) == "in_(id)"
+    assert shape_part("range", (20, 39), {}) == "range"
+    assert shape_part("offset", (40,), {}) == "offset"
+    assert shape_part("contains", ("tags", ["Luxury Properties"]), {}) == "contains(tags)"
+    assert shape_part("or_", ("full_name.ilike.%smith%,brokerage.ilike.%smith%",), {}) == \
+        "or(brokerage.ilike,full_name.ilike)"
+    assert shape_part("order", ("created_at",), {"desc": True}) == "order(created_at desc)"
+
+
+def test_limits_are_bucketed():
+    assert shape_part("limit", (7,), {}) == "limit(<=10)"
+    assert shape_part("limit", (100,), {}) == "limit(<=100)"
+    assert shape_part("limit", (101,), {}) == "limit(<=1000)"
+
+
+def test_queries_differing_only_in_values_share_a_shape(stats):
+    client = InstrumentedClient(FakeClient())
+    for state, agent_ids, page in (("TX", ["a1"], 0), ("NY", ["b1", "b2"], 50)):
+        client.table("agents").select("*").eq("service_area", state).in_("id", agent_ids) \
+            .range(page, page + 49).offset(page).limit(50).execute()
+
+    [shape] = stats.top()
+    assert shape["shape"] == "agents: select(*) eq(service_area) in_(id) range offset limit(<=100)"
+    assert shape["count"] == 2
+    assert shape["avg_rows"] == 2
+    for value in ("TX", "NY", "a1", "b2", "49", "50"):
+        assert value not in shape["shape"]
+
+
+def test_slow_shapes_rank_first(stats):
+    for _ in range(10):
+        stats.record("agents: select(*)", 0.01, 5)
+    for seconds in (0.2, 0.9, 0.3):
+        stats.record("comments: select(*) eq(agent_id)", seconds, 1)
+    stats.record("agents: update eq(id)", 0.05, 1)
+
+    report = stats.top()
+    assert [row["shape"] for row in report] == [
+        "comments: select(*) eq(agent_id)", "agents: update eq(id)", "agents: select(*)"]
+    assert report[0]["p95_ms"] == 900.0
+    assert report[0]["slow"] == 1
+    assert stats.slow_count == 1
+    assert [row["shape"] for row in stats.top(limit=1, sort="count")] == ["agents: select(*)"]
+
+
+def test_new_shapes_past_the_cap_are_pooled(stats):
+    stats.max_shapes = 2
+    for table in ("a", "b", "c", "d"):
+        stats.record(f"{table}: select(*)", 0.01, 1)
+    assert sorted(row["shape"] for row in stats.top()) == ["(other)", "a: select(*)", "b: select(*)"]
+    assert {row["shape"]: row["count"] for row in stats.top()}["(other)"] == 2
@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+from loop_monitor import LoopLagMonitor
+
+
+def test_loop_lag_requires_admin_password(api):
+    assert api.get("/api/loop-lag").status_code == 422
+    assert api.get("/api/loop-lag?password=wrong").status_code == 401
+
+
+def test_loop_lag_reports_stats(api):
+    response = api.get("/api/loop-lag?password=admin123")
+    assert response.status_code == 200
+
+
+def blocking_call_for_the_test(seconds):
+    time.sleep(seconds)
+
+
+def test_stall_is_reported_once_with_the_blocking_stack():
+    async def run():
+        monitor = LoopLagMonitor(interval=0.02, threshold=0.05)
+        await monitor.start()
+        await asyncio.sleep(0.05)
+        blocking_call_for_the_test(0.3)
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(run())
+    stats = monitor.stats()
+    assert stats["stalls"] == 1
+    assert "blocking_call_for_the_test" in stats["last_stall_stack"]
+    assert stats["max_lag_ms"] >= 200
+    assert stats["running"] is False
+
+
+def test_idle_loop_has_no_stalls():
+    async def run():
+        monitor = LoopLagMonitor(interval=0.01, threshold=0.2)
+        await monitor.start()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(run())
+    assert monitor.stalls == 0
+    assert monitor.last_stall_stack is None
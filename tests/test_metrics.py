@@ -0,0 +1,55 @@
+import threading
+
+from metrics import Counter, Gauge, Histogram
+
+
+def test_counter_and_gauge_render():
+    counter = Counter("test_requests_total", "Requests", ("route",), registry=None)
+    counter.inc("/a")
+    counter.inc("/a", amount=2)
+    gauge = Gauge("test_depth", "Depth", registry=None)
+    gauge.set(5)
+    gauge.dec()
+    assert counter.render()[2:] == ['test_requests_total{route="/a"} 3']
+    assert gauge.render()[2:] == ["test_depth 4"]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Latency", buckets=(0.1, 1.0), registry=None)
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{le="0.1"} 1',
+        'test_seconds_bucket{le="1.0"} 2',
+        'test_seconds_bucket{le="+Inf"} 3',
+        "test_seconds_sum 5.55",
+        "test_seconds_count 3",
+    ]
+
+
+def test_updates_from_many_threads_are_not_lost():
+    counter = Counter("test_threads_total", "Increments", ("worker",), registry=None)
+    histogram = Histogram("test_threads_seconds", "Observations", ("worker",), registry=None)
+    stop = threading.Event()
+
+    def work(worker: int):
+        for _ in range(20000):
+            counter.inc(str(worker % 2))
+            histogram.observe(0.01, str(worker))
+
+    def render():
+        while not stop.is_set():
+            counter.render()
+            histogram.render()
+
+    renderer = threading.Thread(target=render)
+    renderer.start()
+    workers = [threading.Thread(target=work, args=(worker,)) for worker in range(8)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    stop.set()
+    renderer.join()
+    assert counter.values == {("0",): 80000, ("1",): 80000}
+    assert sum(sum(series[:-1]) for series in histogram.values.values()) == 160000
@@ -0,0 +1,46 @@
+import asyncio
+import threading
+
+import pytest
+
+import profiling
+from profiling import ProfilerBusy, memory_diff
+
+_kept = []
+
+
+def test_memory_diff_reports_growth_and_compares_off_the_loop(monkeypatch):
+    threads = []
+    compare = profiling._compare_snapshots
+
+    def recording_compare(*args):
+        threads.append(threading.get_ident())
+        return compare(*args)
+
+    monkeypatch.setattr(profiling, "_compare_snapshots", recording_compare)
+
+    async def allocate():
+        await asyncio.sleep(0.01)
+        _kept.append([bytearray(1024) for _ in range(2000)])
+
+    async def run():
+        task = asyncio.create_task(allocate())
+        stats = await memory_diff(0.05, limit=5)
+        await task
+        return stats
+
+    stats = asyncio.run(run())
+    _kept.clear()
+    assert threads and threads[0] != threading.get_ident()
+    assert any(stat["size_diff_kb"] >= 1000 and "test_profiling.py" in stat["site"][0] for stat in stats)
+
+
+def test_only_one_profile_runs_at_a_time():
+    async def run():
+        first = asyncio.create_task(memory_diff(0.05))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ProfilerBusy):
+            await memory_diff(0.01)
+        await first
+
+    asyncio.run(run())
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+import rate_limit
+from rate_limit import CombinedBuckets, RateLimiter, RouteLimit, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+
+def request(path="/api/agents", method="GET", client="10.0.0.1", headers=()):
+    return {"type": "http", "method": method, "path": path, "client": (client, 1234), "headers": list(headers)}
+
+
+def call(limiter: RateLimiter, scope, app=None) -> int:
+    sent = []
+
+    async def ok_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(limiter.handle(app or ok_app, scope, None, send))
+    return sent[0]["status"]
+
+
+def test_bucket_refills_at_rate(clock):
+    bucket = TokenBucket(rate=2, capacity=2)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.wait_time() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.try_acquire()
+
+
+def test_bucket_never_exceeds_capacity(clock):
+    bucket = TokenBucket(rate=10, capacity=3)
+    clock.now += 60
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+
+@pytest.mark.parametrize("rate, capacity", [(0, 10), (-1, 10), (1, 0)])
+def test_bucket_rejects_non_positive_settings(rate, capacity):
+    with pytest.raises(ValueError):
+        TokenBucket(rate, capacity)
+
+
+def test_clients_are_limited_separately(clock):
+    limiter = RateLimiter([RouteLimit("*", "/api", client_rate=1, client_burst=2)])
+    assert [call(limiter, request(client="10.0.0.1")) for _ in range(3)] == [200, 200, 429]
+    assert call(limiter, request(client="10.0.0.2")) == 200
+
+
+def test_forwarded_for_header_does_not_pick_the_bucket(clock):
+    limiter = RateLimiter([RouteLimit("*", "/api", client_rate=1, client_burst=2)])
+    statuses = [
+        call(limiter, request(headers=[(b"x-forwarded-for", f"203.0.113.{n}".encode())]))
+        for n in range(5)
+    ]
+    assert statuses == [200, 200, 429, 429, 429]
+
+
+def test_route_rejection_does_not_spend_the_client_token(clock):
+    rule = RouteLimit("POST", "/api/agents", client_rate=0.1, client_burst=1, route_rate=1, route_burst=1)
+    limiter = RateLimiter([rule])
+    assert call(limiter, request(method="POST", client="10.0.0.1")) == 200
+    # The route bucket is empty; the second client is turned away but keeps its token
+    assert call(limiter, request(method="POST", client="10.0.0.2")) == 429
+    clock.now += 1
+    assert call(limiter, request(method="POST", client="10.0.0.2")) == 200
+
+
+def test_exempt_paths_skip_limits(clock):
+    limiter = RateLimiter([RouteLimit("*", "/api", client_rate=1, client_burst=1)], exempt_paths=("/api/health",))
+    assert [call(limiter, request("/api/health")) for _ in range(3)] == [200, 200, 200]
+
+
+def test_sheds_when_concurrency_and_queue_are_full():
+    limiter = RateLimiter([], max_concurrency=1, max_queue=0)
+
+    async def run():
+        release = asyncio.Event()
+        statuses = []
+
+        async def slow_app(scope, receive, send):
+            await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        first = asyncio.create_task(limiter.handle(slow_app, request(), None, send))
+        await asyncio.sleep(0)
+        await limiter.handle(slow_app, request(), None, send)
+        release.set()
+        await first
+        return statuses
+
+    assert asyncio.run(run()) == [503, 200]
+    assert limiter.counts["shed"] == 1
+
+
+def test_combined_buckets_take_a_token_from_each(clock):
+    shared, own = TokenBucket(1, 2), TokenBucket(100, 100)
+    combined = CombinedBuckets(own, shared)
+    asyncio.run(combined.acquire())
+    asyncio.run(combined.acquire())
+    assert shared.wait_time() == pytest.approx(1.0)
+    combined.drain()
+    assert own.wait_time() > 0
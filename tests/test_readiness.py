@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+from http_clients import OutboundClients
+from readiness import WarmUp
+
+
+def test_sync_steps_run_off_the_loop():
+    threads = {}
+
+    async def run():
+        warm_up = WarmUp()
+        warm_up.start({"disk": lambda: threads.setdefault("step", threading.get_ident())})
+        await warm_up._task
+        return warm_up
+
+    warm_up = asyncio.run(run())
+    assert warm_up.ready
+    assert threads["step"] != threading.get_ident()
+
+
+def test_failed_steps_are_retried_until_they_succeed():
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("database unreachable")
+
+    async def run():
+        warm_up = WarmUp(retry_delay=0.001)
+        warm_up.start({"database": flaky})
+        await asyncio.sleep(0)
+        assert not warm_up.ready
+        await warm_up._task
+        return warm_up
+
+    warm_up = asyncio.run(run())
+    assert warm_up.ready
+    assert warm_up.steps["database"]["attempts"] == 3
+    assert warm_up.steps["database"]["error"] is None
+
+
+def test_outbound_clients_start_shares_one_ssl_context():
+    async def run():
+        clients = OutboundClients("http://127.0.0.1:9/", "key")
+        scrape, ghl = await clients.start()
+        try:
+            assert clients.scrape is scrape and clients.ghl is ghl
+            return clients.ssl_context()
+        finally:
+            await clients.aclose()
+
+    assert asyncio.run(run()) is not None
+
+
+def test_wait_returns_once_a_step_is_done():
+    async def run():
+        warm_up = WarmUp()
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+
+        warm_up.start({"http_clients": slow})
+        waiter = asyncio.create_task(warm_up.wait("http_clients"))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        release.set()
+        await asyncio.wait_for(waiter, 1)
+        await warm_up.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from scrape_jobs import JOB_DONE, JOB_FAILED, JOB_QUEUED, ScrapeJobQueue
+
+
+def test_jobs_run_in_the_background_and_report_status():
+    async def handler(job):
+        await asyncio.sleep(0)
+        return f"/api/images/{job['agent_id']}"
+
+    async def run():
+        queue = ScrapeJobQueue(handler, concurrency=2)
+        await queue.start()
+        jobs = [queue.enqueue(f"a{n}", "Jane Doe", "https://example.com", "Austin") for n in range(3)]
+        assert all(job["status"] == JOB_QUEUED for job in jobs)
+        await queue._queue.join()
+        await queue.stop()
+        return queue, jobs
+
+    queue, jobs = asyncio.run(run())
+    assert [queue.get_job(job["id"])["status"] for job in jobs] == [JOB_DONE] * 3
+    assert jobs[0]["profile_image"] == "/api/images/a0"
+    assert queue.stats()["completed"] == 3
+
+
+def test_an_agent_with_a_pending_scrape_gets_the_same_job():
+    started = []
+
+    async def handler(job):
+        started.append(job["id"])
+        return None
+
+    async def run():
+        queue = ScrapeJobQueue(handler, concurrency=1)
+        await queue.start()
+        first = queue.enqueue("a1", "Jane Doe", None, "Austin")
+        again = queue.enqueue("a1", "Jane Doe", None, "Austin")
+        await queue._queue.join()
+        # Once finished, a new scrape can be queued
+        later = queue.enqueue("a1", "Jane Doe", None, "Austin")
+        await queue._queue.join()
+        await queue.stop()
+        return first, again, later
+
+    first, again, later = asyncio.run(run())
+    assert again is first
+    assert later["id"] != first["id"]
+    assert started == [first["id"], later["id"]]
+
+
+def test_failing_jobs_are_retried_then_marked_failed():
+    async def handler(job):
+        raise RuntimeError("site unreachable")
+
+    async def run():
+        queue = ScrapeJobQueue(handler, max_retries=2, retry_delay=0.001)
+        await queue.start()
+        job = queue.enqueue("a1", "Jane Doe", "https://example.com", "Austin")
+        await queue._queue.join()
+        await queue.stop()
+        return queue, job
+
+    queue, job = asyncio.run(run())
+    assert job["status"] == JOB_FAILED
+    assert job["attempts"] == 3
+    assert queue.stats()["retries"] == 2
+
+
+def test_full_or_stopped_queue_refuses_jobs():
+    async def run():
+        queue = ScrapeJobQueue(lambda job: None, maxsize=1)
+        with pytest.raises(RuntimeError):
+            queue.enqueue("a1", "Jane Doe", None, "Austin")
+        queue._queue = asyncio.Queue(maxsize=1)
+        queue.enqueue("a1", "Jane Doe", None, "Austin")
+        with pytest.raises(asyncio.QueueFull):
+            queue.enqueue("a2", "John Roe", None, "Austin")
+
+    asyncio.run(run())
+
+
+def test_job_status_endpoint_leaves_out_agent_details(api, server, monkeypatch):
+    job = {"id": "j1", "agent_id": "a1", "full_name": "Jane Doe", "website": "https://janedoe.example",
+           "service_area": "Austin", "status": JOB_DONE, "attempts": 1, "profile_image": None,
+           "error": None, "created_at": 1.0, "finished_at": 2.0}
+    monkeypatch.setitem(server.scrape_queue.jobs, "j1", job)
+    body = api.get("/api/scrape-jobs/j1").json()
+    assert body["status"] == JOB_DONE
+    assert not {"full_name", "website", "service_area"} & set(body)
+    assert api.get("/api/scrape-jobs/missing").status_code == 404
@@ -0,0 +1,79 @@
+import json
+import re
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from tracing import JsonlExporter, TimedRoute, TracingMiddleware, span
+
+ENTRY = re.compile(r'^(\w+);dur=\d+\.\d{2}(;desc="\d+x")?$')
+
+
+def make_client(tmp_path, trace_all: bool = False) -> TestClient:
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/agents")
+    async def agents():
+        with span("db", "agents.select", table="agents"):
+            with span("model", rows=2):
+                pass
+        with span("db", "comments.select"):
+            pass
+        return [{"id": "a1"}, {"id": "a2"}]
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(TracingMiddleware, trace_all=trace_all, exporter=JsonlExporter(str(tmp_path / "traces.jsonl")))
+    return TestClient(app)
+
+
+def exported_spans(tmp_path) -> list:
+    [line] = (tmp_path / "traces.jsonl").read_text().splitlines()
+    [resource] = json.loads(line)["resourceSpans"]
+    return resource["scopeSpans"][0]["spans"]
+
+
+def test_server_timing_header_format(tmp_path):
+    response = make_client(tmp_path).get("/agents", headers={"X-Debug-Timing": "1"})
+
+    assert response.headers["timing-allow-origin"] == "*"
+    entries = response.headers["server-timing"].split(", ")
+    assert all(ENTRY.match(entry) for entry in entries), entries
+    names = [entry.split(";")[0] for entry in entries]
+    assert names == ["model", "db", "encode", "total"]
+    assert 'desc="2x"' in entries[1]
+    assert 'desc="1x"' in entries[0]
+
+
+def test_spans_nest_under_their_parent(tmp_path):
+    traceparent = "00-" + "ab" * 16 + "-" + "cd" * 8 + "-01"
+    make_client(tmp_path).get("/agents", headers={"X-Debug-Timing": "1", "traceparent": traceparent})
+
+    root, *children = exported_spans(tmp_path)
+    assert root["name"] == "GET /agents"
+    assert root["traceId"] == "ab" * 16
+    assert root["parentSpanId"] == "cd" * 8
+    by_name = {s["name"]: s for s in children}
+    assert set(by_name) == {"model", "agents.select", "comments.select"}
+    assert by_name["model"]["parentSpanId"] == by_name["agents.select"]["spanId"]
+    assert by_name["agents.select"]["parentSpanId"] == root["spanId"]
+    assert by_name["comments.select"]["parentSpanId"] == root["spanId"]
+    assert all(s["traceId"] == root["traceId"] for s in children)
+    outer, inner = by_name["agents.select"], by_name["model"]
+    assert int(outer["startTimeUnixNano"]) <= int(inner["startTimeUnixNano"])
+    assert int(inner["endTimeUnixNano"]) <= int(outer["endTimeUnixNano"])
+
+
+def test_untraced_requests_are_left_alone(tmp_path):
+    response = make_client(tmp_path).get("/agents")
+
+    assert response.json() == [{"id": "a1"}, {"id": "a2"}]
+    assert "server-timing" not in response.headers
+    assert not (tmp_path / "traces.jsonl").exists()
+
+
+def test_trace_all_traces_without_the_header(tmp_path):
+    response = make_client(tmp_path, trace_all=True).get("/agents")
+
+    assert response.headers["server-timing"].split(", ")[-1].startswith("total;dur=")
+    assert len(exported_spans(tmp_path)) == 4
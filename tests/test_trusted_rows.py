@@ -0,0 +1,60 @@
+import pytest
+
+AGENT_ROWS = [
+    {
+        "id": "6f1c2d8e-1111-4c3b-9a55-0c1d2e3f4a5b", "full_name": "José Álvarez", "brokerage": "Compass",
+        "phone": "(212) 555-0100", "email": "jose@compass.com", "website": "https://compass.com/jose",
+        "service_area_type": "city", "service_area": "New York, NY", "tags": ["Luxury Properties", "Relocation"],
+        "address_last_deal": "1 Main St, New York, NY", "submitted_by": "Admin", "notes": "Speaks \"Spanish\"\n",
+        "profile_image": "/api/images/abc/md", "latitude": 40.7128, "longitude": -74.006, "rating": 4.0,
+        "created_at": "2024-05-01T12:34:56.123456+00:00",
+    },
+    {
+        # Optional fields missing or None, as older rows have them
+        "id": "2", "full_name": "Pat Smith", "brokerage": "Remax", "phone": "5125550100", "email": "pat@remax.com",
+        "website": "", "service_area_type": "state", "service_area": "TX", "tags": [], "address_last_deal": "",
+        "submitted_by": "Jane", "notes": None, "profile_image": None, "latitude": None, "longitude": None,
+        "rating": None, "created_at": None,
+    },
+    {
+        "id": "3", "full_name": "Sam Lee", "brokerage": "KW", "phone": "1", "email": "sam@kw.com", "website": "x",
+        "service_area_type": "county", "service_area": "Travis County, TX", "address_last_deal": "x",
+        "submitted_by": "Admin", "rating": 3, "created_at": "2024-05-01T12:34:56+00:00",
+    },
+]
+
+COMMENT_ROWS = [
+    {"id": "c1", "agent_id": "2", "author_name": "Zoë", "content": "Great — fast close 👍", "rating": "great",
+     "created_at": "2024-06-02T08:00:00.5+00:00"},
+    {"id": "c2", "agent_id": "2", "author_name": "Anon", "content": "", "rating": None, "created_at": None},
+]
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.data = rows
+
+    def __getattr__(self, name):
+        # select/eq/order/limit/... all return the same query
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return self
+
+
+class FakeSupabase:
+    def table(self, name):
+        return FakeQuery(AGENT_ROWS if name == "agents" else COMMENT_ROWS)
+
+
+@pytest.mark.parametrize("path", ["/api/agents", "/api/agents/2/comments"])
+def test_fast_path_is_byte_identical_to_response_model(api, server, monkeypatch, path):
+    monkeypatch.setattr(server, "supabase", FakeSupabase())
+    bodies = {}
+    for fast_path in (True, False):
+        monkeypatch.setattr(server, "TRUSTED_ROWS_FAST_PATH", fast_path)
+        response = api.get(path)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        bodies[fast_path] = response.content
+    assert bodies[True] == bodies[False]
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import write_batcher
+from write_batcher import WriteBatcher, WriteQueueFull
+
+
+class Refused(Exception):
+    """A PostgREST error for a row the database refuses (foreign key violation)"""
+    code = "23503"
+
+
+class FakeTable:
+    def __init__(self, unavailable: int = 0, bad_ids=()):
+        self.unavailable = unavailable
+        self.bad_ids = set(bad_ids)
+        self.inserts = []
+
+    def insert(self, rows):
+        if self.unavailable:
+            self.unavailable -= 1
+            raise ConnectionError("database unavailable")
+        if any(row["id"] in self.bad_ids for row in rows):
+            raise Refused("violates foreign key constraint")
+        self.inserts.append(rows)
+        return [{**row, "stored": True} for row in rows]
+
+
+def comment(n: int) -> dict:
+    return {"id": f"c{n}", "agent_id": "a1", "author_name": "Jane Private", "content": "secret text"}
+
+
+def test_flush_mode_batches_concurrent_rows():
+    table = FakeTable()
+    written = []
+
+    async def run():
+        batcher = WriteBatcher("comments", table.insert, max_rows=10, max_delay=0.05, on_written=written.extend)
+        await batcher.start()
+        futures = [batcher.submit(comment(n)) for n in range(5)]
+        stored = await asyncio.gather(*futures)
+        await batcher.stop()
+        return stored
+
+    stored = asyncio.run(run())
+    assert len(table.inserts) == 1
+    assert [row["id"] for row in stored] == [f"c{n}" for n in range(5)]
+    assert all(row["stored"] for row in stored)
+    assert len(written) == 5
+
+
+def test_one_refused_row_does_not_fail_its_batch():
+    table = FakeTable(bad_ids={"c2"})
+
+    async def run():
+        batcher = WriteBatcher("comments", table.insert, max_rows=10, max_delay=0.05)
+        await batcher.start()
+        futures = [batcher.submit(comment(n)) for n in range(4)]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        await batcher.stop()
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+    assert isinstance(results[2], Refused)
+    assert [row["id"] for i, row in enumerate(results) if i != 2] == ["c0", "c1", "c3"]
+    assert batcher.failed == 1
+    assert batcher.written == 3
+
+
+def test_flush_mode_fails_rows_when_the_database_is_down():
+    table = FakeTable(unavailable=1)
+
+    async def run():
+        batcher = WriteBatcher("comments", table.insert, max_delay=0.01)
+        await batcher.start()
+        future = batcher.submit(comment(1))
+        with pytest.raises(ConnectionError):
+            await future
+        await batcher.stop()
+
+    asyncio.run(run())
+    assert table.inserts == []
+
+
+def test_write_behind_retries_until_the_database_is_back():
+    table = FakeTable(unavailable=2)
+
+    async def run():
+        batcher = WriteBatcher("comments", table.insert, ack="queue", max_delay=0.01)
+        await batcher.start()
+        assert batcher.submit(comment(1)) is None
+        await batcher.stop(timeout=5)
+        return batcher
+
+    batcher = asyncio.run(run())
+    assert [row["id"] for rows in table.inserts for row in rows] == ["c1"]
+    assert batcher.stats()["queued"] == 0
+
+
+def test_write_behind_logs_refused_rows_without_their_content(caplog):
+    table = FakeTable(bad_ids={"c1"})
+
+    async def run():
+        batcher = WriteBatcher("comments", table.insert, ack="queue", max_delay=0.01)
+        await batcher.start()
+        batcher.submit(comment(1))
+        await batcher.stop()
+
+    with caplog.at_level(logging.ERROR, logger="write_batcher"):
+        asyncio.run(run())
+    assert "id=c1 agent_id=a1" in caplog.text
+    assert "Jane Private" not in caplog.text
+    assert "secret text" not in caplog.text
+
+
+def test_full_queue_and_stopped_batcher_refuse_rows():
+    async def run():
+        batcher = WriteBatcher("comments", FakeTable().insert, ack="queue", max_queue=2, max_delay=1)
+        with pytest.raises(WriteQueueFull):
+            batcher.submit(comment(0))
+        await batcher.start()
+        batcher.submit(comment(1))
+        batcher.submit(comment(2))
+        with pytest.raises(WriteQueueFull):
+            batcher.submit(comment(3))
+        await batcher.stop()
+        return batcher
+
+    assert asyncio.run(run()).queue_full == 1
+
+
+def test_unknown_comment_write_mode_fails_at_start_up():
+    env = {**os.environ, "COMMENT_WRITE_MODE": "batch"}
+    result = subprocess.run([sys.executable, "-c", "import server"], cwd=Path(write_batcher.__file__).parent, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode != 0
+    assert "Unknown COMMENT_WRITE_MODE: batch" in result.stderr